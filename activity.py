@@ -0,0 +1,176 @@
+import time
+import logging
+import threading
+from typing import Dict, Optional
+
+import numpy as np
+
+from status_history import StatusHistory
+
+logger = logging.getLogger(__name__)
+
+WINDOWS = {'24h': 86400, '7d': 7 * 86400, '30d': 30 * 86400, '90d': 90 * 86400}
+WEEKDAYS = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+# Shades for the heatmap, from no players to the busiest hour
+SHADES = ' ░▒▓█'
+# 1970-01-01 was a Thursday
+EPOCH_WEEKDAY = 3
+
+
+def hour_cells(ts: np.ndarray, utc_offset: float) -> np.ndarray:
+    """weekday * 24 + hour of each timestamp, Monday 00:00 is cell 0"""
+    local = ts + utc_offset
+    days = np.floor_divide(local, 86400).astype(np.int64)
+    hours = (np.mod(local, 86400) // 3600).astype(np.int64)
+    return ((days + EPOCH_WEEKDAY) % 7) * 24 + hours
+
+
+def session_lengths(codes: np.ndarray, ts: np.ndarray, gap: float, sample_interval: float) -> np.ndarray:
+    """Seconds each player stayed online, a gap longer than gap between sightings splits sessions"""
+    if len(codes) == 0:
+        return np.empty(0)
+    order = np.lexsort((ts, codes))
+    codes, ts = codes[order], ts[order]
+    starts = np.ones(len(ts), dtype=bool)
+    starts[1:] = (codes[1:] != codes[:-1]) | (np.diff(ts) > gap)
+    start_index = np.flatnonzero(starts)
+    first = ts[start_index]
+    last = np.maximum.reduceat(ts, start_index)
+    # A session seen in one sample still lasted about one interval
+    return last - first + sample_interval
+
+
+class _WindowState:
+    def __init__(self):
+        self.lo = self.hi = 0
+        self.plo = self.phi = 0
+        self.heat_sum = np.zeros(168)
+        self.heat_count = np.zeros(168)
+        self.daily_unique: Dict[int, int] = {}
+        self.result: Optional[Dict] = None
+
+
+class ActivityAnalyzer:
+    """Peak hours, daily unique players and session lengths from the status history
+
+    The history is loaded into NumPy columns once, later calls only fetch
+    rows added since. Each window keeps running heatmap sums: samples that
+    arrive are added and samples that fall out of the window are subtracted,
+    unique-player counts are recomputed only for the days that changed, and
+    a report is served from cache until either happens.
+
+    Names come from the status response's player sample, at most 12 random
+    players per probe. With more online the unique counts and sessions only
+    cover the players that were listed, and sessions are split whenever a
+    player is left out of the sample for longer than the session gap.
+    """
+
+    def __init__(self, history: StatusHistory):
+        self.history = history
+        self._lock = threading.Lock()
+        self._last_id = 0
+        self._names: Dict[str, int] = {}
+        self.ts = np.empty(0)
+        self.players = np.empty(0)
+        self.p_ts = np.empty(0)
+        self.p_code = np.empty(0, dtype=np.int64)
+        self._windows: Dict[str, _WindowState] = {}
+
+    def _load(self):
+        """Append history rows added since the last call"""
+        since = 0 if self._last_id else time.time() - max(WINDOWS.values())
+        rows = self.history.samples_after(self._last_id, since)
+        if not rows:
+            return
+        player_rows = self.history.players_after(self._last_id, rows[-1][0], since)
+        self._last_id = rows[-1][0]
+
+        columns = np.array([(row[1], row[3]) for row in rows], dtype=float)
+        self.ts = np.concatenate([self.ts, columns[:, 0]])
+        self.players = np.concatenate([self.players, columns[:, 1]])
+        if player_rows:
+            codes = [self._names.setdefault(name, len(self._names)) for _, _, name in player_rows]
+            self.p_ts = np.concatenate([self.p_ts, np.array([row[1] for row in player_rows], dtype=float)])
+            self.p_code = np.concatenate([self.p_code, np.array(codes, dtype=np.int64)])
+
+        # Keep memory bounded to the longest window
+        cutoff = np.searchsorted(self.ts, time.time() - max(WINDOWS.values()))
+        pcutoff = np.searchsorted(self.p_ts, time.time() - max(WINDOWS.values()))
+        if cutoff > len(self.ts) // 2:
+            self.ts, self.players = self.ts[cutoff:], self.players[cutoff:]
+            self.p_ts, self.p_code = self.p_ts[pcutoff:], self.p_code[pcutoff:]
+            for state in self._windows.values():
+                state.lo, state.hi = max(state.lo - cutoff, 0), max(state.hi - cutoff, 0)
+                state.plo, state.phi = max(state.plo - pcutoff, 0), max(state.phi - pcutoff, 0)
+
+    def report(self, window: str = '7d') -> Dict:
+        """Activity over the last window ('24h', '7d', '30d' or '90d')"""
+        with self._lock:
+            self._load()
+            return self._update(window, WINDOWS[window])
+
+    def _update(self, window: str, seconds: float) -> Dict:
+        utc_offset = time.localtime().tm_gmtoff
+        start = time.time() - seconds
+        lo, hi = int(np.searchsorted(self.ts, start)), len(self.ts)
+        plo, phi = int(np.searchsorted(self.p_ts, start)), len(self.p_ts)
+
+        state = self._windows.get(window)
+        if state and state.result and (state.lo, state.hi) == (lo, hi) and (state.plo, state.phi) == (plo, phi):
+            return state.result
+        if state is None or lo < state.lo:
+            state = self._windows[window] = _WindowState()
+            state.lo = state.hi = lo
+            state.plo = state.phi = plo
+
+        # Samples that entered the window are added, those that left it are subtracted
+        for begin, end, sign in ((state.hi, hi, 1), (state.lo, lo, -1)):
+            if end > begin:
+                cells = hour_cells(self.ts[begin:end], utc_offset)
+                state.heat_sum += sign * np.bincount(cells, weights=self.players[begin:end], minlength=168)
+                state.heat_count += sign * np.bincount(cells, minlength=168)
+
+        # Unique players are counted per local day, only days that gained rows or lost them are redone
+        day_of = lambda ts: np.floor_divide(ts + utc_offset, 86400).astype(np.int64)
+        first_day = int(day_of(np.array([start]))[0])
+        changed = set(np.unique(day_of(self.p_ts[state.phi:phi])).tolist())
+        if plo > state.plo:
+            changed.add(first_day)
+        state.daily_unique = {day: count for day, count in state.daily_unique.items() if day >= first_day}
+        window_days = day_of(self.p_ts[plo:phi])
+        window_codes = self.p_code[plo:phi]
+        for day in changed:
+            begin, end = np.searchsorted(window_days, [day, day + 1])
+            state.daily_unique[day] = int(len(np.unique(window_codes[begin:end])))
+
+        state.lo, state.hi, state.plo, state.phi = lo, hi, plo, phi
+        state.result = self._summarize(state, window_codes, self.p_ts[plo:phi])
+        return state.result
+
+    def _summarize(self, state: _WindowState, codes: np.ndarray, ts: np.ndarray) -> Dict:
+        interval = self.history.sample_interval
+        with np.errstate(invalid='ignore', divide='ignore'):
+            heatmap = np.where(state.heat_count > 0, state.heat_sum / np.maximum(state.heat_count, 1), 0.0)
+        sessions = session_lengths(codes, ts, gap=2.5 * interval, sample_interval=interval)
+
+        peak_cells = [int(cell) for cell in np.argsort(heatmap)[::-1][:3] if heatmap[cell] > 0]
+        return {
+            "samples": int(state.hi - state.lo),
+            "heatmap": heatmap.reshape(7, 24),
+            "peaks": [(WEEKDAYS[cell // 24], cell % 24, float(heatmap[cell])) for cell in peak_cells],
+            "daily_unique": sorted(state.daily_unique.items()),
+            "unique_players": int(len(np.unique(codes))),
+            "sessions": int(len(sessions)),
+            "avg_session": float(sessions.mean()) if len(sessions) else 0.0
+        }
+
+
+def render_heatmap(heatmap: np.ndarray) -> str:
+    """Weekday rows by hour columns, shaded relative to the busiest hour"""
+    peak = heatmap.max()
+    levels = np.zeros(heatmap.shape, dtype=int) if peak <= 0 else \
+        np.ceil(heatmap / peak * (len(SHADES) - 1)).astype(int)
+    lines = ["    0     6     12    18   "]
+    for weekday, row in zip(WEEKDAYS, levels):
+        lines.append(f"{weekday} " + "".join(SHADES[level] for level in row))
+    return "\n".join(lines)
@@ -0,0 +1,164 @@
+import os
+import time
+import sqlite3
+import logging
+import threading
+from contextlib import closing
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT UNIQUE NOT NULL,
+    created_at REAL NOT NULL,
+    mode TEXT NOT NULL,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    source_bytes INTEGER NOT NULL,
+    duration REAL NOT NULL,
+    file_count INTEGER NOT NULL,
+    sha256 TEXT,
+    verified_at REAL,
+    verify_ok INTEGER
+);
+CREATE TABLE IF NOT EXISTS snapshot_files (
+    snapshot_id INTEGER NOT NULL REFERENCES snapshots(id) ON DELETE CASCADE,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_snapshot_files_path ON snapshot_files(path, snapshot_id);
+CREATE INDEX IF NOT EXISTS idx_snapshot_files_snapshot ON snapshot_files(snapshot_id);
+CREATE INDEX IF NOT EXISTS idx_snapshots_created ON snapshots(created_at);
+"""
+
+# Columns added after the first catalog version, applied to existing databases
+MIGRATIONS = {
+    "sha256": "ALTER TABLE snapshots ADD COLUMN sha256 TEXT",
+    "verified_at": "ALTER TABLE snapshots ADD COLUMN verified_at REAL",
+    "verify_ok": "ALTER TABLE snapshots ADD COLUMN verify_ok INTEGER",
+}
+
+
+def select_gfs_keep(snapshots: List[Tuple[int, float]], keep_last: int, daily: int,
+                    weekly: int, monthly: int) -> set:
+    """Pick snapshot IDs to keep under grandfather-father-son retention
+
+    snapshots is a list of (id, created_at). The newest keep_last snapshots
+    are always kept, plus the newest snapshot of each of the last `daily`
+    days, `weekly` ISO weeks and `monthly` months that have backups.
+    """
+    ordered = sorted(snapshots, key=lambda s: s[1], reverse=True)
+    keep = {snapshot_id for snapshot_id, _ in ordered[:max(keep_last, 1)]}
+
+    buckets = [
+        (daily, lambda d: d.date()),
+        (weekly, lambda d: d.isocalendar()[:2]),
+        (monthly, lambda d: (d.year, d.month)),
+    ]
+    for limit, bucket_of in buckets:
+        seen = set()
+        for snapshot_id, created_at in ordered:
+            if len(seen) >= limit:
+                break
+            bucket = bucket_of(datetime.fromtimestamp(created_at))
+            if bucket not in seen:
+                seen.add(bucket)
+                keep.add(snapshot_id)
+
+    return keep
+
+
+class BackupCatalog:
+    """SQLite index of backup snapshots and the files they contain"""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.executescript(SCHEMA)
+            columns = {row['name'] for row in conn.execute("PRAGMA table_info(snapshots)")}
+            for column, statement in MIGRATIONS.items():
+                if column not in columns:
+                    conn.execute(statement)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA foreign_keys = ON")
+        conn.execute("PRAGMA journal_mode = WAL")
+        return conn
+
+    def record(self, result: Dict, mode: str, created_at: Optional[float] = None) -> int:
+        """Record a finished backup and its contents, returns the catalog ID"""
+        created_at = created_at or time.time()
+        with self._lock, closing(self._connect()) as conn, conn:
+            cursor = conn.execute(
+                "INSERT INTO snapshots (name, created_at, mode, path, size, source_bytes, duration, file_count, sha256) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (result['name'], created_at, mode, result['path'], result['size'],
+                 result.get('source_bytes', 0), result['duration'], result['files'], result.get('sha256'))
+            )
+            snapshot_id = cursor.lastrowid
+            conn.executemany(
+                "INSERT INTO snapshot_files (snapshot_id, path, size, mtime) VALUES (?, ?, ?, ?)",
+                ((snapshot_id, path, size, mtime) for path, size, mtime in result.get('contents', []))
+            )
+        return snapshot_id
+
+    def list_snapshots(self, limit: Optional[int] = None) -> List[Dict]:
+        """Snapshots, newest first"""
+        query = "SELECT * FROM snapshots ORDER BY created_at DESC"
+        params = ()
+        if limit:
+            query += " LIMIT ?"
+            params = (limit,)
+        with closing(self._connect()) as conn:
+            return [dict(row) for row in conn.execute(query, params)]
+
+    def get_snapshot(self, snapshot_id: int) -> Optional[Dict]:
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT * FROM snapshots WHERE id = ?", (snapshot_id,)).fetchone()
+            return dict(row) if row else None
+
+    def find_file(self, path: str, as_of: Optional[float] = None) -> Optional[Dict]:
+        """Newest snapshot taken at or before as_of that contains path"""
+        as_of = as_of or time.time()
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT s.*, f.size AS file_size, f.mtime AS file_mtime FROM snapshot_files f "
+                "JOIN snapshots s ON s.id = f.snapshot_id "
+                "WHERE f.path = ? AND s.created_at <= ? ORDER BY s.created_at DESC LIMIT 1",
+                (path, as_of)
+            ).fetchone()
+            return dict(row) if row else None
+
+    def mark_verified(self, snapshot_id: int, ok: bool):
+        with self._lock, closing(self._connect()) as conn, conn:
+            conn.execute(
+                "UPDATE snapshots SET verified_at = ?, verify_ok = ? WHERE id = ?",
+                (time.time(), int(ok), snapshot_id)
+            )
+
+    def sample_for_verification(self, count: int) -> List[Dict]:
+        """Pick snapshots to verify, never-verified and least recently verified first"""
+        with closing(self._connect()) as conn:
+            return [dict(row) for row in conn.execute(
+                "SELECT * FROM snapshots ORDER BY COALESCE(verified_at, 0), RANDOM() LIMIT ?", (count,)
+            )]
+
+    def delete(self, snapshot_ids: List[int]):
+        with self._lock, closing(self._connect()) as conn, conn:
+            conn.executemany("DELETE FROM snapshots WHERE id = ?", ((i,) for i in snapshot_ids))
+
+    def select_prunable(self, keep_last: int, daily: int, weekly: int, monthly: int) -> List[Dict]:
+        """Snapshots that fall outside the retention policy"""
+        snapshots = self.list_snapshots()
+        keep = select_gfs_keep(
+            [(s['id'], s['created_at']) for s in snapshots], keep_last, daily, weekly, monthly
+        )
+        return [s for s in snapshots if s['id'] not in keep]
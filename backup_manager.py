@@ -0,0 +1,571 @@
+import os
+import time
+import shutil
+import asyncio
+import hashlib
+import logging
+import tarfile
+import zipfile
+import threading
+import contextlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+from queue import Empty
+from typing import Callable, Dict, List, Optional, Tuple
+
+from backup_catalog import BackupCatalog
+from backup_throttle import BackupThrottle, ThrottledReader, lower_priority
+from region_backup import ChunkDeltaStore
+from world_snapshot import HotSnapshot
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# How often the worker process reports progress back to the bot
+PROGRESS_INTERVAL = 2.0
+
+
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _collect_files(source_dir: str, exclude_dirs: List[str]) -> List[Tuple[str, str, int, float]]:
+    """Walk the source directory and return (path, arcname, size, mtime) for every file"""
+    excluded = {os.path.abspath(path) for path in exclude_dirs}
+    files = []
+
+    for root, dirs, filenames in os.walk(source_dir):
+        dirs[:] = [d for d in dirs if os.path.abspath(os.path.join(root, d)) not in excluded]
+        for filename in filenames:
+            path = os.path.join(root, filename)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            arcname = os.path.relpath(path, source_dir).replace(os.sep, '/')
+            files.append((path, arcname, st.st_size, st.st_mtime))
+
+    return files
+
+
+def _build_archive(source_dir: str, archive_base: str, compression: str, level: int,
+                   threads: int, exclude_dirs: List[str], throttle_settings: Optional[Dict] = None,
+                   progress_queue=None) -> Dict:
+    """Create a backup archive (runs inside a worker process)"""
+    start = time.monotonic()
+    throttle = BackupThrottle(throttle_settings) if throttle_settings else None
+    files = _collect_files(source_dir, exclude_dirs)
+    total_bytes = sum(size for _, _, size, _ in files)
+    done_bytes = 0
+    contents = []
+    last_report = 0.0
+
+    def report(final=False):
+        nonlocal last_report
+        now = time.monotonic()
+        if progress_queue is not None and (final or now - last_report >= PROGRESS_INTERVAL):
+            progress_queue.put((done_bytes, total_bytes))
+            last_report = now
+
+    if compression == 'zstd':
+        archive_path = f"{archive_base}.tar.zst"
+        compressor = zstandard.ZstdCompressor(level=level, threads=threads, write_checksum=True)
+        try:
+            with open(archive_path, 'wb') as fh:
+                with compressor.stream_writer(fh) as writer:
+                    with tarfile.open(fileobj=writer, mode='w|') as tar:
+                        for path, arcname, size, mtime in files:
+                            try:
+                                tarinfo = tar.gettarinfo(path, arcname=arcname)
+                                source = open(path, 'rb') if tarinfo.isreg() else None
+                            except OSError as e:
+                                # File vanished or can't be read while the server was running
+                                logger.warning(f"Skipping {arcname} in backup: {e}")
+                            else:
+                                # Once the header is out the stream can't skip the member, a
+                                # short read here leaves the archive corrupt, so it fails the backup
+                                try:
+                                    if source is None:
+                                        tar.addfile(tarinfo)
+                                    else:
+                                        with source:
+                                            tar.addfile(tarinfo, ThrottledReader(source, throttle) if throttle else source)
+                                except OSError as e:
+                                    raise OSError(f"{arcname} changed while it was being archived: {e}") from e
+                                contents.append((arcname, size, mtime))
+                            done_bytes += size
+                            report()
+        except BaseException:
+            if os.path.exists(archive_path):
+                os.remove(archive_path)
+            raise
+    else:
+        archive_path = f"{archive_base}.zip"
+        with zipfile.ZipFile(archive_path, 'w', zipfile.ZIP_DEFLATED, compresslevel=level) as archive:
+            for path, arcname, size, mtime in files:
+                try:
+                    if throttle:
+                        # Built from the file so the entry keeps its real mtime and permissions
+                        zinfo = zipfile.ZipInfo.from_file(path, arcname)
+                        zinfo.compress_type = zipfile.ZIP_DEFLATED
+                        # ZipFile.write sets the level through the same attribute
+                        zinfo._compresslevel = level
+                        with open(path, 'rb') as src, archive.open(
+                                zinfo, 'w', force_zip64=size >= zipfile.ZIP64_LIMIT) as dest:
+                            shutil.copyfileobj(ThrottledReader(src, throttle), dest)
+                    else:
+                        archive.write(path, arcname)
+                    contents.append((arcname, size, mtime))
+                except OSError as e:
+                    logger.warning(f"Skipping {arcname} in backup: {e}")
+                done_bytes += size
+                report()
+
+    report(final=True)
+
+    return {
+        "name": os.path.basename(archive_path),
+        "path": archive_path,
+        "compression": compression,
+        "files": len(contents),
+        "skipped": len(files) - len(contents),
+        "source_bytes": total_bytes,
+        "contents": contents,
+        "size": os.path.getsize(archive_path),
+        "sha256": _file_sha256(archive_path),
+        "duration": time.monotonic() - start
+    }
+
+
+def _latest_progress(progress_queue) -> Optional[Tuple]:
+    """Empty the progress queue, returns the newest report or None"""
+    progress = None
+    while True:
+        try:
+            progress = progress_queue.get_nowait()
+        except Empty:
+            return progress
+
+
+def _build_chunk_snapshot(store_path: str, source_dir: str, exclude_dirs: List[str],
+                          throttle_settings: Optional[Dict] = None, progress_queue=None) -> Dict:
+    """Create a chunk-delta snapshot (runs inside a worker process)"""
+    throttle = BackupThrottle(throttle_settings) if throttle_settings else None
+    last_report = 0.0
+
+    def report(done, total):
+        nonlocal last_report
+        now = time.monotonic()
+        if progress_queue is not None and (done == total or now - last_report >= PROGRESS_INTERVAL):
+            progress_queue.put((done, total))
+            last_report = now
+
+    store = ChunkDeltaStore(store_path)
+    result = store.create_snapshot(source_dir, exclude_dirs, report, throttle)
+    result["sha256"] = store.checksum(result["name"])
+    return result
+
+
+def _verify_snapshot(mode: str, path: str, expected_sha256: Optional[str], store_path: str) -> Dict:
+    """Check a backup's checksum and read it end to end (runs inside a worker process)"""
+    try:
+        if mode == 'chunk_delta':
+            store = ChunkDeltaStore(store_path)
+            snapshot_id = os.path.basename(path)
+            if expected_sha256 and store.checksum(snapshot_id) != expected_sha256:
+                return {"ok": False, "error": "checksum mismatch"}
+            problems = store.verify_references(snapshot_id)
+            if problems:
+                return {"ok": False, "error": f"{len(problems)} missing references, e.g. {problems[0]}"}
+            return {"ok": True}
+
+        if expected_sha256 and _file_sha256(path) != expected_sha256:
+            return {"ok": False, "error": "checksum mismatch"}
+
+        if path.endswith('.zip'):
+            with zipfile.ZipFile(path) as archive:
+                bad = archive.testzip()
+                if bad:
+                    return {"ok": False, "error": f"corrupt member {bad}"}
+        else:
+            # Reading every member makes zstd validate its frame checksum
+            with open(path, 'rb') as fh:
+                with zstandard.ZstdDecompressor().stream_reader(fh) as reader:
+                    with tarfile.open(fileobj=reader, mode='r|') as tar:
+                        for member in tar:
+                            if member.isfile():
+                                extracted = tar.extractfile(member)
+                                while extracted.read(1024 * 1024):
+                                    pass
+        return {"ok": True}
+    except Exception as e:
+        return {"ok": False, "error": str(e)}
+
+
+def _extract_snapshot(mode: str, path: str, target_dir: str, store_path: str, workers: int) -> Dict:
+    """Extract a backup into target_dir (runs inside a worker process)"""
+    start = time.monotonic()
+    os.makedirs(target_dir)
+
+    if mode == 'chunk_delta':
+        ChunkDeltaStore(store_path).restore_snapshot(os.path.basename(path), target_dir)
+    elif path.endswith('.zip'):
+        with zipfile.ZipFile(path) as archive:
+            names = archive.namelist()
+
+        def extract(batch):
+            # Each thread needs its own handle, zlib releases the GIL while inflating
+            with zipfile.ZipFile(path) as archive:
+                for name in batch:
+                    archive.extract(name, target_dir)
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(extract, [names[i::workers] for i in range(workers)]))
+    else:
+        with open(path, 'rb') as fh:
+            with zstandard.ZstdDecompressor().stream_reader(fh) as reader:
+                with tarfile.open(fileobj=reader, mode='r|') as tar:
+                    tar.extractall(target_dir, filter='data')
+
+    return {"duration": time.monotonic() - start}
+
+
+class BackupManager:
+    def __init__(self, config: Dict):
+        self._executor = None
+        self._catalog = None
+        self._progress_manager = None
+        self._progress_queue = None
+        self.backup_path = None
+        # Settings are only replaced between jobs, see _job
+        self._settings_lock = threading.Lock()
+        self._active_jobs = 0
+        self._pending_config = None
+        self._apply_config(config)
+
+    def apply_config(self, config: Dict):
+        """Apply live config changes, deferred while a backup, restore or verify is running
+
+        This runs on the config watcher thread. A job reads paths and
+        compression settings at several points, swapping them mid-job could
+        write the archive to one backup_path and record it in another
+        catalog, so the newest config is applied when the last job finishes.
+        """
+        with self._settings_lock:
+            if self._active_jobs:
+                logger.info("Backup settings changed, they apply once the running backup job finishes")
+                self._pending_config = config
+                return
+            self._apply_config(config)
+
+    @contextlib.contextmanager
+    def _job(self):
+        """Keep the current settings for the duration of a job"""
+        with self._settings_lock:
+            self._active_jobs += 1
+        try:
+            yield
+        finally:
+            with self._settings_lock:
+                self._active_jobs -= 1
+                if not self._active_jobs and self._pending_config is not None:
+                    config, self._pending_config = self._pending_config, None
+                    self._apply_config(config)
+
+    def _apply_config(self, config: Dict):
+        """Read backup settings from config"""
+        self.config = config
+        minecraft_config = config.get('minecraft', {})
+        previous_path = self.backup_path
+        previous_pool = (getattr(self, 'workers', None), getattr(self, 'throttle', None))
+        backup_config = config.get('backup', {})
+
+        self.backup_path = minecraft_config.get('backup_path', 'backups')
+        # Empty when server_path is unset, backups and restores refuse to run then
+        self.server_dir = os.path.dirname(minecraft_config.get('server_path', ''))
+
+        # "archive" writes a full compressed archive, "chunk_delta" only stores changed chunks
+        self.mode = backup_config.get('mode', 'archive')
+        self.chunk_store = ChunkDeltaStore(os.path.join(self.backup_path, 'chunk_store'))
+        self.compression = backup_config.get('compression', 'zstd')
+        # Stage a consistent copy with save-off/save-all first and back up from that
+        self.hot_snapshot = backup_config.get('hot_snapshot', False)
+        self.staging_path = backup_config.get('staging_path', os.path.join(self.backup_path, 'staging'))
+        self.level = backup_config.get('level', 3)
+        # 0 lets zstd use one thread per CPU core
+        self.threads = backup_config.get('threads', 0) or -1
+        self.workers = backup_config.get('workers', 1)
+
+        if self.compression == 'zstd' and zstandard is None:
+            logger.warning("zstandard is not installed, falling back to zip backups")
+            self.compression = 'zip'
+        if self.compression == 'zip':
+            self.level = min(max(self.level, 0), 9)
+
+        retention = backup_config.get('retention', {})
+        self.keep_last = retention.get('keep_last', 6)
+        self.keep_daily = retention.get('daily', 7)
+        self.keep_weekly = retention.get('weekly', 4)
+        self.keep_monthly = retention.get('monthly', 6)
+
+        # Run backup workers at background priority under a read budget
+        self.throttle = backup_config.get('throttle', {})
+
+        self.restore_workers = backup_config.get('restore_workers', os.cpu_count() or 1)
+        self.verify_sample = backup_config.get('verify_sample', 2)
+
+        if previous_path is not None and previous_path != self.backup_path:
+            self._catalog = None
+        if self._executor is not None and previous_pool != (self.workers, self.throttle):
+            # Only reached between jobs, the next one starts a pool with the new settings
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    @property
+    def catalog(self) -> BackupCatalog:
+        """The backup catalog, opened on first use"""
+        if self._catalog is None:
+            self._catalog = BackupCatalog(os.path.join(self.backup_path, 'catalog.db'))
+        return self._catalog
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """Get the worker pool, creating it on first use"""
+        if self._executor is None:
+            if self.throttle.get('enabled', False):
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    initializer=lower_priority,
+                    initargs=(self.throttle.get('nice', 10), self.throttle.get('ionice_idle', True))
+                )
+            else:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    def _get_progress_queue(self):
+        """Get the queue workers report progress on, its manager process starts on first use"""
+        if self._progress_manager is None:
+            self._progress_manager = multiprocessing.Manager()
+            self._progress_queue = self._progress_manager.Queue()
+        return self._progress_queue
+
+    def _require_server_dir(self) -> str:
+        """The absolute server directory, an error if server_path doesn't name one"""
+        if not self.server_dir:
+            raise ValueError("minecraft.server_path must be the server JAR inside the server directory, "
+                             "refusing to back up or restore without it")
+        return os.path.abspath(self.server_dir)
+
+    async def create_backup(self, progress_callback: Optional[Callable] = None,
+                            console_command: Optional[Callable[[str], bool]] = None,
+                            server_pid: Optional[int] = None) -> Dict:
+        """Create a backup of the server directory without blocking the event loop"""
+        with self._job():
+            self._require_server_dir()
+            if not os.path.exists(self.backup_path):
+                os.makedirs(self.backup_path)
+
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            archive_base = os.path.join(self.backup_path, f"backup_{timestamp}")
+            exclude_dirs = [self.backup_path, self.staging_path]
+
+            source_dir = self.server_dir
+            staging = None
+            if self.hot_snapshot:
+                staging = await HotSnapshot(self.config, console_command).capture(
+                    self.server_dir, self.staging_path, exclude_dirs
+                )
+                source_dir = staging['path']
+
+            throttle_settings = None
+            if self.throttle.get('enabled', False):
+                throttle_settings = dict(
+                    self.throttle,
+                    server_pid=server_pid,
+                    log_path=os.path.join(self.server_dir, 'logs', 'latest.log')
+                )
+
+            if self.mode == 'chunk_delta':
+                job = (_build_chunk_snapshot, self.chunk_store.store_path, source_dir, exclude_dirs,
+                       throttle_settings)
+            else:
+                job = (_build_archive, source_dir, archive_base, self.compression,
+                       self.level, self.threads, exclude_dirs, throttle_settings)
+
+            # Every call on the manager's queue is a round trip to its process, none run on the loop
+            loop = asyncio.get_running_loop()
+            progress_queue = await asyncio.to_thread(self._get_progress_queue)
+            # Left over from a backup that failed before its last report was read
+            await asyncio.to_thread(_latest_progress, progress_queue)
+            future = loop.run_in_executor(self._get_executor(), *job, progress_queue)
+
+            while not future.done():
+                await asyncio.wait({future}, timeout=PROGRESS_INTERVAL)
+                progress = await asyncio.to_thread(_latest_progress, progress_queue)
+                if progress and progress_callback:
+                    await progress_callback(*progress)
+
+            result = await future
+
+            if staging:
+                result["save_off_seconds"] = staging["save_off_seconds"]
+
+            result["id"] = await asyncio.to_thread(self.catalog.record, result, self.mode)
+            result.pop("contents", None)
+            result["pruned"] = await asyncio.to_thread(self.prune)
+
+            logger.info(f"Backup created: {result['name']} ({result['size'] / 1024 / 1024:.1f} MB "
+                        f"in {result['duration']:.1f}s)")
+            return result
+
+    def prune(self) -> int:
+        """Delete backups outside the retention policy, returns how many were removed"""
+        prunable = self.catalog.select_prunable(
+            self.keep_last, self.keep_daily, self.keep_weekly, self.keep_monthly
+        )
+        if not prunable:
+            return 0
+
+        self.catalog.delete([snapshot['id'] for snapshot in prunable])
+        for snapshot in prunable:
+            if snapshot['mode'] != 'chunk_delta':
+                try:
+                    os.remove(snapshot['path'])
+                except OSError as e:
+                    logger.warning(f"Failed to delete backup {snapshot['name']}: {e}")
+
+        if any(snapshot['mode'] == 'chunk_delta' for snapshot in prunable):
+            kept = [s['name'] for s in self.catalog.list_snapshots() if s['mode'] == 'chunk_delta']
+            self.chunk_store.delete_unreferenced(kept)
+
+        logger.info(f"Pruned {len(prunable)} backups outside the retention policy")
+        return len(prunable)
+
+    async def restore_backup(self, snapshot_id: int, progress_callback: Optional[Callable] = None) -> Dict:
+        """Verify a backup, extract it next to the server directory and swap it in
+
+        The server must be stopped before calling this.
+        """
+        with self._job():
+            server_dir = self._require_server_dir()
+            bot_dir = os.path.dirname(os.path.abspath(__file__))
+            if bot_dir == server_dir or bot_dir.startswith(server_dir + os.sep):
+                raise ValueError(f"The bot runs from inside {server_dir}, restoring would replace the bot itself")
+
+            snapshot = await asyncio.to_thread(self.catalog.get_snapshot, snapshot_id)
+            if not snapshot:
+                raise ValueError(f"Backup {snapshot_id} not found")
+
+            start = time.monotonic()
+            loop = asyncio.get_running_loop()
+            store_path = self.chunk_store.store_path
+
+            if progress_callback:
+                await progress_callback("Verifying backup")
+            verification = await loop.run_in_executor(
+                self._get_executor(), _verify_snapshot,
+                snapshot['mode'], snapshot['path'], snapshot['sha256'], store_path
+            )
+            await asyncio.to_thread(self.catalog.mark_verified, snapshot_id, verification['ok'])
+            if not verification['ok']:
+                raise RuntimeError(f"Backup {snapshot_id} failed verification: {verification['error']}")
+
+            # Extract beside the server directory so the swap is a rename on the same filesystem
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            restore_dir = f"{server_dir}.restore-{timestamp}"
+
+            if progress_callback:
+                await progress_callback("Extracting backup")
+            try:
+                await loop.run_in_executor(
+                    self._get_executor(), _extract_snapshot,
+                    snapshot['mode'], snapshot['path'], restore_dir, store_path, self.restore_workers
+                )
+            except Exception:
+                await asyncio.to_thread(shutil.rmtree, restore_dir, True)
+                raise
+
+            if progress_callback:
+                await progress_callback("Swapping in restored files")
+            previous_dir = await asyncio.to_thread(self._swap_in, restore_dir, timestamp)
+
+            logger.info(f"Restored backup {snapshot['name']} in {time.monotonic() - start:.1f}s, "
+                        f"previous files kept at {previous_dir}")
+            return {"name": snapshot['name'], "previous_dir": previous_dir,
+                    "duration": time.monotonic() - start}
+
+    def _swap_in(self, restore_dir: str, timestamp: str) -> str:
+        """Replace the server directory with restore_dir, returns where the old one went
+
+        Every rename is recorded and if one fails the completed ones are
+        undone in reverse, so the backups and the server directory are back
+        where they were before the error is raised.
+        """
+        server_dir = os.path.abspath(self.server_dir)
+        previous_dir = f"{server_dir}.pre-restore-{timestamp}"
+        moves = []
+
+        def move(source, target):
+            os.rename(source, target)
+            moves.append((source, target))
+
+        try:
+            # Backups and staging copies living inside the server directory move along with it
+            for excluded in (self.backup_path, self.staging_path):
+                excluded = os.path.abspath(excluded)
+                if excluded.startswith(server_dir + os.sep) and os.path.exists(excluded):
+                    target = os.path.join(restore_dir, os.path.relpath(excluded, server_dir))
+                    os.makedirs(os.path.dirname(target), exist_ok=True)
+                    move(excluded, target)
+            move(server_dir, previous_dir)
+            move(restore_dir, server_dir)
+        except OSError:
+            undone = True
+            for source, target in reversed(moves):
+                try:
+                    os.rename(target, source)
+                except OSError as e:
+                    undone = False
+                    logger.error(f"Could not move {target} back to {source}: {e}")
+            # Only the extracted files are left in restore_dir once everything is back
+            if undone:
+                shutil.rmtree(restore_dir, ignore_errors=True)
+            raise
+        return previous_dir
+
+    async def verify_backups(self, count: Optional[int] = None) -> List[Dict]:
+        """Verify a sample of backups, least recently verified first"""
+        with self._job():
+            loop = asyncio.get_running_loop()
+            snapshots = await asyncio.to_thread(self.catalog.sample_for_verification, count or self.verify_sample)
+            results = []
+
+            for snapshot in snapshots:
+                verification = await loop.run_in_executor(
+                    self._get_executor(), _verify_snapshot,
+                    snapshot['mode'], snapshot['path'], snapshot['sha256'], self.chunk_store.store_path
+                )
+                await asyncio.to_thread(self.catalog.mark_verified, snapshot['id'], verification['ok'])
+                if not verification['ok']:
+                    logger.error(f"Backup {snapshot['name']} failed verification: {verification['error']}")
+                results.append({"id": snapshot['id'], "name": snapshot['name'], **verification})
+
+            return results
+
+    def shutdown(self):
+        """Shut down the worker pool and the progress queue's manager"""
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        if self._progress_manager:
+            self._progress_manager.shutdown()
+            self._progress_manager = None
+            self._progress_queue = None
@@ -0,0 +1,164 @@
+import os
+import time
+import logging
+from typing import Dict, Optional
+
+import psutil
+
+logger = logging.getLogger(__name__)
+
+LAG_MARKER = "Can't keep up!"
+
+
+def lower_priority(nice: int = 10, ionice_idle: bool = True):
+    """Drop the current process to background CPU and I/O priority
+
+    Used as the backup worker pool initializer so compression threads
+    started by the worker inherit the same priority.
+    """
+    process = psutil.Process()
+    try:
+        if os.name == 'nt':
+            process.nice(psutil.BELOW_NORMAL_PRIORITY_CLASS)
+        else:
+            process.nice(nice)
+    except (psutil.Error, OSError) as e:
+        logger.warning(f"Could not lower backup CPU priority: {e}")
+
+    if ionice_idle and hasattr(process, 'ionice'):
+        try:
+            if os.name == 'nt':
+                process.ionice(psutil.IOPRIO_VERYLOW)
+            else:
+                process.ionice(psutil.IOPRIO_CLASS_IDLE)
+        except (psutil.Error, OSError, AttributeError) as e:
+            logger.warning(f"Could not lower backup I/O priority: {e}")
+
+
+class TokenBucket:
+    """Limit throughput to `rate` units per second with bursts up to `capacity`"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def consume(self, amount: float):
+        """Take `amount` tokens, sleeping until enough have accumulated"""
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= amount or self.tokens >= self.capacity:
+                self.tokens -= amount
+                return
+            time.sleep((min(amount, self.capacity) - self.tokens) / self.rate)
+
+
+class ServerLoadGuard:
+    """Pause backup work while the game server is struggling
+
+    The server counts as struggling when the JVM uses more than
+    cpu_threshold percent of the machine's CPU, or when new "Can't keep up!"
+    lines appear in the server log.
+    """
+
+    def __init__(self, server_pid: Optional[int], log_path: Optional[str], cpu_threshold: float = 80,
+                 check_interval: float = 1.0, pause_seconds: float = 2.0, max_pause_seconds: float = 60):
+        self.cpu_threshold = cpu_threshold
+        self.check_interval = check_interval
+        self.pause_seconds = pause_seconds
+        self.max_pause_seconds = max_pause_seconds
+        self.log_path = log_path
+        self.cpu_count = psutil.cpu_count() or 1
+        self.last_check = 0.0
+        self.paused_seconds = 0.0
+
+        self.process = None
+        if server_pid:
+            try:
+                self.process = psutil.Process(server_pid)
+                self.process.cpu_percent(None)
+            except psutil.Error:
+                self.process = None
+
+        self.log_offset = 0
+        if log_path and os.path.exists(log_path):
+            self.log_offset = os.path.getsize(log_path)
+
+    def _server_lagging(self) -> bool:
+        """Check for new lag warnings appended to the server log"""
+        if not self.log_path:
+            return False
+        try:
+            size = os.path.getsize(self.log_path)
+            if size < self.log_offset:
+                # Log was rotated
+                self.log_offset = 0
+            with open(self.log_path, 'r', errors='replace') as f:
+                f.seek(self.log_offset)
+                new_lines = f.read()
+                self.log_offset = f.tell()
+            return LAG_MARKER in new_lines
+        except OSError:
+            return False
+
+    def _server_busy(self) -> bool:
+        lagging = self._server_lagging()
+        if self.process is not None:
+            try:
+                if self.process.cpu_percent(None) / self.cpu_count >= self.cpu_threshold:
+                    return True
+            except psutil.Error:
+                self.process = None
+        return lagging
+
+    def wait_if_busy(self):
+        """Sleep while the server is struggling, at most max_pause_seconds per episode"""
+        now = time.monotonic()
+        if now - self.last_check < self.check_interval:
+            return
+        self.last_check = now
+
+        waited = 0.0
+        while waited < self.max_pause_seconds and self._server_busy():
+            time.sleep(self.pause_seconds)
+            waited += self.pause_seconds
+        if waited:
+            self.paused_seconds += waited
+            logger.info(f"Backup paused {waited:.0f}s while the server was busy")
+
+
+class BackupThrottle:
+    """Read-rate limit plus adaptive pausing for backup workers"""
+
+    def __init__(self, settings: Dict):
+        read_rate = settings.get('read_rate_mb', 0) * 1024 * 1024
+        self.bucket = TokenBucket(read_rate) if read_rate else None
+        self.guard = ServerLoadGuard(
+            settings.get('server_pid'),
+            settings.get('log_path'),
+            settings.get('cpu_threshold', 80),
+            pause_seconds=settings.get('pause_seconds', 2),
+            max_pause_seconds=settings.get('max_pause_seconds', 60)
+        )
+
+    def account(self, nbytes: int):
+        """Record nbytes read, blocking as needed to stay within budget"""
+        if self.bucket:
+            self.bucket.consume(nbytes)
+        self.guard.wait_if_busy()
+
+
+class ThrottledReader:
+    """File wrapper that charges every read against a BackupThrottle"""
+
+    def __init__(self, fileobj, throttle: BackupThrottle):
+        self.fileobj = fileobj
+        self.throttle = throttle
+
+    def read(self, size: int = -1) -> bytes:
+        data = self.fileobj.read(size)
+        self.throttle.account(len(data))
+        return data
@@ -0,0 +1,135 @@
+import io
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from status_history import StatusHistory
+
+logger = logging.getLogger(__name__)
+
+# metric: (samples_after column, axis label, scale)
+METRICS = {
+    'players': (3, 'Players online', 1),
+    'latency': (5, 'Latency (ms)', 1),
+    'ram': (6, 'Server RAM (MB)', 1 / (1024 * 1024))
+}
+# window: (seconds, bucket seconds), samples are averaged per bucket
+WINDOWS = {'24h': (86400, 300), '7d': (7 * 86400, 1800)}
+CACHE_SIZE = 32
+
+
+def bucket_series(ts: np.ndarray, values: np.ndarray, start: float, bucket: float,
+                  count: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Bucket start times and the mean of values per bucket, NaN where nothing was recorded"""
+    index = np.floor_divide(ts - start, bucket).astype(np.int64)
+    keep = (index >= 0) & (index < count) & ~np.isnan(values)
+    sums = np.bincount(index[keep], weights=values[keep], minlength=count)
+    counts = np.bincount(index[keep], minlength=count)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+    return start + np.arange(count) * bucket, means
+
+
+def history_series(history: StatusHistory, window: str) -> Optional[Dict]:
+    """Bucket start times and the per-bucket mean of every metric over window, None if nothing was recorded"""
+    seconds, bucket = WINDOWS[window]
+    now = time.time()
+    # Align buckets to the clock so a cached result stays valid for its whole bucket
+    start = (now - seconds) // bucket * bucket
+    rows = history.samples_after(0, start)
+    if not rows:
+        return None
+    data = np.array([[row[1]] + [np.nan if row[column] is None else row[column] for column, _, _ in METRICS.values()]
+                     for row in rows], dtype=float)
+    count = int(-(-(now - start) // bucket))
+    series = {"bucket": bucket, "samples": len(rows)}
+    for index, (metric, (_, _, scale)) in enumerate(METRICS.items(), start=1):
+        series["ts"], series[metric] = bucket_series(data[:, 0], data[:, index] * scale, start, bucket, count)
+    return series
+
+
+def render_chart(title: str, label: str, ts: np.ndarray, values: np.ndarray) -> bytes:
+    """PNG line chart of a bucketed series, runs in a worker process"""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    import matplotlib.dates as mdates
+
+    fig, ax = plt.subplots(figsize=(8, 3.5), dpi=100)
+    try:
+        times = [datetime.fromtimestamp(t) for t in ts]
+        ax.plot(times, values, color='#0099ff', linewidth=1.5)
+        ax.fill_between(times, values, color='#0099ff', alpha=0.15)
+        ax.set_title(title)
+        ax.set_ylabel(label)
+        ax.set_ylim(bottom=0)
+        ax.grid(True, alpha=0.3)
+        ax.xaxis.set_major_formatter(mdates.ConciseDateFormatter(ax.xaxis.get_major_locator()))
+        fig.tight_layout()
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format='png')
+        return buffer.getvalue()
+    finally:
+        plt.close(fig)
+
+
+class ChartRenderer:
+    """PNG charts of the status history for !graph
+
+    Samples are read and averaged per bucket in a thread, drawing happens in
+    a worker process so matplotlib never holds the event loop or the GIL.
+    Charts are cached by (metric, window, bucket of the newest sample), a
+    request in the same bucket gets the cached image and concurrent requests
+    for the same chart share one render.
+    """
+
+    def __init__(self, history: StatusHistory, workers: int = 1):
+        self.history = history
+        self.workers = workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._cache: 'OrderedDict[Tuple, asyncio.Future]' = OrderedDict()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """Get the render pool, creating it on first use"""
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    async def render(self, metric: str, window: str) -> Optional[bytes]:
+        """PNG of metric over window, None if nothing was recorded in it"""
+        last = self.history.last_sample_ts()
+        if last is None:
+            return None
+        key = (metric, window, int(last // WINDOWS[window][1]))
+        future = self._cache.get(key)
+        if future is None or (future.done() and (future.cancelled() or future.exception())):
+            future = self._cache[key] = asyncio.ensure_future(self._render(metric, window))
+            while len(self._cache) > CACHE_SIZE:
+                self._cache.popitem(last=False)
+        self._cache.move_to_end(key)
+        return await asyncio.shield(future)
+
+    async def _render(self, metric: str, window: str) -> Optional[bytes]:
+        series = await asyncio.to_thread(history_series, self.history, window)
+        if series is None:
+            return None
+        label = METRICS[metric][1]
+        started = time.monotonic()
+        png = await asyncio.get_running_loop().run_in_executor(
+            self._get_executor(), render_chart,
+            f"{label} - last {window}", label, series['ts'], series[metric]
+        )
+        logger.info(f"Rendered {metric} {window} chart from {series['samples']} samples "
+                    f"in {time.monotonic() - started:.2f}s")
+        return png
@@ -0,0 +1,153 @@
+import time
+import asyncio
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional
+
+import discord
+from discord.ext import commands
+
+from metrics import REGISTRY, COMMAND_LATENCY
+
+logger = logging.getLogger(__name__)
+
+COMMAND_WAIT = REGISTRY.histogram(
+    "minecraft_bot_command_wait_seconds", "Time Discord commands spent waiting on server probes and I/O"
+)
+COMMAND_ERRORS = REGISTRY.counter("minecraft_bot_command_errors", "Discord commands that failed")
+
+# Timing of the command running in the current task, set by the before_invoke hook
+_current_timing: ContextVar[Optional['CommandTiming']] = ContextVar('command_timing', default=None)
+
+
+class CommandTiming:
+    def __init__(self, command: str):
+        self.command = command
+        self.start = time.perf_counter()
+        self.wait = 0.0
+
+
+@contextmanager
+def waiting():
+    """Count the time spent in this block as waiting for the running command
+
+    Wrap server queries, file and network I/O and worker pool calls in it.
+    Outside a command it does nothing.
+    """
+    timing = _current_timing.get()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if timing is not None:
+            timing.wait += time.perf_counter() - start
+
+
+async def blocking(func, *args, **kwargs):
+    """asyncio.to_thread, with the time counted as waiting for the running command"""
+    with waiting():
+        return await asyncio.to_thread(func, *args, **kwargs)
+
+
+def is_guild_admin(ctx) -> bool:
+    permissions = getattr(ctx.author, 'guild_permissions', None)
+    return bool(permissions and permissions.administrator)
+
+
+def percentile(values: List[float], percent: float) -> float:
+    """Nearest-rank percentile of values"""
+    ordered = sorted(values)
+    rank = max(int(round(percent / 100 * len(ordered) + 0.5)) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+class CommandPerf:
+    """Per-command wall time, wait time and error counts
+
+    Every command is also recorded in the OpenMetrics histograms. For the
+    !perf report the last `window` runs of each command are kept, so
+    percentiles reflect recent behaviour.
+    """
+
+    def __init__(self, window: int = 500):
+        self.window = window
+        self.samples: Dict[str, deque] = {}
+        self.errors: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def record(self, command: str, elapsed: float, wait: float, failed: bool):
+        COMMAND_LATENCY.observe(elapsed, command=command)
+        COMMAND_WAIT.observe(wait, command=command)
+        if failed:
+            COMMAND_ERRORS.inc(command=command)
+        with self._lock:
+            self.samples.setdefault(command, deque(maxlen=self.window)).append((elapsed, wait))
+            if failed:
+                self.errors[command] = self.errors.get(command, 0) + 1
+
+    def report(self) -> List[Dict]:
+        """Per-command percentiles in seconds, slowest p99 first"""
+        with self._lock:
+            snapshot = {command: list(samples) for command, samples in self.samples.items()}
+            errors = dict(self.errors)
+
+        rows = []
+        for command, samples in snapshot.items():
+            elapsed = [s[0] for s in samples]
+            wait = [s[1] for s in samples]
+            rows.append({
+                "command": command,
+                "count": len(samples),
+                "errors": errors.get(command, 0),
+                "p50": percentile(elapsed, 50),
+                "p99": percentile(elapsed, 99),
+                "wait_p50": percentile(wait, 50),
+                "wait_p99": percentile(wait, 99)
+            })
+        return sorted(rows, key=lambda row: row["p99"], reverse=True)
+
+    def install(self, bot: commands.Bot, is_admin: Callable = is_guild_admin):
+        """Hook command timing into bot and add the !perf command, limited by the is_admin check"""
+
+        @bot.before_invoke
+        async def start_command_timer(ctx):
+            ctx.perf_timing = CommandTiming(ctx.command.qualified_name)
+            _current_timing.set(ctx.perf_timing)
+
+        @bot.after_invoke
+        async def record_command_timing(ctx):
+            # Runs whether or not the command succeeded
+            timing = getattr(ctx, 'perf_timing', None)
+            if timing is None:
+                return
+            _current_timing.set(None)
+            self.record(timing.command, time.perf_counter() - timing.start, timing.wait, ctx.command_failed)
+
+        @bot.command(name='perf')
+        @commands.check(is_admin)
+        async def perf_report(ctx):
+            """Show p50/p99 command latency (admin only)"""
+            rows = self.report()
+            if not rows:
+                await ctx.send("No commands recorded yet")
+                return
+
+            lines = [f"{'command':<14}{'runs':>6}{'p50':>9}{'p99':>9}{'wait50':>9}{'err':>5}"]
+            for row in rows[:20]:
+                lines.append(
+                    f"{row['command'][:14]:<14}{row['count']:>6}"
+                    f"{row['p50'] * 1000:>7.0f}ms{row['p99'] * 1000:>7.0f}ms"
+                    f"{row['wait_p50'] * 1000:>7.0f}ms{row['errors']:>5}"
+                )
+            embed = discord.Embed(
+                title="⏱️ Command Performance",
+                description="```\n" + "\n".join(lines) + "\n```",
+                color=0x0099ff
+            )
+            embed.set_footer(text=f"Last {self.window} runs per command, wait = time spent on probes and I/O")
+            await ctx.send(embed=embed)
+
+        return perf_report
@@ -0,0 +1,314 @@
+import os
+import json
+import time
+import select
+import struct
+import logging
+import threading
+import ctypes
+import ctypes.util
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# inotify event flags, see inotify(7)
+IN_MODIFY = 0x002
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+EVENT_HEADER = struct.Struct('iIII')
+
+SECTIONS = ('discord', 'minecraft', 'radmin_vpn', 'monitoring', 'backup', 'services', 'metrics', 'history', 'api')
+
+
+def _positive_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and value > 0
+
+
+def _port(value) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool) and 0 < value < 65536
+
+
+def _non_empty_string(value) -> bool:
+    return isinstance(value, str) and bool(value.strip())
+
+
+# Dotted key, check and what the value has to be, keys that are missing are not checked
+RULES = [
+    ('discord.prefix', _non_empty_string, "a non-empty string"),
+    ('minecraft.server_host', _non_empty_string, "a non-empty string"),
+    ('minecraft.server_port', _port, "a port number"),
+    ('minecraft.restart_interval', _positive_number, "a positive number"),
+    ('radmin_vpn.check_interval', _positive_number, "a positive number"),
+    ('monitoring.health_check_interval', _positive_number, "a positive number"),
+    ('backup.verify_interval', _positive_number, "a positive number"),
+    ('services.heartbeat_interval', _positive_number, "a positive number"),
+    ('services.watchdog_interval', _positive_number, "a positive number"),
+    ('metrics.port', _port, "a port number"),
+    ('history.sample_interval', _positive_number, "a positive number"),
+    ('history.retention_days', _positive_number, "a positive number"),
+    ('api.port', _port, "a port number"),
+]
+
+
+def get_value(config: Dict, key: str, default=None):
+    """Look up a dotted key like 'minecraft.server_port'"""
+    value = config
+    for part in key.split('.'):
+        if not isinstance(value, dict) or part not in value:
+            return default
+        value = value[part]
+    return value
+
+
+def validate_config(config) -> List[str]:
+    """Problems that make a config unusable, empty if it is fine"""
+    if not isinstance(config, dict):
+        return ["config must be a JSON object"]
+
+    problems = [f"'{section}' must be an object" for section in SECTIONS
+                if section in config and not isinstance(config[section], dict)]
+    for key, check, expected in RULES:
+        value = get_value(config, key)
+        if value is not None and not check(value):
+            problems.append(f"'{key}' must be {expected}, got {value!r}")
+    return problems
+
+
+def diff_config(old: Dict, new: Dict, prefix: str = '') -> Dict[str, Tuple[Any, Any]]:
+    """Changed leaf values as {dotted key: (old, new)}, None stands for a missing key"""
+    changes = {}
+    for key in set(old) | set(new):
+        path = f"{prefix}{key}"
+        before, after = old.get(key), new.get(key)
+        # A section added or removed as a whole is reported leaf by leaf too
+        if isinstance(before, dict) and after is None:
+            after = {}
+        elif isinstance(after, dict) and before is None:
+            before = {}
+        if isinstance(before, dict) and isinstance(after, dict):
+            changes.update(diff_config(before, after, f"{path}."))
+        elif before != after:
+            changes[path] = (before, after)
+    return changes
+
+
+class ConfigStore:
+    """Single in-memory copy of config.json shared by every component
+
+    config is one dict that is updated in place, section by section, so
+    code holding a reference to it always reads current values. The file is
+    watched with inotify where available and by polling its mtime
+    otherwise. Changes are validated before they are applied, an invalid
+    edit is logged and the previous config stays in effect. Subscribers
+    receive the changed keys after every applied change.
+    """
+
+    def __init__(self, path: str = 'config.json', poll_interval: float = 2.0):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.config: Dict = {}
+        self._lock = threading.RLock()
+        self._subscribers: List[Tuple[Optional[str], Callable]] = []
+        self._last_text = None
+        self._watch_thread = None
+        self._stop = threading.Event()
+
+        text = self._read()
+        if text is not None:
+            try:
+                config = json.loads(text)
+            except json.JSONDecodeError:
+                logger.error(f"Invalid JSON in {self.path}!")
+                config = {}
+            problems = validate_config(config)
+            if problems:
+                logger.warning(f"Problems in {self.path}: {'; '.join(problems)}")
+            if isinstance(config, dict):
+                self.config.update(config)
+            self._last_text = text
+
+    def _read(self) -> Optional[str]:
+        try:
+            with open(self.path, 'r') as f:
+                return f.read()
+        except FileNotFoundError:
+            logger.error(f"Configuration file {self.path} not found!")
+            return None
+
+    def get(self, key: str, default=None):
+        return get_value(self.config, key, default)
+
+    def subscribe(self, callback: Callable[[Dict[str, Tuple[Any, Any]], Dict], None], prefix: Optional[str] = None):
+        """Call callback(changes, config) after changes under prefix (e.g. 'minecraft.') are applied"""
+        with self._lock:
+            self._subscribers.append((prefix, callback))
+
+    def unsubscribe(self, callback: Callable):
+        with self._lock:
+            self._subscribers = [(p, c) for p, c in self._subscribers if c != callback]
+
+    def _apply(self, new_config: Dict) -> Dict[str, Tuple[Any, Any]]:
+        """Swap in new_config section by section and notify subscribers"""
+        with self._lock:
+            changes = diff_config(self.config, new_config)
+            # An empty section added or removed changes no leaf but is still applied
+            if not changes and new_config == self.config:
+                return changes
+            # Single assignments keep readers on other threads from seeing a half-empty dict
+            for key, value in new_config.items():
+                self.config[key] = value
+            for key in set(self.config) - set(new_config):
+                del self.config[key]
+            subscribers = list(self._subscribers)
+
+        if not changes:
+            return changes
+        logger.info(f"Configuration changed: {', '.join(sorted(changes))}")
+        for prefix, callback in subscribers:
+            relevant = {k: v for k, v in changes.items() if not prefix or k.startswith(prefix)}
+            if not relevant:
+                continue
+            try:
+                callback(relevant, self.config)
+            except Exception as e:
+                logger.error(f"Config subscriber failed: {e}")
+        return changes
+
+    def reload(self) -> bool:
+        """Re-read the file, returns False if the new contents were rejected"""
+        text = self._read()
+        if text is None or text == self._last_text:
+            return text is not None
+        try:
+            new_config = json.loads(text)
+        except json.JSONDecodeError as e:
+            logger.error(f"Ignoring invalid JSON in {self.path}: {e}")
+            return False
+
+        problems = validate_config(new_config)
+        if problems:
+            logger.error(f"Ignoring invalid change to {self.path}: {'; '.join(problems)}")
+            return False
+
+        self._last_text = text
+        self._apply(new_config)
+        return True
+
+    def update(self, values: Dict[str, Any]) -> Dict[str, Tuple[Any, Any]]:
+        """Set dotted keys, validate, write the file atomically and notify subscribers
+
+        Raises ValueError if the result would not be a valid config.
+        """
+        with self._lock:
+            new_config = json.loads(json.dumps(self.config))
+            for key, value in values.items():
+                section = new_config
+                *parents, leaf = key.split('.')
+                for part in parents:
+                    section = section.setdefault(part, {})
+                section[leaf] = value
+
+            problems = validate_config(new_config)
+            if problems:
+                raise ValueError('; '.join(problems))
+
+            text = json.dumps(new_config, indent=2)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w') as f:
+                f.write(text)
+            os.replace(tmp_path, self.path)
+            # The watcher sees our own write, remember it so it isn't applied twice
+            self._last_text = text
+            return self._apply(new_config)
+
+    def start_watching(self):
+        if self._watch_thread and self._watch_thread.is_alive():
+            return
+        self._stop.clear()
+        self._watch_thread = threading.Thread(target=self._watch, name="config-watcher", daemon=True)
+        self._watch_thread.start()
+
+    def stop_watching(self):
+        self._stop.set()
+
+    def _watch(self):
+        try:
+            if self._watch_inotify():
+                return
+        except OSError as e:
+            logger.warning(f"inotify unavailable ({e}), polling {self.path} instead")
+        self._watch_stat()
+
+    def _watch_inotify(self) -> bool:
+        """Block on inotify events for the config file, returns False if inotify is unsupported"""
+        libc_name = ctypes.util.find_library('c')
+        if not libc_name:
+            return False
+        libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(libc, 'inotify_init1'):
+            return False
+
+        fd = libc.inotify_init1(os.O_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        try:
+            # Watch the directory, editors and update() replace the file rather than rewrite it
+            directory = os.path.dirname(os.path.abspath(self.path))
+            filename = os.path.basename(self.path).encode()
+            mask = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_MODIFY
+            if libc.inotify_add_watch(fd, directory.encode(), mask) < 0:
+                raise OSError(ctypes.get_errno(), f"inotify_add_watch on {directory} failed")
+            # Catch edits made between the initial load and the watch being set up
+            self.reload()
+
+            while not self._stop.is_set():
+                readable, _, _ = select.select([fd], [], [], 1.0)
+                if not readable:
+                    continue
+                data = os.read(fd, 64 * 1024)
+                changed = False
+                offset = 0
+                while offset < len(data):
+                    _, _, _, length = EVENT_HEADER.unpack_from(data, offset)
+                    name = data[offset + EVENT_HEADER.size:offset + EVENT_HEADER.size + length].rstrip(b'\0')
+                    changed = changed or name == filename
+                    offset += EVENT_HEADER.size + length
+                if changed:
+                    # Let a burst of writes from an editor settle before reading
+                    time.sleep(0.1)
+                    self.reload()
+            return True
+        finally:
+            os.close(fd)
+
+    def _watch_stat(self):
+        """Poll the file's mtime and size"""
+        def signature():
+            try:
+                st = os.stat(self.path)
+                return st.st_mtime_ns, st.st_size
+            except OSError:
+                return None
+
+        last = signature()
+        while not self._stop.wait(self.poll_interval):
+            current = signature()
+            if current != last:
+                last = current
+                self.reload()
+
+
+_stores: Dict[str, ConfigStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_config_store(path: str = 'config.json') -> ConfigStore:
+    """The shared, watched store for path"""
+    key = os.path.abspath(path)
+    with _stores_lock:
+        if key not in _stores:
+            _stores[key] = ConfigStore(path)
+        # A forked child inherits the store but not its watcher thread, this starts a new one
+        _stores[key].start_watching()
+        return _stores[key]
@@ -0,0 +1,175 @@
+import time
+import logging
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional, Tuple
+
+from mcstatus import JavaServer
+
+logger = logging.getLogger(__name__)
+
+# Weight of the newest RTT sample in an endpoint's moving average
+RTT_SMOOTHING = 0.3
+MAX_COOLDOWN = 60
+
+# Probes that lose a race keep running here and still update their endpoint's stats
+_probe_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="endpoint-probe")
+
+
+def parse_endpoint(value, default_port: int = 25565) -> Tuple[str, int]:
+    """Accept "host:port", "host" or {"host": ..., "port": ...}"""
+    if isinstance(value, dict):
+        return value['host'], int(value.get('port', default_port))
+    host, _, port = str(value).rpartition(':')
+    if not host:
+        return port, default_port
+    return host, int(port)
+
+
+def endpoints_from_config(config: Dict) -> Callable[[], List[Tuple[str, int]]]:
+    """Endpoint source reading the live config
+
+    server_host:server_port comes first, minecraft.endpoints adds other
+    addresses of the same server (VPN IP, public DNS, LAN).
+    """
+    def addresses():
+        minecraft_config = config.get('minecraft', {})
+        port = minecraft_config.get('server_port', 25565)
+        result = [(minecraft_config.get('server_host', 'localhost'), port)]
+        for value in minecraft_config.get('endpoints', []):
+            endpoint = parse_endpoint(value, port)
+            if endpoint not in result:
+                result.append(endpoint)
+        return result
+    return addresses
+
+
+class EndpointStats:
+    def __init__(self):
+        self.rtt: Optional[float] = None
+        self.failures = 0
+        self.down_until = 0.0
+        self.last_ok: Optional[float] = None
+
+    def record_success(self, rtt: float):
+        self.rtt = rtt if self.rtt is None else RTT_SMOOTHING * rtt + (1 - RTT_SMOOTHING) * self.rtt
+        self.failures = 0
+        self.down_until = 0.0
+        self.last_ok = time.time()
+
+    def record_failure(self):
+        self.failures += 1
+        # Back off 5s, 10s, 20s... so a dead path isn't retried on every check
+        self.down_until = time.monotonic() + min(5 * 2 ** (self.failures - 1), MAX_COOLDOWN)
+
+
+class ServerEndpoints:
+    """Query a server over whichever of its addresses works best
+
+    The endpoint with the lowest recent RTT is tried first. If it fails, or
+    no endpoint has a track record yet, or race_interval has passed since the
+    last race, every candidate is queried at once and the first answer wins.
+    The losers keep running in the background so their RTTs stay current.
+    Failed endpoints sit out an increasing cooldown unless nothing else is
+    left.
+    """
+
+    def __init__(self, source: Callable[[], List[Tuple[str, int]]], timeout: float = 3.0,
+                 race_interval: float = 300):
+        self.source = source
+        self.timeout = timeout
+        self.race_interval = race_interval
+        self.stats: Dict[Tuple[str, int], EndpointStats] = {}
+        self.current: Optional[Tuple[str, int]] = None
+        self._last_race = 0.0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: Dict, **kwargs) -> 'ServerEndpoints':
+        return cls(endpoints_from_config(config), **kwargs)
+
+    def _stats(self, endpoint: Tuple[str, int]) -> EndpointStats:
+        with self._lock:
+            return self.stats.setdefault(endpoint, EndpointStats())
+
+    def ranked(self) -> List[Tuple[str, int]]:
+        """Endpoints best first: measured by RTT, then unmeasured, then those cooling down"""
+        now = time.monotonic()
+
+        def key(endpoint):
+            stats = self._stats(endpoint)
+            cooling = stats.down_until > now
+            return (cooling, stats.rtt is None, stats.rtt or 0)
+
+        return sorted(self.source(), key=key)
+
+    def _query(self, endpoint: Tuple[str, int]):
+        start = time.perf_counter()
+        try:
+            status = JavaServer(endpoint[0], endpoint[1], timeout=self.timeout).status()
+        except Exception:
+            self._stats(endpoint).record_failure()
+            raise
+        self._stats(endpoint).record_success((time.perf_counter() - start) * 1000)
+        return status
+
+    def _race(self, endpoints: List[Tuple[str, int]]):
+        """Query all endpoints at once, return (status, endpoint) of the first to answer"""
+        futures = {_probe_pool.submit(self._query, endpoint): endpoint for endpoint in endpoints}
+        pending = set(futures)
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    return future.result(), futures[future]
+                except Exception as e:
+                    error = e
+        raise error or ConnectionError("no endpoints configured")
+
+    def status(self) -> Tuple[object, Tuple[str, int]]:
+        """Server status and the (host, port) that answered, raises if every endpoint fails"""
+        candidates = self.ranked()
+        if not candidates:
+            raise ConnectionError("no endpoints configured")
+
+        now = time.monotonic()
+        best = candidates[0]
+        best_stats = self._stats(best)
+        healthy = best_stats.rtt is not None and best_stats.down_until <= now
+        race_due = len(candidates) > 1 and now - self._last_race > self.race_interval
+
+        if healthy and not race_due:
+            try:
+                return self._use(self._query(best), best)
+            except Exception as e:
+                logger.warning(f"Endpoint {best[0]}:{best[1]} failed ({e}), failing over")
+                candidates = candidates[1:] or candidates
+
+        # Skip endpoints in cooldown unless they are all that is left
+        available = [c for c in candidates if self._stats(c).down_until <= now] or candidates
+        self._last_race = now
+        status, endpoint = self._race(available)
+        return self._use(status, endpoint)
+
+    def _use(self, status, endpoint: Tuple[str, int]):
+        if endpoint != self.current:
+            if self.current:
+                logger.info(f"Switched server endpoint {self.current[0]}:{self.current[1]} -> {endpoint[0]}:{endpoint[1]}")
+            self.current = endpoint
+        return status, endpoint
+
+    def summary(self) -> List[Dict]:
+        """Per-endpoint RTT and health, best first"""
+        now = time.monotonic()
+        result = []
+        for endpoint in self.ranked():
+            stats = self._stats(endpoint)
+            result.append({
+                "address": f"{endpoint[0]}:{endpoint[1]}",
+                "rtt_ms": stats.rtt,
+                "failures": stats.failures,
+                "up": stats.down_until <= now and stats.rtt is not None,
+                "current": endpoint == self.current
+            })
+        return result
@@ -0,0 +1,157 @@
+import json
+import time
+import asyncio
+import logging
+import threading
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Event types
+STATUS = 'status'    # server went online or offline, or the player count or version changed
+JOIN = 'join'
+LEAVE = 'leave'
+ALERT = 'alert'      # something the admins are warned about
+SERVER = 'server'    # server process started, stopped or restarted
+JOB = 'job'          # job queued, progress, finished
+LAGGED = 'lagged'    # sent to a client in place of the events it was too slow to take
+
+EVENT_TYPES = (STATUS, JOIN, LEAVE, ALERT, SERVER, JOB)
+
+# Listed by servers in place of players who hide from the status response
+ANONYMOUS_PLAYER = 'Anonymous Player'
+
+
+class Event:
+    def __init__(self, event_id: int, event_type: str, data: Dict):
+        self.id = event_id
+        self.type = event_type
+        self.data = data
+        self.ts = time.time()
+        # Serialized once and shared by every client
+        self.json = json.dumps({"id": event_id, "type": event_type, "ts": self.ts, "data": data},
+                               separators=(',', ':'))
+
+
+class Subscription:
+    """One client's bounded queue, owned by the event loop the client is served on
+
+    When the queue is full the oldest event is dropped, the client gets a
+    lagged event with the number it missed before the next one it receives.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, maxsize: int, types: Optional[Set[str]] = None):
+        self.loop = loop
+        self.types = types
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.dropped = 0
+        self.closed = False
+
+    def _put(self, event: Optional[Event]):
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(event)
+
+    def close(self):
+        """Wake the client with end-of-stream, call from the subscription's loop"""
+        self.closed = True
+        self._put(None)
+
+    async def get(self) -> Optional[Event]:
+        """The next event, a lagged event if some were dropped, None once closed"""
+        if self.dropped and not self.closed:
+            dropped, self.dropped = self.dropped, 0
+            return Event(0, LAGGED, {"dropped": dropped})
+        return await self.queue.get()
+
+
+class EventBus:
+    """In-process stream of server events for the API's live endpoint
+
+    Publishers call publish() from any thread. Each event is serialized
+    once, kept in a short replay buffer for clients resuming with
+    Last-Event-ID, and handed to every subscriber's own bounded queue on the
+    subscriber's event loop, so a slow client only ever loses its own
+    oldest events and never holds up the publisher or other clients.
+    """
+
+    def __init__(self, replay: int = 100):
+        self._lock = threading.Lock()
+        self._next_id = 1
+        self._recent: deque = deque(maxlen=replay)
+        self._subscribers: List[Subscription] = []
+        self._previous: Optional[Dict] = None
+
+    def publish(self, event_type: str, **data) -> Event:
+        with self._lock:
+            event = Event(self._next_id, event_type, data)
+            self._next_id += 1
+            self._recent.append(event)
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            if subscription.types is None or event_type in subscription.types:
+                try:
+                    subscription.loop.call_soon_threadsafe(subscription._put, event)
+                except RuntimeError:
+                    # The subscriber's loop has been closed
+                    self.unsubscribe(subscription)
+        return event
+
+    def subscribe(self, maxsize: int = 100, types: Optional[Iterable[str]] = None,
+                  last_event_id: Optional[int] = None) -> Subscription:
+        """Subscribe from the running loop, replaying buffered events after last_event_id"""
+        subscription = Subscription(asyncio.get_running_loop(), maxsize, set(types) if types else None)
+        with self._lock:
+            if last_event_id is not None:
+                for event in self._recent:
+                    if event.id > last_event_id and (subscription.types is None or event.type in subscription.types):
+                        subscription._put(event)
+            self._subscribers.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            if subscription in self._subscribers:
+                self._subscribers.remove(subscription)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def on_snapshot(self, snapshot: Dict):
+        """StatusCache subscriber, publishes status changes, joins and leaves"""
+        previous, self._previous = self._previous, snapshot
+        for event_type, data in snapshot_events(previous, snapshot):
+            self.publish(event_type, **data)
+
+
+def listed_players(snapshot: Dict) -> Optional[Set[str]]:
+    """Names of everyone online, None if the status response only lists some of them
+
+    Servers list at most 12 players, a different random 12 on every probe,
+    so a partial list can't be compared with the previous one.
+    """
+    if len(snapshot['players']) != snapshot['players_online']:
+        return None
+    return set(snapshot['players']) - {ANONYMOUS_PLAYER}
+
+
+def snapshot_events(previous: Optional[Dict], snapshot: Dict) -> List[Tuple[str, Dict]]:
+    """Events between two status snapshots, joins and leaves only when both list every player"""
+    keys = ('online', 'players_online', 'players_max', 'version')
+    if previous is not None and all(previous[key] == snapshot[key] for key in keys) \
+            and previous['players'] == snapshot['players']:
+        return []
+
+    events = []
+    if previous is None or any(previous[key] != snapshot[key] for key in keys):
+        events.append((STATUS, {key: snapshot[key] for key in keys + ('latency',)}))
+    if previous is not None and previous['online'] and snapshot['online']:
+        before, after = listed_players(previous), listed_players(snapshot)
+        if before is None or after is None:
+            return events
+        events.extend((JOIN, {"player": name}) for name in sorted(after - before))
+        events.extend((LEAVE, {"player": name}) for name in sorted(before - after))
+    return events
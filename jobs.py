@@ -0,0 +1,176 @@
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional
+
+from events import JOB, EventBus
+
+logger = logging.getLogger(__name__)
+
+# Mutual-exclusion classes, jobs sharing a class never run at the same time
+SERVER = 'server'  # starting, stopping or replacing the server process
+WORLD = 'world'    # reading or writing the world files
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+STATUS_ICONS = {QUEUED: '⏳', RUNNING: '⚙️', DONE: '✅', FAILED: '❌', CANCELLED: '🚫'}
+
+# Discord rate-limits message edits, progress in between is dropped
+EDIT_INTERVAL = 2.0
+
+
+class Job:
+    def __init__(self, job_id: int, name: str, classes: Iterable[str], cancellable: bool,
+                 message=None, requested_by: Optional[str] = None, events: Optional[EventBus] = None):
+        self.id = job_id
+        self.name = name
+        self.classes = sorted(set(classes))
+        self.cancellable = cancellable
+        self.message = message
+        self.requested_by = requested_by
+        self.status = QUEUED
+        self.progress = None
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.task: Optional[asyncio.Task] = None
+        self.events = events
+        self._last_edit = 0.0
+        self._published = None
+
+    def describe(self) -> str:
+        text = f"{STATUS_ICONS[self.status]} Job `#{self.id}` {self.name}: {self.status}"
+        if self.progress:
+            text += f" - {self.progress}"
+        if self.error:
+            text += f" ({self.error})"
+        return text
+
+    async def report(self, progress: str, force: bool = False):
+        """Set the progress text and edit the job's message, at most every EDIT_INTERVAL seconds"""
+        self.progress = progress
+        self.publish()
+        if not self.message:
+            return
+        now = time.monotonic()
+        if not force and now - self._last_edit < EDIT_INTERVAL:
+            return
+        self._last_edit = now
+        try:
+            await self.message.edit(content=self.describe())
+        except Exception as e:
+            logger.warning(f"Failed to update message for job #{self.id}: {e}")
+
+    def publish(self):
+        """Send the job's state to the event bus, unthrottled but only when it changed"""
+        state = (self.status, self.progress, self.error)
+        if self.events is None or state == self._published:
+            return
+        self._published = state
+        self.events.publish(JOB, id=self.id, name=self.name, status=self.status,
+                            progress=self.progress, error=self.error)
+
+
+class JobQueue:
+    """Run long operations in the background, one at a time per exclusion class
+
+    A job waits until it holds the lock of every class it belongs to, locks
+    are taken in sorted order so two jobs can't deadlock and asyncio.Lock is
+    FIFO, so jobs start in the order they were submitted. Submitting a job
+    while one with the same name is queued or running returns the existing
+    job instead of starting a second copy.
+    """
+
+    def __init__(self, history: int = 20, events: Optional[EventBus] = None):
+        self.events = events
+        self._next_id = 1
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._active: Dict[int, Job] = {}
+        self._history = deque(maxlen=history)
+
+    def submit(self, name: str, func: Callable[[Job], Awaitable], classes: Iterable[str],
+               cancellable: bool = False, message=None, requested_by: Optional[str] = None) -> Job:
+        """Queue func(job), returns the Job, or the matching one already queued or running
+
+        func reports progress with job.report() and may return a summary string.
+        """
+        existing = self.pending(name)
+        if existing:
+            return existing
+
+        job = Job(self._next_id, name, classes, cancellable, message, requested_by, self.events)
+        job.publish()
+        self._next_id += 1
+        self._active[job.id] = job
+        job.task = asyncio.create_task(self._run(job, func), name=f"job-{job.id}-{name}")
+        logger.info(f"Queued job #{job.id} {name}")
+        return job
+
+    async def _run(self, job: Job, func: Callable[[Job], Awaitable]):
+        held = []
+        try:
+            blocking = self.conflicts(job)
+            if blocking:
+                await job.report(f"waiting for {', '.join(f'#{j.id} {j.name}' for j in blocking)}", force=True)
+            for name in job.classes:
+                lock = self._locks.setdefault(name, asyncio.Lock())
+                await lock.acquire()
+                held.append(lock)
+
+            job.status = RUNNING
+            job.started_at = time.time()
+            logger.info(f"Running job #{job.id} {job.name}")
+            await job.report("started", force=True)
+            job.result = await func(job)
+            job.status = DONE
+        except asyncio.CancelledError:
+            job.status = CANCELLED
+        except Exception as e:
+            logger.error(f"Job #{job.id} {job.name} failed: {e}")
+            job.status = FAILED
+            job.error = str(e)
+        finally:
+            for lock in reversed(held):
+                lock.release()
+            job.finished_at = time.time()
+            self._active.pop(job.id, None)
+            self._history.append(job)
+            # A job's function can return a summary to show in place of its progress
+            await job.report(job.result if job.status == DONE and isinstance(job.result, str) else None,
+                             force=True)
+        return job.result
+
+    def conflicts(self, job: Job) -> List[Job]:
+        """Earlier jobs that share an exclusion class with job"""
+        return [other for other in self._active.values()
+                if other.id < job.id and set(other.classes) & set(job.classes)]
+
+    def get(self, job_id: int) -> Optional[Job]:
+        if job_id in self._active:
+            return self._active[job_id]
+        return next((job for job in self._history if job.id == job_id), None)
+
+    def cancel(self, job_id: int) -> str:
+        """Cancel a queued job, or a running one that allows it, returns a message for the user"""
+        job = self._active.get(job_id)
+        if job is None:
+            return f"❌ No queued or running job `#{job_id}`"
+        if job.status == RUNNING and not job.cancellable:
+            return f"❌ Job `#{job_id}` {job.name} can't be cancelled once it has started"
+        job.task.cancel()
+        return f"🚫 Cancelled job `#{job_id}` {job.name}"
+
+    def jobs(self) -> List[Job]:
+        """Running and queued jobs in order, then recently finished ones, newest first"""
+        return sorted(self._active.values(), key=lambda j: j.id) + list(reversed(self._history))
+
+    def pending(self, name: str) -> Optional[Job]:
+        """The queued or running job called name, if any"""
+        return next((job for job in self._active.values() if job.name == name), None)
@@ -0,0 +1,98 @@
+import os
+import gc
+import ctypes
+import ctypes.util
+import logging
+from typing import Dict, Optional
+
+import discord
+import psutil
+
+logger = logging.getLogger(__name__)
+
+
+def low_memory_enabled() -> bool:
+    """LOW_MEMORY_MODE env var, off unless set to true/1/yes"""
+    return os.getenv('LOW_MEMORY_MODE', 'false').strip().lower() in ('true', '1', 'yes', 'on')
+
+
+def bot_options(low_memory: bool) -> Dict:
+    """Keyword arguments for commands.Bot
+
+    In low-memory mode the client keeps only what prefix commands need:
+    guild and channel data (for get_channel and permissions) and guild and
+    direct messages with their content. discord.py's 1000-message cache, the member
+    cache and guild chunking are turned off, and so are the intents for
+    presences, reactions, typing, voice, emojis and the like, so their
+    events are never sent to us or parsed.
+    """
+    if not low_memory:
+        intents = discord.Intents.default()
+        intents.message_content = True
+        return {"intents": intents}
+
+    intents = discord.Intents.none()
+    intents.guilds = True
+    intents.guild_messages = True
+    # Commands sent by DM keep working
+    intents.dm_messages = True
+    intents.message_content = True
+    return {
+        "intents": intents,
+        "max_messages": None,
+        "member_cache_flags": discord.MemberCacheFlags.none(),
+        "chunk_guilds_at_startup": False
+    }
+
+
+def trim_memory():
+    """Collect garbage and hand freed heap pages back to the OS (glibc only)"""
+    gc.collect()
+    libc_name = ctypes.util.find_library('c')
+    if not libc_name:
+        return
+    try:
+        libc = ctypes.CDLL(libc_name)
+        if hasattr(libc, 'malloc_trim'):
+            libc.malloc_trim(0)
+    except OSError as e:
+        logger.debug(f"malloc_trim unavailable: {e}")
+
+
+def memory_report(bot: discord.Client, server_pid: Optional[int] = None) -> Dict:
+    """What the bot process holds: RSS, discord.py caches and Python objects"""
+    process = psutil.Process()
+    report = {
+        "rss": process.memory_info().rss,
+        "messages": len(bot.cached_messages),
+        "guilds": len(bot.guilds),
+        "channels": sum(len(guild.channels) for guild in bot.guilds),
+        "members": sum(len(guild.members) for guild in bot.guilds),
+        "users": len(bot.users),
+        "emojis": len(bot.emojis),
+        "stickers": len(bot.stickers),
+        "python_objects": len(gc.get_objects())
+    }
+    if server_pid:
+        try:
+            report["server_rss"] = psutil.Process(server_pid).memory_info().rss
+        except psutil.Error:
+            pass
+    return report
+
+
+def memory_embed(report: Dict, low_memory: bool) -> discord.Embed:
+    embed = discord.Embed(
+        title="🧠 Bot Memory",
+        description="Low-memory mode" if low_memory else "Default discord.py caches",
+        color=0x0099ff
+    )
+    embed.add_field(name="Bot RSS", value=f"{report['rss'] / 1024 / 1024:.1f} MB", inline=True)
+    if "server_rss" in report:
+        embed.add_field(name="Server RSS", value=f"{report['server_rss'] / 1024 / 1024:.1f} MB", inline=True)
+    embed.add_field(name="Python Objects", value=f"{report['python_objects']:,}", inline=True)
+    embed.add_field(name="Cached Messages", value=str(report['messages']), inline=True)
+    embed.add_field(name="Guilds / Channels", value=f"{report['guilds']} / {report['channels']}", inline=True)
+    embed.add_field(name="Members / Users", value=f"{report['members']} / {report['users']}", inline=True)
+    embed.add_field(name="Emojis / Stickers", value=f"{report['emojis']} / {report['stickers']}", inline=True)
+    return embed
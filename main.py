@@ -16,6 +16,10 @@ import sys
 import logging
 import json
 import time
+import signal
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 # Add current directory to Python path
@@ -23,7 +27,9 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from minecraft_bot import MinecraftServerBot
 from radmin_vpn_manager import RadminVPNManager, setup_radmin_for_minecraft
-from service_manager import ServiceManager
+from service_manager import ServiceManager, report_progress, report_status
+from metrics import start_metrics_server
+from config_store import get_config_store
 
 # Setup logging
 logging.basicConfig(
@@ -36,25 +42,89 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+class BotProcessService:
+    """The Discord bot as a process service
+    
+    Only the config path is handed to the child, the bot is built there, so
+    this also starts under spawn (the only start method on Windows), which
+    pickles the service and its arguments.
+    """
+    
+    def __init__(self, config_path):
+        self.config_path = config_path
+        self.minecraft_bot = None
+        self.loop = None
+        self.heartbeat_task = None
+    
+    async def send_heartbeats(self, interval):
+        """Heartbeat from the bot's event loop, stops as soon as something blocks the loop"""
+        while True:
+            report_progress()
+            await asyncio.sleep(interval)
+    
+    def run(self):
+        config_store = get_config_store(self.config_path)
+        self.minecraft_bot = MinecraftServerBot()
+        
+        async def on_ready():
+            self.loop = asyncio.get_running_loop()
+            report_status(ready=True)
+            if self.heartbeat_task is None or self.heartbeat_task.done():
+                interval = config_store.config.get('services', {}).get('heartbeat_interval', 5)
+                self.heartbeat_task = asyncio.get_running_loop().create_task(self.send_heartbeats(interval))
+        
+        self.minecraft_bot.add_ready_listener(on_ready)
+        self.minecraft_bot.run()
+    
+    def stop(self):
+        """Close the Discord connection so run() returns, a bot that never connected is terminated instead"""
+        if self.loop and not self.loop.is_closed():
+            asyncio.run_coroutine_threadsafe(self.minecraft_bot.bot.close(), self.loop)
+
+class RadminMonitorProcessService:
+    """The Radmin VPN monitor as a process service, rebuilt from the config path like BotProcessService"""
+    
+    def __init__(self, config_path):
+        self.config_path = config_path
+        self.stop_event = threading.Event()
+    
+    def run(self):
+        config = get_config_store(self.config_path).config
+        radmin_manager = RadminVPNManager(config['radmin_vpn'])
+        while not self.stop_event.is_set():
+            radmin_manager.monitor_connection()
+            report_progress()
+            self.stop_event.wait(config.get('radmin_vpn', {}).get('check_interval', 300))
+    
+    def stop(self):
+        self.stop_event.set()
+
 class MinecraftBotService:
     def __init__(self):
         self.config = self.load_config()
-        self.service_manager = ServiceManager()
+        self.runtime = self.config.get('services', {}).get('runtime', 'threads')
+        # In the asyncio runtime signals are handled on the event loop instead
+        self.service_manager = ServiceManager(install_signal_handlers=self.runtime != 'asyncio')
         self.minecraft_bot = None
         self.radmin_manager = None
         self.running = False
+        self.bot_ready = threading.Event()
+        self.bot_heartbeat_task = None
+        self.metrics_server = None
         
     def load_config(self):
-        """Load configuration from config.json"""
-        try:
-            with open('config.json', 'r') as f:
-                return json.load(f)
-        except FileNotFoundError:
-            logger.error("config.json not found! Please create it first.")
-            return {}
-        except json.JSONDecodeError:
-            logger.error("Invalid JSON in config.json!")
-            return {}
+        """Get the live configuration shared through the config store"""
+        self.config_store = get_config_store()
+        self.config_store.subscribe(self.on_config_change)
+        return self.config_store.config
+    
+    def on_config_change(self, changes, config):
+        """Apply new heartbeat deadlines to registered services"""
+        if 'services.runtime' in changes or 'services.execution_mode' in changes:
+            logger.warning("Service runtime settings changed, they take effect after a restart")
+        for name, timeout in self.heartbeat_timeouts().items():
+            if name in self.service_manager.services:
+                self.service_manager.services[name]['heartbeat_timeout'] = timeout
     
     def setup_radmin_vpn(self):
         """Setup Radmin VPN for Minecraft server"""
@@ -90,6 +160,8 @@ class MinecraftBotService:
         try:
             logger.info("Setting up Minecraft server bot...")
             self.minecraft_bot = MinecraftServerBot()
+            # Registered once, the bot passes it on to the client it builds for each run
+            self.minecraft_bot.add_ready_listener(self.on_bot_ready)
             logger.info("Minecraft server bot setup completed")
             return True
             
@@ -97,46 +169,121 @@ class MinecraftBotService:
             logger.error(f"Failed to setup Minecraft bot: {e}")
             return False
     
-    def start(self):
-        """Start the Minecraft bot service"""
-        logger.info("Starting Minecraft Bot Service...")
+    def setup(self):
+        """Setup Radmin VPN, the Minecraft bot and the metrics endpoint"""
+        metrics_config = self.config.get('metrics', {})
+        if metrics_config.get('enabled', False) and not self.metrics_server:
+            self.metrics_server = start_metrics_server(
+                metrics_config.get('host', '127.0.0.1'),
+                metrics_config.get('port', 9225)
+            )
         
         # Setup Radmin VPN first
         if not self.setup_radmin_vpn():
             logger.error("Failed to setup Radmin VPN, continuing without it...")
         
+        # In process mode the bot is built in its own process
+        if self.config.get('services', {}).get('execution_mode', 'thread') == 'process':
+            return True
+        
         # Setup Minecraft bot
         if not self.setup_minecraft_bot():
             logger.error("Failed to setup Minecraft bot")
             return False
+        return True
+    
+    def start(self):
+        """Start the Minecraft bot service"""
+        logger.info("Starting Minecraft Bot Service...")
+        
+        if not self.setup():
+            return False
+        
+        # Services run as threads by default, or each in its own process
+        services_config = self.config.get('services', {})
+        execution_mode = services_config.get('execution_mode', 'thread')
+        memory_limits = services_config.get('memory_limit_mb', {})
+        heartbeat_timeouts = self.heartbeat_timeouts()
         
-        # Register services with service manager
+        # Process services get module-level entry points, the bound methods below can't be pickled
+        process_mode = execution_mode == 'process'
+        service_args = (self.config_store.path,) if process_mode else ()
+        
+        # Register services with service manager, the bot waits for the VPN to come up
         self.service_manager.register_service(
             'minecraft_bot',
-            self.run_minecraft_bot
+            BotProcessService if process_mode else self.run_minecraft_bot,
+            *service_args,
+            execution_mode=execution_mode,
+            memory_limit_mb=memory_limits.get('minecraft_bot'),
+            depends_on=['radmin_vpn'] if self.radmin_manager else [],
+            readiness_probe=self.minecraft_bot_ready,
+            ready_timeout=services_config.get('ready_timeout', 60),
+            heartbeat_timeout=heartbeat_timeouts['minecraft_bot']
         )
         
         if self.radmin_manager:
             self.service_manager.register_service(
                 'radmin_vpn',
-                self.run_radmin_monitor
+                RadminMonitorProcessService if process_mode else self.run_radmin_monitor,
+                *service_args,
+                execution_mode=execution_mode,
+                memory_limit_mb=memory_limits.get('radmin_vpn'),
+                readiness_probe=self.radmin_manager.is_radmin_running,
+                ready_timeout=services_config.get('ready_timeout', 60),
+                heartbeat_timeout=heartbeat_timeouts['radmin_vpn']
             )
         
+        # Set before starting so process services inherit it
+        self.running = True
+        
         # Start all services
         self.service_manager.start_all_services()
         
         # Start monitoring
         self.service_manager.start_monitoring()
         
-        self.running = True
         logger.info("Minecraft Bot Service started successfully")
         
         return True
     
+    def heartbeat_timeouts(self):
+        """Seconds each service may go without a heartbeat before the watchdog restarts it"""
+        configured = self.config.get('services', {}).get('heartbeat_timeout', {})
+        check_interval = self.config.get('radmin_vpn', {}).get('check_interval', 300)
+        return {
+            'minecraft_bot': configured.get('minecraft_bot', 60),
+            # The monitor only beats once per check, allow a full interval plus the check itself
+            'radmin_vpn': configured.get('radmin_vpn', check_interval + 120)
+        }
+    
+    async def send_bot_heartbeats(self):
+        """Heartbeat from the bot's event loop, stops as soon as something blocks the loop"""
+        while True:
+            self.service_manager.heartbeat('minecraft_bot')
+            await asyncio.sleep(self.service_manager.heartbeat_interval)
+    
+    def start_bot_heartbeats(self):
+        """Start sending heartbeats on the bot's current loop, once per loop"""
+        task = self.bot_heartbeat_task
+        if task and not task.done() and task.get_loop() is asyncio.get_running_loop():
+            return
+        self.bot_heartbeat_task = asyncio.get_running_loop().create_task(self.send_bot_heartbeats())
+    
+    def minecraft_bot_ready(self):
+        """Readiness probe: the bot has connected to Discord"""
+        return (self.bot_ready.is_set() or
+                self.service_manager.get_status_report('minecraft_bot').get('ready', False))
+    
+    async def on_bot_ready(self):
+        self.bot_ready.set()
+        self.start_bot_heartbeats()
+    
     def run_minecraft_bot(self):
         """Run the Minecraft bot"""
         try:
             if self.minecraft_bot:
+                self.bot_ready.clear()
                 self.minecraft_bot.run()
         except Exception as e:
             logger.error(f"Minecraft bot error: {e}")
@@ -147,11 +294,102 @@ class MinecraftBotService:
         try:
             while self.running and self.radmin_manager:
                 self.radmin_manager.monitor_connection()
+                self.service_manager.heartbeat('radmin_vpn')
                 time.sleep(self.config.get('radmin_vpn', {}).get('check_interval', 300))
         except Exception as e:
             logger.error(f"Radmin VPN monitor error: {e}")
             raise
     
+    async def run_minecraft_bot_async(self):
+        """Run the Minecraft bot as a task on the shared event loop"""
+        self.bot_ready.clear()
+        await self.minecraft_bot.run_async()
+    
+    async def run_radmin_monitor_async(self):
+        """Monitor Radmin VPN connection without holding a thread between checks"""
+        while self.running and self.radmin_manager:
+            await asyncio.to_thread(self.radmin_manager.monitor_connection)
+            self.service_manager.heartbeat('radmin_vpn')
+            await asyncio.sleep(self.config.get('radmin_vpn', {}).get('check_interval', 300))
+    
+    async def run_health_checks_async(self):
+        """Periodic health check task for the asyncio runtime"""
+        while self.running:
+            await asyncio.sleep(60)
+            health = await asyncio.to_thread(self.service_manager.health_check)
+            if health["overall_status"] != "healthy":
+                logger.warning(f"System health: {health['overall_status']}")
+    
+    async def run_async(self):
+        """Run the bot, monitors and supervision as tasks on one event loop
+        
+        Blocking work (server queries, process scans, backups) goes to the
+        loop's default executor, which is capped at services.executor_workers
+        threads.
+        """
+        loop = asyncio.get_running_loop()
+        services_config = self.config.get('services', {})
+        loop.set_default_executor(ThreadPoolExecutor(
+            max_workers=services_config.get('executor_workers', 4),
+            thread_name_prefix="blocking"
+        ))
+        
+        stop_event = asyncio.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(signum, stop_event.set)
+            except NotImplementedError:
+                # Windows event loops have no add_signal_handler
+                signal.signal(signum, lambda *_: loop.call_soon_threadsafe(stop_event.set))
+        
+        logger.info("Starting Minecraft Bot Service (asyncio runtime)...")
+        if not await asyncio.to_thread(self.setup):
+            logger.error("Failed to start service")
+            return
+        
+        ready_timeout = services_config.get('ready_timeout', 60)
+        heartbeat_timeouts = self.heartbeat_timeouts()
+        self.service_manager.register_service(
+            'minecraft_bot',
+            self.run_minecraft_bot_async,
+            execution_mode='task',
+            depends_on=['radmin_vpn'] if self.radmin_manager else [],
+            readiness_probe=self.bot_ready.is_set,
+            ready_timeout=ready_timeout,
+            heartbeat_timeout=heartbeat_timeouts['minecraft_bot']
+        )
+        if self.radmin_manager:
+            self.service_manager.register_service(
+                'radmin_vpn',
+                self.run_radmin_monitor_async,
+                execution_mode='task',
+                readiness_probe=self.radmin_manager.is_radmin_running,
+                ready_timeout=ready_timeout,
+                heartbeat_timeout=heartbeat_timeouts['radmin_vpn']
+            )
+        
+        self.running = True
+        health_task = loop.create_task(self.run_health_checks_async(), name="health-check")
+        self.service_manager.start_watchdog()
+        try:
+            startup = loop.create_task(self.service_manager.start_task_services())
+            await stop_event.wait()
+            startup.cancel()
+            logger.info("Received shutdown signal")
+        finally:
+            self.running = False
+            self.service_manager.stop_watchdog()
+            health_task.cancel()
+            # Cancelling the bot task closes its Discord connection on the way out
+            await self.service_manager.stop_task_services()
+            await asyncio.gather(health_task, return_exceptions=True)
+            if self.minecraft_bot:
+                self.minecraft_bot.backup_manager.shutdown()
+            if self.metrics_server:
+                await asyncio.to_thread(self.metrics_server.shutdown)
+                self.metrics_server = None
+            logger.info("Minecraft Bot Service stopped")
+    
     def stop(self):
         """Stop the Minecraft bot service"""
         logger.info("Stopping Minecraft Bot Service...")
@@ -162,6 +400,10 @@ class MinecraftBotService:
         self.service_manager.stop_all_services()
         self.service_manager.stop_monitoring()
         
+        if self.metrics_server:
+            self.metrics_server.shutdown()
+            self.metrics_server = None
+        
         logger.info("Minecraft Bot Service stopped")
     
     def run_forever(self):
@@ -205,7 +447,10 @@ def main():
     service = MinecraftBotService()
     
     try:
-        service.run_forever()
+        if service.runtime == 'asyncio':
+            asyncio.run(service.run_async())
+        else:
+            service.run_forever()
     except Exception as e:
         logger.error(f"Fatal error: {e}")
         sys.exit(1)
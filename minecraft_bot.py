@@ -3,6 +3,7 @@ from discord.ext import commands, tasks
 import asyncio
 import subprocess
 import psutil
+import io
 import json
 import logging
 import time
@@ -11,6 +12,23 @@ import schedule
 from mcstatus import JavaServer
 import requests
 from datetime import datetime, timedelta
+from backup_manager import BackupManager
+from config_store import get_config_store
+from process_registry import registry
+from service_manager import ProcessWatcher
+from radmin_vpn_manager import RADMIN_PROCESS
+from vpn_stats import get_vpn_sampler
+from endpoints import ServerEndpoints
+from metrics import (REGISTRY, BACKUP_DURATION, BACKUP_FAILURES, JVM_CPU, JVM_RSS,
+                     PLAYERS_MAX, PLAYERS_ONLINE, PROBE_LATENCY)
+from command_perf import CommandPerf, blocking, is_guild_admin, waiting
+from jobs import SERVER, WORLD, JobQueue
+from status_cache import PresenceUpdater, StatusCache
+from status_history import StatusHistory
+from activity import WINDOWS, ActivityAnalyzer, render_heatmap
+from charts import METRICS, WINDOWS as GRAPH_WINDOWS, ChartRenderer
+from status_api import StatusAPI
+from events import ALERT, SERVER as SERVER_EVENT, EventBus
 
 # Setup logging
 logging.basicConfig(
@@ -28,10 +46,42 @@ class MinecraftServerBot:
         self.config = self.load_config()
         self.server_process = None
         self.server_running = False
+        self.stopping_server = False
+        self.process_watcher = ProcessWatcher()
         self.last_restart = None
         self.startup_time = None
-        
-        # Discord bot setup
+        self.backup_manager = BackupManager(self.config)
+        self.loop = None
+        self.vpn_stats = get_vpn_sampler(self.config)
+        self.endpoints = ServerEndpoints.from_config(self.config)
+        self.events = EventBus()
+        self.jobs = JobQueue(events=self.events)
+        self.status_cache = StatusCache(self.probe_server, ttl=15)
+        self.status_cache.subscribe(self.events.on_snapshot)
+        self.history = StatusHistory.from_config(self.config)
+        self.activity = ActivityAnalyzer(self.history)
+        self.charts = ChartRenderer(self.history)
+        self.api = StatusAPI(self.status_cache, self.history, self.config, self.events)
+        self.status_cache.subscribe(self.record_history)
+        REGISTRY.add_collector(self.collect_metrics)
+        
+        self.perf = CommandPerf()
+        self.presence = PresenceUpdater(
+            None, self.status_cache,
+            lambda: self.config['minecraft'].get('server_name') or self.config['minecraft'].get('server_host', 'localhost'),
+            lambda: self.config.get('monitoring', {}).get('health_check_interval', 60)
+        )
+        self.ready_listeners = []
+        self.create_bot()
+        
+        self.config_store.subscribe(self.on_config_change)
+        
+    def create_bot(self):
+        """Build a new Discord client with the bot's events and commands
+        
+        A client binds its event loop and HTTP session on its first run, so
+        every run after the first gets a new client instead of reusing it.
+        """
         intents = discord.Intents.default()
         intents.message_content = True
         # Disable privileged intents to avoid permission issues
@@ -39,32 +89,83 @@ class MinecraftServerBot:
         intents.members = False
         intents.presences = False
         self.bot = commands.Bot(command_prefix=self.config['discord']['prefix'], intents=intents)
+        self.perf.install(self.bot, self.is_admin)
+        self.presence.bot = self.bot
         
         # Setup bot events and commands
         self.setup_events()
         self.setup_commands()
+        for listener in self.ready_listeners:
+            self.bot.add_listener(listener, 'on_ready')
+    
+    def add_ready_listener(self, listener):
+        """Call listener on every on_ready, of this client and of the ones built for later runs"""
+        self.ready_listeners.append(listener)
+        self.bot.add_listener(listener, 'on_ready')
         
     def load_config(self):
-        """Load configuration from config.json"""
-        try:
-            with open('config.json', 'r') as f:
-                return json.load(f)
-        except FileNotFoundError:
-            logger.error("config.json not found!")
-            return {}
-        except json.JSONDecodeError:
-            logger.error("Invalid JSON in config.json!")
-            return {}
+        """Get the live configuration shared through the config store"""
+        self.config_store = get_config_store()
+        return self.config_store.config
+    
+    def on_config_change(self, changes, config):
+        """Apply config changes that need more than reading self.config again"""
+        if any(key.startswith('backup.') or key in ('minecraft.backup_path', 'minecraft.server_path')
+               for key in changes):
+            self.backup_manager.apply_config(config)
+        
+        if any(key.startswith('history.') for key in changes):
+            self.history.apply_config(config)
+        if any(key.startswith('api.') for key in changes):
+            self.api.apply_config(config)
+        
+        if 'discord.prefix' in changes:
+            self.bot.command_prefix = config['discord']['prefix']
+        if 'discord.bot_token' in changes:
+            logger.warning("Discord bot token changed, it takes effect after a restart")
+        
+        # Task loops belong to the bot's event loop, this runs on the config watcher thread
+        if self.loop and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self.apply_loop_settings)
+    
+    def apply_loop_settings(self):
+        """Set task loop intervals from the config and start or stop the VPN check"""
+        self.health_check.change_interval(
+            seconds=self.config.get('monitoring', {}).get('health_check_interval', 60))
+        self.verify_backups.change_interval(
+            seconds=self.config.get('backup', {}).get('verify_interval', 21600))
+        
+        radmin_enabled = self.config.get('radmin_vpn', {}).get('enabled', False)
+        if radmin_enabled and not self.radmin_vpn_check.is_running():
+            self.radmin_vpn_check.start()
+            self.vpn_stats.start()
+        elif not radmin_enabled and self.radmin_vpn_check.is_running():
+            self.radmin_vpn_check.cancel()
+            self.vpn_stats.stop()
+    
+    def is_admin(self, ctx):
+        """Commands from the admin channel or from a server administrator"""
+        admin_channel_id = self.config['discord'].get('admin_channel_id')
+        if admin_channel_id and str(ctx.channel.id) == str(admin_channel_id):
+            return True
+        return is_guild_admin(ctx)
     
     def setup_events(self):
         """Setup Discord bot events"""
         @self.bot.event
         async def on_ready():
             logger.info(f'{self.bot.user} has connected to Discord!')
+            self.loop = asyncio.get_running_loop()
+            self.presence.resend()
+            # on_ready fires again after reconnects, only launch the loops once
+            if self.monitor_server.is_running():
+                return
             self.monitor_server.start()
             self.health_check.start()
-            if self.config['radmin_vpn']['enabled']:
-                self.radmin_vpn_check.start()
+            self.verify_backups.start()
+            self.presence.start()
+            self.api.start()
+            self.apply_loop_settings()
         
         @self.bot.event
         async def on_command_error(ctx, error):
@@ -81,12 +182,7 @@ class MinecraftServerBot:
                 await ctx.send("Server is already running!")
                 return
             
-            try:
-                await self.start_minecraft_server()
-                await ctx.send("✅ Minecraft server started successfully!")
-            except Exception as e:
-                logger.error(f"Failed to start server: {e}")
-                await ctx.send(f"❌ Failed to start server: {e}")
+            await self.submit_job(ctx, 'start', self.start_job, (SERVER, WORLD))
         
         @self.bot.command(name='stop')
         async def stop_server(ctx):
@@ -95,22 +191,12 @@ class MinecraftServerBot:
                 await ctx.send("Server is not running!")
                 return
             
-            try:
-                await self.stop_minecraft_server()
-                await ctx.send("✅ Minecraft server stopped successfully!")
-            except Exception as e:
-                logger.error(f"Failed to stop server: {e}")
-                await ctx.send(f"❌ Failed to stop server: {e}")
+            await self.submit_job(ctx, 'stop', self.stop_job, (SERVER, WORLD))
         
         @self.bot.command(name='restart')
         async def restart_server(ctx):
             """Restart the Minecraft server"""
-            try:
-                await self.restart_minecraft_server()
-                await ctx.send("✅ Minecraft server restarted successfully!")
-            except Exception as e:
-                logger.error(f"Failed to restart server: {e}")
-                await ctx.send(f"❌ Failed to restart server: {e}")
+            await self.submit_job(ctx, 'restart', self.restart_job, (SERVER, WORLD))
         
         @self.bot.command(name='status')
         async def server_status(ctx):
@@ -122,6 +208,8 @@ class MinecraftServerBot:
             embed.add_field(name="Players", value=f"{status.get('players_online', 0)}/{status.get('max_players', 0)}", inline=True)
             embed.add_field(name="RAM Usage", value=status.get('ram_usage', 'N/A'), inline=True)
             embed.add_field(name="Last Restart", value=status.get('last_restart', 'N/A'), inline=False)
+            if 'endpoint' in status:
+                embed.add_field(name="Endpoint", value=status['endpoint'], inline=True)
             await ctx.send(embed=embed)
         
         @self.bot.command(name='players')
@@ -146,29 +234,162 @@ class MinecraftServerBot:
         @self.bot.command(name='backup')
         async def create_backup(ctx):
             """Create a server backup"""
-            try:
-                await self.create_server_backup()
-                await ctx.send("✅ Server backup created successfully!")
-            except Exception as e:
-                logger.error(f"Failed to create backup: {e}")
-                await ctx.send(f"❌ Failed to create backup: {e}")
+            await self.submit_job(ctx, 'backup', self.backup_job, (WORLD,))
+        
+        @self.bot.command(name='backups')
+        async def list_backups(ctx, count: int = 10):
+            """List recent backups"""
+            snapshots = await blocking(self.backup_manager.catalog.list_snapshots, count)
+            if not snapshots:
+                await ctx.send("No backups found")
+                return
+            
+            lines = [
+                f"`{s['id']}` {datetime.fromtimestamp(s['created_at']).strftime('%Y-%m-%d %H:%M')} "
+                f"• {s['mode']} • {s['size'] / 1024 / 1024:.1f} MB"
+                for s in snapshots
+            ]
+            embed = discord.Embed(title="🗄️ Server Backups", description="\n".join(lines), color=0x0099ff)
+            await ctx.send(embed=embed)
+        
+        @self.bot.command(name='backupinfo')
+        async def backup_info(ctx, backup_id: int):
+            """Show details of a backup"""
+            snapshot = await blocking(self.backup_manager.catalog.get_snapshot, backup_id)
+            if not snapshot:
+                await ctx.send(f"❌ Backup {backup_id} not found")
+                return
+            
+            embed = discord.Embed(title=f"🗄️ Backup {snapshot['id']}", description=snapshot['name'], color=0x0099ff)
+            embed.add_field(name="Created", value=datetime.fromtimestamp(snapshot['created_at']).strftime("%Y-%m-%d %H:%M:%S"), inline=True)
+            embed.add_field(name="Mode", value=snapshot['mode'], inline=True)
+            embed.add_field(name="Files", value=str(snapshot['file_count']), inline=True)
+            embed.add_field(name="Size", value=f"{snapshot['size'] / 1024 / 1024:.1f} MB", inline=True)
+            embed.add_field(name="Source Size", value=f"{snapshot['source_bytes'] / 1024 / 1024:.1f} MB", inline=True)
+            embed.add_field(name="Duration", value=f"{snapshot['duration']:.1f}s", inline=True)
+            await ctx.send(embed=embed)
+        
+        @self.bot.command(name='findbackup')
+        async def find_backup(ctx, path: str, date: str = None):
+            """Find the newest backup containing a file, optionally as of a date (YYYY-MM-DD)"""
+            as_of = None
+            if date:
+                try:
+                    as_of = (datetime.strptime(date, "%Y-%m-%d") + timedelta(days=1)).timestamp()
+                except ValueError:
+                    await ctx.send("Usage: !findbackup <path> [YYYY-MM-DD]")
+                    return
+            
+            snapshot = await blocking(self.backup_manager.catalog.find_file, path, as_of)
+            if snapshot:
+                created = datetime.fromtimestamp(snapshot['created_at']).strftime("%Y-%m-%d %H:%M")
+                await ctx.send(f"🗄️ `{path}` is in backup `{snapshot['id']}` ({snapshot['name']}, {created})")
+            else:
+                await ctx.send(f"❌ No backup contains `{path}`")
+        
+        @self.bot.command(name='restore')
+        @commands.check(self.is_admin)
+        async def restore_backup(ctx, backup_id: int, confirm: str = None):
+            """Restore the server from a backup (admin only)"""
+            if confirm != 'confirm':
+                await ctx.send(f"⚠️ This stops the server and replaces its files with backup `{backup_id}`.\n"
+                               f"Run `!restore {backup_id} confirm` to continue.")
+                return
+            
+            if self.server_running and not self.server_process:
+                await ctx.send("❌ Restore is only supported for local servers")
+                return
+            
+            await self.submit_job(ctx, f'restore {backup_id}', lambda job: self.restore_job(job, backup_id),
+                                  (SERVER, WORLD))
+        
+        @self.bot.command(name='activity')
+        async def player_activity(ctx, window: str = '7d'):
+            """Show peak hours, daily unique players and session length"""
+            if window not in WINDOWS:
+                await ctx.send(f"Usage: !activity [{'|'.join(WINDOWS)}]")
+                return
+            
+            report = await blocking(self.activity.report, window)
+            if not report['samples']:
+                await ctx.send("No status history recorded yet")
+                return
+            
+            embed = discord.Embed(
+                title=f"📈 Player Activity ({window})",
+                description="Average players online by weekday and hour\n```\n" + render_heatmap(report['heatmap']) + "\n```",
+                color=0x0099ff
+            )
+            peaks = ", ".join(f"{day} {hour:02d}:00 ({players:.1f})" for day, hour, players in report['peaks'])
+            embed.add_field(name="Peak Hours", value=peaks or "No players seen", inline=False)
+            embed.add_field(name="Unique Players", value=str(report['unique_players']), inline=True)
+            embed.add_field(name="Sessions", value=str(report['sessions']), inline=True)
+            embed.add_field(name="Avg Session", value=f"{report['avg_session'] / 60:.0f} min", inline=True)
+            days = report['daily_unique'][-7:]
+            if days:
+                embed.add_field(name="Daily Unique Players", value="\n".join(
+                    f"{datetime.fromtimestamp(day * 86400).strftime('%a %d %b')}: {count}" for day, count in days
+                ), inline=False)
+            embed.set_footer(text=f"{report['samples']} samples")
+            await ctx.send(embed=embed)
+        
+        @self.bot.command(name='graph')
+        async def graph(ctx, metric: str = 'players', window: str = '24h'):
+            """Chart player count, latency or server RAM over time"""
+            if metric not in METRICS or window not in GRAPH_WINDOWS:
+                await ctx.send(f"Usage: !graph [{'|'.join(METRICS)}] [{'|'.join(GRAPH_WINDOWS)}]")
+                return
+            
+            png = await self.charts.render(metric, window)
+            if png is None:
+                await ctx.send("No status history recorded yet")
+                return
+            
+            filename = f"{metric}_{window}.png"
+            embed = discord.Embed(title=f"📊 {metric.capitalize()} ({window})", color=0x0099ff)
+            embed.set_image(url=f"attachment://{filename}")
+            await ctx.send(embed=embed, file=discord.File(io.BytesIO(png), filename=filename))
+        
+        @self.bot.command(name='jobs')
+        async def list_jobs(ctx):
+            """List running, queued and recent jobs"""
+            jobs = self.jobs.jobs()
+            if not jobs:
+                await ctx.send("No jobs yet")
+                return
+            
+            lines = []
+            for job in jobs[:15]:
+                line = job.describe()
+                if job.requested_by:
+                    line += f" • {job.requested_by}"
+                lines.append(line)
+            embed = discord.Embed(title="🧰 Jobs", description="\n".join(lines), color=0x0099ff)
+            await ctx.send(embed=embed)
+        
+        @self.bot.command(name='cancel')
+        @commands.check(self.is_admin)
+        async def cancel_job(ctx, job_id: int):
+            """Cancel a queued job (admin only)"""
+            await ctx.send(self.jobs.cancel(job_id))
         
         @self.bot.command(name='connect')
         async def connect_to_server(ctx, ip: str = None, port: int = None):
             """Connect to a remote Minecraft server"""
             if ip and port:
-                # Update server connection
-                self.config['minecraft']['server_host'] = ip
-                self.config['minecraft']['server_port'] = port
-                
-                # Save config
-                with open('config.json', 'w') as f:
-                    json.dump(self.config, f, indent=2)
+                # Update server connection, the store saves config.json and tells the other components
+                try:
+                    await blocking(self.config_store.update, {
+                        'minecraft.server_host': ip,
+                        'minecraft.server_port': port
+                    })
+                except (ValueError, OSError) as e:
+                    await ctx.send(f"❌ Invalid server address: {e}")
+                    return
                 
                 # Test connection
                 try:
-                    server = JavaServer.lookup(f"{ip}:{port}")
-                    status = server.status()
+                    status = await self.query_server(f"{ip}:{port}")
                     embed = discord.Embed(
                         title="✅ Connected to Server",
                         description=f"Successfully connected to {ip}:{port}",
@@ -187,6 +408,72 @@ class MinecraftServerBot:
             else:
                 await ctx.send("Usage: !connect <ip> <port>\nExample: !connect 26.97.108.203 5555")
         
+        @self.bot.command(name='vpn')
+        async def vpn_status(ctx):
+            """Show VPN tunnel traffic, latency and connections"""
+            vpn = await blocking(self.vpn_stats.snapshot)
+            if not vpn.get('interface'):
+                await ctx.send("❌ No VPN interface found")
+                return
+            
+            embed = discord.Embed(
+                title="🛰️ VPN Status",
+                color=0x00ff00 if vpn['up'] else 0xff0000,
+                timestamp=datetime.fromtimestamp(vpn['sampled_at'])
+            )
+            embed.add_field(name="Interface", value=f"{vpn['interface']} ({vpn.get('ip_address') or 'no address'})", inline=False)
+            embed.add_field(name="State", value="🟢 Up" if vpn['up'] else "🔴 Down", inline=True)
+            embed.add_field(name="Traffic",
+                            value=f"⬇️ {vpn.get('rx_rate', 0) / 1024:.1f} KB/s\n⬆️ {vpn.get('tx_rate', 0) / 1024:.1f} KB/s",
+                            inline=True)
+            embed.add_field(name="Connections",
+                            value=f"{vpn.get('connections', 0)} ({len(vpn.get('peers', {}))} peers)", inline=True)
+            if vpn.get('errors') or vpn.get('drops'):
+                embed.add_field(name="Errors/Drops", value=f"{vpn.get('errors', 0)}/{vpn.get('drops', 0)}", inline=True)
+            
+            tunnel_rtt = vpn.get('rtt_avg')
+            if 'probe_loss' in vpn:
+                last = f"{vpn['rtt_ms']:.1f}" if vpn.get('rtt_ms') is not None else "timeout"
+                rtt_text = (f"last {last} ms, avg {tunnel_rtt:.1f} ms, jitter {vpn['jitter']:.1f} ms"
+                            if tunnel_rtt is not None else "no successful probes")
+                embed.add_field(name=f"Tunnel RTT ({vpn['probe_target']})",
+                                value=f"{rtt_text}\nloss {vpn['probe_loss']:.0f}% of {vpn['probe_samples']}",
+                                inline=False)
+            
+            # Server ping includes the server's own processing time, the TCP handshake does not
+            server_latency = None
+            try:
+                server_latency = (await self.query_server()).latency
+                embed.add_field(name="Server Ping", value=f"{server_latency:.1f} ms", inline=True)
+            except Exception:
+                embed.add_field(name="Server Ping", value="no response", inline=True)
+            
+            if not vpn['up']:
+                diagnosis = "VPN adapter is down"
+            elif tunnel_rtt is None:
+                diagnosis = "No tunnel probe target (set radmin_vpn.probe_host)" if 'probe_loss' not in vpn else "Tunnel probes are failing"
+            elif vpn['probe_loss'] > 0 or tunnel_rtt > 150:
+                diagnosis = "Tunnel is slow or dropping packets"
+            elif server_latency is not None and server_latency - tunnel_rtt > 100:
+                diagnosis = "Tunnel is fine, the server is slow to respond"
+            else:
+                diagnosis = "Tunnel and server look healthy"
+            embed.add_field(name="Diagnosis", value=diagnosis, inline=False)
+            
+            await ctx.send(embed=embed)
+        
+        @self.bot.command(name='endpoints')
+        async def list_endpoints(ctx):
+            """Show the server's endpoints and their recent latency"""
+            lines = []
+            for endpoint in self.endpoints.summary():
+                icon = "🟢" if endpoint['up'] else ("⚪" if endpoint['rtt_ms'] is None and not endpoint['failures'] else "🔴")
+                rtt = f"{endpoint['rtt_ms']:.0f} ms" if endpoint['rtt_ms'] is not None else "not measured"
+                marker = " ⬅️ in use" if endpoint['current'] else ""
+                lines.append(f"{icon} `{endpoint['address']}` {rtt}{marker}")
+            embed = discord.Embed(title="🔀 Server Endpoints", description="\n".join(lines), color=0x0099ff)
+            await ctx.send(embed=embed)
+        
         @self.bot.command(name='disconnect')
         async def disconnect_from_server(ctx):
             """Disconnect from current server"""
@@ -208,6 +495,7 @@ class MinecraftServerBot:
             self.server_running = True
             self.startup_time = datetime.now()
             logger.info(f"Connected to remote Minecraft server at {server_host}:{self.config['minecraft'].get('server_port', 25565)}")
+            self.events.publish(SERVER_EVENT, action='started')
             return
         
         # Local server startup
@@ -228,15 +516,22 @@ class MinecraftServerBot:
         try:
             self.server_process = subprocess.Popen(
                 cmd,
+                stdin=subprocess.PIPE,
                 stdout=subprocess.PIPE,
                 stderr=subprocess.PIPE,
                 text=True,
                 cwd=os.path.dirname(server_path)
             )
+            registry.track('minecraft_server', self.server_process.pid)
+            loop = asyncio.get_running_loop()
+            self.process_watcher.watch(
+                self.server_process, lambda process: loop.call_soon_threadsafe(self.on_server_exit, process)
+            )
             
             self.server_running = True
             self.startup_time = datetime.now()
             logger.info("Minecraft server started successfully")
+            self.events.publish(SERVER_EVENT, action='started')
             
             # Wait a bit for server to fully start
             await asyncio.sleep(10)
@@ -256,23 +551,26 @@ class MinecraftServerBot:
         if server_host != 'localhost':
             self.server_running = False
             logger.info(f"Disconnected from remote Minecraft server at {server_host}:{self.config['minecraft'].get('server_port', 25565)}")
+            self.events.publish(SERVER_EVENT, action='stopped')
             return
         
         # Local server shutdown
         if not self.server_process:
             return
         
+        self.stopping_server = True
         try:
             # Send stop command to server
             self.server_process.stdin.write("stop\n")
             self.server_process.stdin.flush()
             
             # Wait for process to terminate
-            self.server_process.wait(timeout=30)
+            await asyncio.to_thread(self.server_process.wait, timeout=30)
             
             self.server_running = False
             self.server_process = None
             logger.info("Minecraft server stopped successfully")
+            self.events.publish(SERVER_EVENT, action='stopped')
             
         except subprocess.TimeoutExpired:
             # Force kill if graceful stop fails
@@ -280,9 +578,27 @@ class MinecraftServerBot:
             self.server_running = False
             self.server_process = None
             logger.warning("Server was force killed after timeout")
+            self.events.publish(SERVER_EVENT, action='killed')
         except Exception as e:
             logger.error(f"Failed to stop server: {e}")
             raise
+        finally:
+            self.stopping_server = False
+    
+    def on_server_exit(self, process):
+        """Exit event of the server process from the process watcher, restarts it if it crashed"""
+        if process is not self.server_process or self.stopping_server:
+            return
+        
+        logger.warning(f"Server process exited with code {process.returncode}")
+        self.server_running = False
+        self.server_process = None
+        self.events.publish(SERVER_EVENT, action='crashed')
+        if self.config['minecraft']['auto_restart']:
+            self.events.publish(ALERT, message="Server process died, restarting")
+            self.jobs.submit('restart', self.restart_job, (SERVER, WORLD))
+        else:
+            self.events.publish(ALERT, message="Server process died")
     
     async def restart_minecraft_server(self):
         """Restart the Minecraft server"""
@@ -293,6 +609,62 @@ class MinecraftServerBot:
         await self.start_minecraft_server()
         self.last_restart = datetime.now()
         logger.info("Minecraft server restarted")
+        self.events.publish(SERVER_EVENT, action='restarted')
+    
+    async def submit_job(self, ctx, name, func, classes):
+        """Queue a long operation and answer with the message its progress is shown in"""
+        job = self.jobs.pending(name)
+        if job:
+            await ctx.send(f"{job.describe()} (already queued)")
+            return job
+        
+        # The job edits this message as soon as it starts or has to wait
+        message = await ctx.send(f"⏳ Queuing {name}...")
+        return self.jobs.submit(name, func, classes, message=message, requested_by=str(ctx.author))
+    
+    async def start_job(self, job):
+        if self.server_running:
+            return "server was already running"
+        await self.start_minecraft_server()
+        return "Minecraft server started"
+    
+    async def stop_job(self, job):
+        if not self.server_running:
+            return "server was not running"
+        await job.report("stopping server")
+        await self.stop_minecraft_server()
+        return "Minecraft server stopped"
+    
+    async def restart_job(self, job):
+        await job.report("restarting server")
+        await self.restart_minecraft_server()
+        return "Minecraft server restarted"
+    
+    async def backup_job(self, job):
+        async def report_progress(done_bytes, total_bytes):
+            percent = done_bytes / total_bytes * 100 if total_bytes else 100
+            await job.report(f"{percent:.0f}%")
+        
+        result = await self.create_server_backup(report_progress)
+        return (f"`{result['name']}` ({result['size'] / 1024 / 1024:.1f} MB "
+                f"in {result['duration']:.1f}s)")
+    
+    async def restore_job(self, job, backup_id):
+        if self.server_running and not self.server_process:
+            raise RuntimeError("restore is only supported for local servers")
+        
+        was_running = self.server_running
+        try:
+            if was_running:
+                await job.report("stopping server", force=True)
+                await self.stop_minecraft_server()
+            
+            result = await self.backup_manager.restore_backup(backup_id, lambda stage: job.report(stage, force=True))
+            return (f"restored `{result['name']}` in {result['duration']:.1f}s, "
+                    f"previous files kept at `{result['previous_dir']}`")
+        finally:
+            if was_running and not self.server_running:
+                await self.start_minecraft_server()
     
     async def get_server_status(self):
         """Get comprehensive server status"""
@@ -314,57 +686,90 @@ class MinecraftServerBot:
         # Get RAM usage
         if self.server_process:
             try:
-                process = psutil.Process(self.server_process.pid)
+                process = registry.get('minecraft_server')
                 ram_mb = process.memory_info().rss / 1024 / 1024
                 status['ram_usage'] = f"{ram_mb:.1f} MB"
             except:
                 pass
         
-        # Try to get player count from server
-        try:
-            server_host = self.config['minecraft'].get('server_host', 'localhost')
-            server_port = self.config['minecraft'].get('server_port', 25565)
-            server_address = f"{server_host}:{server_port}"
-            server = JavaServer.lookup(server_address)
-            status_info = server.status()
-            status['players_online'] = status_info.players.online
-            status['max_players'] = status_info.players.max
-        except:
-            pass
+        # Player count from the cached snapshot, probed only if it is stale
+        snapshot = await self.status_cache.get()
+        if snapshot['online']:
+            status['players_online'] = snapshot['players_online']
+            status['max_players'] = snapshot['players_max']
+            status['endpoint'] = snapshot['endpoint']
         
         return status
     
-    async def get_online_players(self):
-        """Get list of online players"""
+    def record_history(self, snapshot):
+        """Store status snapshots for !activity, off the event loop"""
+        process = registry.get('minecraft_server') if self.server_process else None
         try:
-            server_host = self.config['minecraft'].get('server_host', 'localhost')
-            server_port = self.config['minecraft'].get('server_port', 25565)
-            server_address = f"{server_host}:{server_port}"
-            server = JavaServer.lookup(server_address)
-            status = server.status()
-            if status.players.sample:
-                return [player.name for player in status.players.sample]
-            return []
-        except:
-            return []
+            ram = process.memory_info().rss if process else None
+        except psutil.Error:
+            ram = None
+        asyncio.get_running_loop().run_in_executor(None, self.history.record, snapshot, ram)
     
-    async def create_server_backup(self):
-        """Create a backup of the server world"""
-        backup_path = self.config['minecraft']['backup_path']
-        server_dir = os.path.dirname(self.config['minecraft']['server_path'])
-        
-        if not os.path.exists(backup_path):
-            os.makedirs(backup_path)
-        
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        backup_name = f"backup_{timestamp}"
-        backup_full_path = os.path.join(backup_path, backup_name)
+    async def probe_server(self):
+        """Status and endpoint of the configured server, the status cache's probe"""
+        status = await self.query_server()
+        return status, self.endpoints.current
+    
+    async def query_server(self, server_address=None):
+        """Query a server's status in a worker thread so the event loop keeps running
+        
+        Without an address the configured server is queried over its best
+        working endpoint.
+        """
+        with PROBE_LATENCY.time(probe='server_status'), waiting():
+            if server_address:
+                status = await asyncio.to_thread(lambda: JavaServer.lookup(server_address).status())
+            else:
+                status, _ = await asyncio.to_thread(self.endpoints.status)
+        PLAYERS_ONLINE.set(status.players.online)
+        PLAYERS_MAX.set(status.players.max)
+        return status
+    
+    def collect_metrics(self):
+        """Refresh JVM resource gauges before a metrics scrape"""
+        process = registry.get('minecraft_server') if self.server_process else None
+        if process is None:
+            JVM_RSS.set(0)
+            JVM_CPU.set(0)
+            return
         
-        # Create backup using tar (Windows) or zip
-        import shutil
-        shutil.make_archive(backup_full_path, 'zip', server_dir)
+        # The registry hands back the same Process object, so cpu_percent() measures since the last scrape
+        JVM_RSS.set(process.memory_info().rss)
+        JVM_CPU.set(process.cpu_percent(None))
+    
+    async def get_online_players(self):
+        """Get list of online players"""
+        snapshot = await self.status_cache.get()
+        return snapshot['players']
+    
+    def send_console_command(self, command):
+        """Send a command to the local server console"""
+        if not self.server_process or self.server_process.poll() is not None:
+            return False
         
-        logger.info(f"Backup created: {backup_name}.zip")
+        try:
+            self.server_process.stdin.write(f"{command}\n")
+            self.server_process.stdin.flush()
+            return True
+        except Exception as e:
+            logger.error(f"Failed to send console command: {e}")
+            return False
+    
+    async def create_server_backup(self, progress_callback=None):
+        """Create a backup of the server world in a worker process"""
+        server_pid = self.server_process.pid if self.server_process else None
+        try:
+            result = await self.backup_manager.create_backup(progress_callback, self.send_console_command, server_pid)
+        except Exception:
+            BACKUP_FAILURES.inc(mode=self.backup_manager.mode)
+            raise
+        BACKUP_DURATION.observe(result['duration'], mode=self.backup_manager.mode)
+        return result
     
     @tasks.loop(seconds=30)
     async def monitor_server(self):
@@ -372,14 +777,8 @@ class MinecraftServerBot:
         if not self.config['minecraft']['auto_restart']:
             return
         
+        # Crashes are handled by on_server_exit as soon as the process exits
         if self.server_running and self.server_process:
-            # Check if process is still running
-            if self.server_process.poll() is not None:
-                logger.warning("Server process died, attempting restart...")
-                self.server_running = False
-                await self.restart_minecraft_server()
-                return
-            
             # Check if server has been running too long (restart interval)
             if self.startup_time:
                 uptime = datetime.now() - self.startup_time
@@ -387,7 +786,7 @@ class MinecraftServerBot:
                 
                 if uptime > restart_interval:
                     logger.info("Server uptime exceeded restart interval, restarting...")
-                    await self.restart_minecraft_server()
+                    self.jobs.submit('restart', self.restart_job, (SERVER, WORLD))
     
     @tasks.loop(seconds=60)
     async def health_check(self):
@@ -395,17 +794,32 @@ class MinecraftServerBot:
         if not self.server_running:
             return
         
-        try:
-            # Check if server is responding
-            server_host = self.config['minecraft'].get('server_host', 'localhost')
-            server_port = self.config['minecraft'].get('server_port', 25565)
-            server_address = f"{server_host}:{server_port}"
-            server = JavaServer.lookup(server_address)
-            server.status()
-        except:
+        # Check if server is responding, the result also refreshes the status cache
+        snapshot = await self.status_cache.refresh()
+        if not snapshot['online']:
             logger.warning("Server health check failed - server not responding")
+            self.events.publish(ALERT, message="Server not responding to status checks")
             # Could implement auto-restart here if needed
     
+    @tasks.loop(seconds=21600)
+    async def verify_backups(self):
+        """Sample-check backups so a bad one is found before it is needed"""
+        try:
+            results = await self.backup_manager.verify_backups()
+        except Exception as e:
+            logger.error(f"Backup verification failed: {e}")
+            return
+        
+        failed = [r for r in results if not r['ok']]
+        if failed:
+            self.events.publish(ALERT, message="Backup verification failed",
+                                backups=[{"id": r['id'], "name": r['name'], "error": r['error']} for r in failed])
+            channel_id = self.config['discord'].get('admin_channel_id')
+            channel = self.bot.get_channel(int(channel_id)) if str(channel_id).isdigit() else None
+            if channel:
+                lines = "\n".join(f"`{r['id']}` {r['name']}: {r['error']}" for r in failed)
+                await channel.send(f"⚠️ Backup verification failed:\n{lines}")
+    
     @tasks.loop(seconds=300)
     async def radmin_vpn_check(self):
         """Check Radmin VPN connection status"""
@@ -413,11 +827,10 @@ class MinecraftServerBot:
             return
         
         try:
-            # Check if Radmin VPN is running
-            for proc in psutil.process_iter(['pid', 'name']):
-                if 'radmin' in proc.info['name'].lower():
-                    logger.info("Radmin VPN is running")
-                    return
+            # Check if Radmin VPN is running, a cached PID check unless it has gone away
+            if await asyncio.to_thread(registry.is_running, RADMIN_PROCESS):
+                logger.info("Radmin VPN is running")
+                return
             
             logger.warning("Radmin VPN is not running")
             # Could implement auto-start here if needed
@@ -432,7 +845,27 @@ class MinecraftServerBot:
             logger.error("Please set your Discord bot token in config.json")
             return
         
+        if self.bot.is_closed():
+            self.create_bot()
         self.bot.run(bot_token)
+    
+    async def run_async(self):
+        """Run the bot on an already running event loop"""
+        bot_token = self.config['discord']['bot_token']
+        if not bot_token or bot_token == "YOUR_DISCORD_BOT_TOKEN":
+            logger.error("Please set your Discord bot token in config.json")
+            return
+        
+        if self.bot.is_closed():
+            self.create_bot()
+        
+        try:
+            await self.bot.start(bot_token)
+        finally:
+            self.charts.close()
+            self.api.stop()
+            if not self.bot.is_closed():
+                await self.bot.close()
 
 if __name__ == "__main__":
     bot = MinecraftServerBot()
@@ -0,0 +1,112 @@
+import time
+import logging
+import threading
+from typing import Callable, Dict, List, Optional
+
+import psutil
+
+logger = logging.getLogger(__name__)
+
+SCAN_ATTRS = ['pid', 'name', 'exe', 'create_time']
+
+
+def name_contains(text: str) -> Callable[[Dict], bool]:
+    """Matcher for processes whose name contains text, case-insensitive"""
+    text = text.lower()
+    return lambda info: bool(info.get('name')) and text in info['name'].lower()
+
+
+class ProcessRegistry:
+    """Find external processes once and check on them cheaply afterwards
+
+    A watched process is looked up with a full process_iter scan the first
+    time, after that the cached psutil.Process is checked directly.
+    psutil compares the create_time it saw at lookup with the current one,
+    so a recycled PID counts as a miss. Only a miss triggers another scan,
+    and misses are remembered for miss_ttl seconds so back-to-back checks
+    of a process that isn't running share one scan.
+    """
+
+    def __init__(self, miss_ttl: float = 2.0):
+        self.miss_ttl = miss_ttl
+        self._matchers: Dict[str, Callable[[Dict], bool]] = {}
+        self._processes: Dict[str, psutil.Process] = {}
+        self._missed_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def watch(self, key: str, matcher: Callable[[Dict], bool]):
+        """Register a process to look up by scanning, matcher receives process_iter info dicts"""
+        with self._lock:
+            self._matchers[key] = matcher
+
+    def track(self, key: str, pid: int) -> Optional[psutil.Process]:
+        """Register a process whose PID is already known, e.g. one we started"""
+        try:
+            process = psutil.Process(pid)
+        except psutil.Error:
+            return None
+        with self._lock:
+            self._processes[key] = process
+            self._missed_at.pop(key, None)
+        return process
+
+    def forget(self, key: str):
+        with self._lock:
+            self._processes.pop(key, None)
+            self._missed_at.pop(key, None)
+
+    def get(self, key: str, refresh: bool = False) -> Optional[psutil.Process]:
+        """The live process for key, or None. refresh=True ignores a remembered miss"""
+        with self._lock:
+            process = self._processes.get(key)
+            matcher = self._matchers.get(key)
+            missed_at = self._missed_at.get(key)
+
+        if process is not None:
+            if process.is_running():
+                return process
+            with self._lock:
+                if self._processes.get(key) is process:
+                    del self._processes[key]
+
+        if matcher is None:
+            return None
+        if not refresh and missed_at and time.monotonic() - missed_at < self.miss_ttl:
+            return None
+
+        found = self._scan(matcher, first_only=True)
+        with self._lock:
+            if found:
+                self._processes[key] = found[0]
+                self._missed_at.pop(key, None)
+                return found[0]
+            self._missed_at[key] = time.monotonic()
+        return None
+
+    def is_running(self, key: str, refresh: bool = False) -> bool:
+        return self.get(key, refresh) is not None
+
+    def find_all(self, key: str) -> List[psutil.Process]:
+        """Every process matching key, always a full scan (use for stopping all instances)"""
+        matcher = self._matchers.get(key)
+        if matcher is None:
+            process = self.get(key)
+            return [process] if process else []
+        return self._scan(matcher)
+
+    @staticmethod
+    def _scan(matcher: Callable[[Dict], bool], first_only: bool = False) -> List[psutil.Process]:
+        found = []
+        for proc in psutil.process_iter(SCAN_ATTRS):
+            try:
+                if matcher(proc.info):
+                    found.append(proc)
+                    if first_only:
+                        break
+            except Exception as e:
+                logger.debug(f"Process matcher failed for {proc.pid}: {e}")
+        return found
+
+
+# Shared by everything that watches external processes
+registry = ProcessRegistry()
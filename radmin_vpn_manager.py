@@ -5,9 +5,15 @@ import logging
 import json
 import os
 from typing import List, Dict, Optional
+from process_registry import registry, name_contains
+from vpn_stats import get_vpn_sampler
 
 logger = logging.getLogger(__name__)
 
+# Key of the Radmin VPN process in the shared process registry
+RADMIN_PROCESS = 'radmin_vpn'
+registry.watch(RADMIN_PROCESS, name_contains('radmin'))
+
 class RadminVPNManager:
     def __init__(self, config: Dict):
         self.config = config
@@ -15,6 +21,7 @@ class RadminVPNManager:
         self.network_name = config.get('network_name', 'MinecraftServer')
         self.auto_connect = config.get('auto_connect', True)
         self.check_interval = config.get('check_interval', 300)
+        self.stats = get_vpn_sampler()
         
     def find_radmin_executable(self) -> Optional[str]:
         """Find Radmin VPN executable on the system"""
@@ -33,13 +40,10 @@ class RadminVPNManager:
         logger.warning("Radmin VPN executable not found in common locations")
         return None
     
-    def is_radmin_running(self) -> bool:
+    def is_radmin_running(self, refresh: bool = False) -> bool:
         """Check if Radmin VPN is currently running"""
         try:
-            for proc in psutil.process_iter(['pid', 'name', 'exe']):
-                if proc.info['name'] and 'radmin' in proc.info['name'].lower():
-                    return True
-            return False
+            return registry.is_running(RADMIN_PROCESS, refresh)
         except Exception as e:
             logger.error(f"Error checking Radmin VPN status: {e}")
             return False
@@ -59,7 +63,7 @@ class RadminVPNManager:
             subprocess.Popen([self.radmin_path], shell=True)
             time.sleep(5)  # Wait for application to start
             
-            if self.is_radmin_running():
+            if self.is_radmin_running(refresh=True):
                 logger.info("Radmin VPN started successfully")
                 return True
             else:
@@ -73,12 +77,12 @@ class RadminVPNManager:
     def stop_radmin(self) -> bool:
         """Stop Radmin VPN application"""
         try:
-            for proc in psutil.process_iter(['pid', 'name']):
-                if proc.info['name'] and 'radmin' in proc.info['name'].lower():
-                    proc.terminate()
-                    time.sleep(2)
-                    if proc.is_running():
-                        proc.kill()
+            for proc in registry.find_all(RADMIN_PROCESS):
+                proc.terminate()
+                time.sleep(2)
+                if proc.is_running():
+                    proc.kill()
+            registry.forget(RADMIN_PROCESS)
             
             logger.info("Radmin VPN stopped")
             return True
@@ -140,10 +144,13 @@ class RadminVPNManager:
         
         try:
             if status["radmin_running"]:
-                # Try to get connection details
-                # This would require parsing Radmin VPN status
-                # For now, return basic status
-                pass
+                # Connected means the VPN adapter is up with a 26.x address
+                vpn = self.stats.snapshot()
+                status["connected"] = vpn.get("up", False)
+                status["ip_address"] = vpn.get("ip_address")
+                status["interface"] = vpn.get("interface")
+                if status["connected"]:
+                    status["current_network"] = self.network_name
                 
         except Exception as e:
             logger.error(f"Error getting connection status: {e}")
@@ -231,9 +238,8 @@ class RadminVPNManager:
         members = []
         
         try:
-            # This would require Radmin VPN API access
-            # For now, return placeholder data
-            pass
+            # Radmin VPN has no API for the member list, report peers with open connections to us
+            members = self.stats.members()
             
         except Exception as e:
             logger.error(f"Error getting network members: {e}")
@@ -263,9 +269,22 @@ class RadminVPNManager:
         }
         
         try:
-            # This would require Radmin VPN API access
-            # For now, return placeholder data
-            pass
+            vpn = self.stats.snapshot()
+            peers = vpn.get("peers", {})
+            stats.update({
+                "total_members": len(peers),
+                "online_members": len(peers),
+                "bandwidth_usage": vpn.get("rx_rate", 0) + vpn.get("tx_rate", 0),
+                "uptime": vpn.get("uptime", 0),
+                "interface": vpn.get("interface"),
+                "rx_rate": vpn.get("rx_rate", 0),
+                "tx_rate": vpn.get("tx_rate", 0),
+                "connections": vpn.get("connections", 0),
+                "rtt_ms": vpn.get("rtt_ms"),
+                "rtt_avg": vpn.get("rtt_avg"),
+                "jitter": vpn.get("jitter"),
+                "probe_loss": vpn.get("probe_loss")
+            })
             
         except Exception as e:
             logger.error(f"Error getting network statistics: {e}")
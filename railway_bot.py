@@ -13,6 +13,10 @@ import logging
 import time
 from datetime import datetime
 from mcstatus import JavaServer
+from endpoints import ServerEndpoints, parse_endpoint
+from command_perf import CommandPerf, blocking
+from status_cache import PresenceUpdater, StatusCache
+from low_memory import bot_options, low_memory_enabled, memory_embed, memory_report, trim_memory
 
 # Setup logging
 logging.basicConfig(
@@ -30,14 +34,27 @@ class RailwayMinecraftBot:
         
         self.server_host = os.getenv('MINECRAFT_SERVER_HOST', '26.97.108.203')
         self.server_port = int(os.getenv('MINECRAFT_SERVER_PORT', '5555'))
+        # Other addresses of the same server, e.g. "play.example.com:25565,192.168.1.10:5555"
+        extra_endpoints = [
+            parse_endpoint(value.strip(), self.server_port)
+            for value in os.getenv('MINECRAFT_SERVER_ENDPOINTS', '').split(',') if value.strip()
+        ]
+        self.endpoints = ServerEndpoints(
+            lambda: [(self.server_host, self.server_port)] + extra_endpoints
+        )
         self.server_name = os.getenv('MINECRAFT_SERVER_NAME', 'My Minecraft Server')
         
         self.check_interval = int(os.getenv('CHECK_INTERVAL', '60'))
+        self.status_cache = StatusCache(lambda: blocking(self.endpoints.status), ttl=15)
+        
+        self.low_memory = low_memory_enabled()
         
         # Discord bot setup
-        intents = discord.Intents.default()
-        intents.message_content = True
-        self.bot = commands.Bot(command_prefix=self.prefix, intents=intents)
+        self.bot = commands.Bot(command_prefix=self.prefix, **bot_options(self.low_memory))
+        self.perf = CommandPerf()
+        self.perf.install(self.bot)
+        self.presence = PresenceUpdater(self.bot, self.status_cache, lambda: self.server_name,
+                                        lambda: self.check_interval)
         
         self.setup_events()
         self.setup_commands()
@@ -49,8 +66,16 @@ class RailwayMinecraftBot:
             logger.info(f'{self.bot.user} has connected to Railway!')
             logger.info(f'Bot is ready to use!')
             
+            if self.low_memory:
+                # Drop what parsing the READY payload left behind
+                trim_memory()
+            report = memory_report(self.bot)
+            logger.info(f"Bot memory: {report['rss'] / 1024 / 1024:.1f} MB RSS, "
+                        f"{report['guilds']} guilds, {report['users']} users cached")
+            
             # เริ่ม monitoring task
             self.monitor_task = asyncio.create_task(self.monitor_server())
+            self.presence.start()
         
         @self.bot.event
         async def on_command_error(ctx, error):
@@ -69,22 +94,23 @@ class RailwayMinecraftBot:
         async def server_status(ctx):
             """Get server status"""
             try:
-                server_address = f"{self.server_host}:{self.server_port}"
-                server = JavaServer.lookup(server_address)
-                status = server.status()
+                snapshot = await self.status_cache.get()
+                if not snapshot['online']:
+                    raise ConnectionError(snapshot['error'])
+                server_address = snapshot['endpoint']
                 
                 embed = discord.Embed(
                     title="🟢 Minecraft Server Status", 
                     color=0x00ff00
                 )
                 embed.add_field(name="Server", value=server_address, inline=False)
-                embed.add_field(name="Players", value=f"{status.players.online}/{status.players.max}", inline=True)
-                embed.add_field(name="Version", value=status.version.name, inline=True)
-                embed.add_field(name="Ping", value=f"{status.latency:.1f}ms", inline=True)
+                embed.add_field(name="Players", value=f"{snapshot['players_online']}/{snapshot['players_max']}", inline=True)
+                embed.add_field(name="Version", value=snapshot['version'], inline=True)
+                embed.add_field(name="Ping", value=f"{snapshot['latency']:.1f}ms", inline=True)
                 embed.add_field(name="Platform", value="🚂 Railway", inline=True)
                 
-                if status.players.sample:
-                    player_list = ", ".join([player.name for player in status.players.sample])
+                if snapshot['players']:
+                    player_list = ", ".join(snapshot['players'])
                     embed.add_field(name="Online Players", value=player_list, inline=False)
                 
                 await ctx.send(embed=embed)
@@ -102,12 +128,13 @@ class RailwayMinecraftBot:
         async def list_players(ctx):
             """List online players"""
             try:
-                server_address = f"{self.server_host}:{self.server_port}"
-                server = JavaServer.lookup(server_address)
-                status = server.status()
+                snapshot = await self.status_cache.get()
+                if not snapshot['online']:
+                    raise ConnectionError(snapshot['error'])
+                server_address = snapshot['endpoint']
                 
-                if status.players.sample:
-                    player_list = "\n".join([f"• {player.name}" for player in status.players.sample])
+                if snapshot['players']:
+                    player_list = "\n".join(f"• {name}" for name in snapshot['players'])
                     embed = discord.Embed(
                         title="👥 Online Players", 
                         description=player_list,
@@ -120,7 +147,7 @@ class RailwayMinecraftBot:
                         color=0xffaa00
                     )
                 
-                embed.add_field(name="Total", value=f"{status.players.online}/{status.players.max}", inline=True)
+                embed.add_field(name="Total", value=f"{snapshot['players_online']}/{snapshot['players_max']}", inline=True)
                 embed.add_field(name="Platform", value="🚂 Railway", inline=True)
                 await ctx.send(embed=embed)
                 
@@ -138,10 +165,16 @@ class RailwayMinecraftBot:
             embed.add_field(name="Platform", value="🚂 Railway", inline=True)
             embed.add_field(name="Server", value=f"{self.server_host}:{self.server_port}", inline=True)
             embed.add_field(name="Uptime", value="24/7", inline=True)
-            embed.add_field(name="Commands", value="!ping, !status, !players, !info", inline=False)
+            embed.add_field(name="Commands", value="!ping, !status, !players, !info, !memory", inline=False)
             
             await ctx.send(embed=embed)
         
+        @self.bot.command(name='memory')
+        async def memory_info(ctx):
+            """Show how much memory the bot holds"""
+            report = memory_report(self.bot)
+            await ctx.send(embed=memory_embed(report, self.low_memory))
+        
         @self.bot.command(name='railway')
         async def railway_info(ctx):
             """Show Railway specific information"""
@@ -167,9 +200,9 @@ class RailwayMinecraftBot:
         
         while not self.bot.is_closed():
             try:
-                server_address = f"{self.server_host}:{self.server_port}"
-                server = JavaServer.lookup(server_address)
-                status = server.status()
+                status, endpoint = await asyncio.to_thread(self.endpoints.status)
+                server_address = f"{endpoint[0]}:{endpoint[1]}"
+                self.status_cache.record(status, endpoint)
                 
                 current_status = "online"
                 
@@ -189,6 +222,7 @@ class RailwayMinecraftBot:
                 
             except Exception as e:
                 current_status = "offline"
+                self.status_cache.record_error(e)
                 
                 # ส่งการแจ้งเตือนเมื่อ server ล่ม
                 if last_status == "online" and current_status == "offline":
@@ -15,6 +15,9 @@ from discord.ext import commands
 import asyncio
 from datetime import datetime
 from mcstatus import JavaServer
+from command_perf import CommandPerf, blocking
+from status_cache import PresenceUpdater, StatusCache
+from low_memory import bot_options, low_memory_enabled, memory_embed, memory_report, trim_memory
 
 # Setup logging
 logging.basicConfig(
@@ -38,10 +41,15 @@ class RailwayCompleteSetup:
         self.channel_id = os.getenv('DISCORD_CHANNEL_ID')
         self.prefix = os.getenv('DISCORD_PREFIX', '!')
         
+        # ใช้ RAM ให้น้อยที่สุด เพราะ JVM อยู่ใน container เดียวกัน
+        self.low_memory = low_memory_enabled()
+        self.status_cache = StatusCache(self.probe_server, ttl=15)
+        
         # Bot setup
-        intents = discord.Intents.default()
-        intents.message_content = True
-        self.bot = commands.Bot(command_prefix=self.prefix, intents=intents)
+        self.bot = commands.Bot(command_prefix=self.prefix, **bot_options(self.low_memory))
+        self.perf = CommandPerf()
+        self.perf.install(self.bot)
+        self.presence = PresenceUpdater(self.bot, self.status_cache, lambda: "Railway")
         
         self.setup_events()
         self.setup_commands()
@@ -53,8 +61,15 @@ class RailwayCompleteSetup:
             logger.info(f'{self.bot.user} has connected to Railway!')
             logger.info('Minecraft Server + Bot is ready!')
             
+            if self.low_memory:
+                trim_memory()
+            report = memory_report(self.bot)
+            logger.info(f"Bot memory: {report['rss'] / 1024 / 1024:.1f} MB RSS, "
+                        f"{report['guilds']} guilds, {report['users']} users cached")
+            
             # เริ่ม monitoring task
             self.monitor_task = asyncio.create_task(self.monitor_server())
+            self.presence.start()
     
     def setup_commands(self):
         """Setup Discord bot commands"""
@@ -68,22 +83,23 @@ class RailwayCompleteSetup:
         async def server_status(ctx):
             """Get server status"""
             try:
-                server = JavaServer.lookup(f"localhost:{self.server_port}")
-                status = server.status()
+                snapshot = await self.status_cache.get()
+                if not snapshot['online']:
+                    raise ConnectionError(snapshot['error'])
                 
                 embed = discord.Embed(
                     title="🟢 Railway Minecraft Server", 
                     color=0x00ff00
                 )
                 embed.add_field(name="Status", value="🟢 Online", inline=True)
-                embed.add_field(name="Players", value=f"{status.players.online}/{status.players.max}", inline=True)
-                embed.add_field(name="Version", value=status.version.name, inline=True)
-                embed.add_field(name="Ping", value=f"{status.latency:.1f}ms", inline=True)
+                embed.add_field(name="Players", value=f"{snapshot['players_online']}/{snapshot['players_max']}", inline=True)
+                embed.add_field(name="Version", value=snapshot['version'], inline=True)
+                embed.add_field(name="Ping", value=f"{snapshot['latency']:.1f}ms", inline=True)
                 embed.add_field(name="Platform", value="🚂 Railway", inline=True)
                 embed.add_field(name="RAM", value=f"{self.min_ram} - {self.max_ram}", inline=True)
                 
-                if status.players.sample:
-                    player_list = ", ".join([player.name for player in status.players.sample])
+                if snapshot['players']:
+                    player_list = ", ".join(snapshot['players'])
                     embed.add_field(name="Online Players", value=player_list, inline=False)
                 
                 await ctx.send(embed=embed)
@@ -101,11 +117,12 @@ class RailwayCompleteSetup:
         async def list_players(ctx):
             """List online players"""
             try:
-                server = JavaServer.lookup(f"localhost:{self.server_port}")
-                status = server.status()
+                snapshot = await self.status_cache.get()
+                if not snapshot['online']:
+                    raise ConnectionError(snapshot['error'])
                 
-                if status.players.sample:
-                    player_list = "\n".join([f"• {player.name}" for player in status.players.sample])
+                if snapshot['players']:
+                    player_list = "\n".join(f"• {name}" for name in snapshot['players'])
                     embed = discord.Embed(
                         title="👥 Online Players", 
                         description=player_list,
@@ -118,7 +135,7 @@ class RailwayCompleteSetup:
                         color=0xffaa00
                     )
                 
-                embed.add_field(name="Total", value=f"{status.players.online}/{status.players.max}", inline=True)
+                embed.add_field(name="Total", value=f"{snapshot['players_online']}/{snapshot['players_max']}", inline=True)
                 embed.add_field(name="Platform", value="🚂 Railway", inline=True)
                 await ctx.send(embed=embed)
                 
@@ -133,11 +150,11 @@ class RailwayCompleteSetup:
                 
                 # หยุด server
                 if self.server_running:
-                    self.stop_server()
+                    await blocking(self.stop_server)
                     await asyncio.sleep(5)
                 
                 # เริ่ม server ใหม่
-                self.start_server()
+                await blocking(self.start_server)
                 await asyncio.sleep(10)
                 
                 await ctx.send("✅ Minecraft server restarted successfully!")
@@ -145,6 +162,13 @@ class RailwayCompleteSetup:
             except Exception as e:
                 await ctx.send(f"❌ Failed to restart server: {e}")
         
+        @self.bot.command(name='memory')
+        async def memory_info(ctx):
+            """Show how much memory the bot and server hold"""
+            server_pid = self.server_process.pid if self.server_process else None
+            report = memory_report(self.bot, server_pid)
+            await ctx.send(embed=memory_embed(report, self.low_memory))
+        
         @self.bot.command(name='info')
         async def bot_info(ctx):
             """Show complete system information"""
@@ -159,10 +183,15 @@ class RailwayCompleteSetup:
             embed.add_field(name="Uptime", value="24/7", inline=True)
             embed.add_field(name="Auto-restart", value="✅ Enabled", inline=True)
             embed.add_field(name="Monitoring", value="✅ Active", inline=True)
-            embed.add_field(name="Commands", value="!ping, !server, !players, !restart, !info", inline=False)
+            embed.add_field(name="Commands", value="!ping, !server, !players, !restart, !info, !memory", inline=False)
             
             await ctx.send(embed=embed)
     
+    async def probe_server(self):
+        """Status of the local server, the status cache's probe"""
+        server = JavaServer.lookup(f"localhost:{self.server_port}")
+        return await blocking(server.status), ("localhost", self.server_port)
+    
     def download_server_jar(self):
         """ดาวน์โหลด Minecraft Server JAR"""
         try:
@@ -313,8 +342,9 @@ class RailwayCompleteSetup:
         
         while not self.bot.is_closed():
             try:
-                server = JavaServer.lookup(f"localhost:{self.server_port}")
-                status = server.status()
+                snapshot = await self.status_cache.refresh()
+                if not snapshot['online']:
+                    raise ConnectionError(snapshot['error'])
                 
                 current_status = "online"
                 
@@ -326,8 +356,8 @@ class RailwayCompleteSetup:
                             description=f"Railway Minecraft Server is now online",
                             color=0x00ff00
                         )
-                        embed.add_field(name="Players", value=f"{status.players.online}/{status.players.max}", inline=True)
-                        embed.add_field(name="Version", value=status.version.name, inline=True)
+                        embed.add_field(name="Players", value=f"{snapshot['players_online']}/{snapshot['players_max']}", inline=True)
+                        embed.add_field(name="Version", value=snapshot['version'], inline=True)
                         await channel.send(embed=embed)
                 
                 last_status = current_status
@@ -0,0 +1,78 @@
+import socket
+import struct
+import logging
+import itertools
+
+logger = logging.getLogger(__name__)
+
+PACKET_RESPONSE = 0
+PACKET_COMMAND = 2
+PACKET_LOGIN = 3
+
+
+class RconError(Exception):
+    """Raised when the RCON connection or login fails"""
+
+
+class RconClient:
+    """Minimal Source RCON client for the Minecraft server console"""
+
+    def __init__(self, host: str, port: int, password: str, timeout: float = 30):
+        self.host = host
+        self.port = port
+        self.password = password
+        self.timeout = timeout
+        self._socket = None
+        self._ids = itertools.count(1)
+
+    def connect(self):
+        """Open the connection and log in"""
+        self._socket = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        request_id = self._send(PACKET_LOGIN, self.password)
+        response_id, _ = self._receive()
+        if response_id == -1 or response_id != request_id:
+            self.close()
+            raise RconError("RCON authentication failed")
+
+    def command(self, command: str) -> str:
+        """Run a console command and return its output"""
+        if self._socket is None:
+            self.connect()
+        self._send(PACKET_COMMAND, command)
+        _, body = self._receive()
+        return body
+
+    def close(self):
+        if self._socket is not None:
+            try:
+                self._socket.close()
+            finally:
+                self._socket = None
+
+    def _send(self, packet_type: int, body: str) -> int:
+        request_id = next(self._ids)
+        payload = struct.pack('<ii', request_id, packet_type) + body.encode('utf-8') + b'\0\0'
+        self._socket.sendall(struct.pack('<i', len(payload)) + payload)
+        return request_id
+
+    def _receive(self):
+        length = struct.unpack('<i', self._read(4))[0]
+        data = self._read(length)
+        response_id, _ = struct.unpack('<ii', data[:8])
+        return response_id, data[8:-2].decode('utf-8', errors='replace')
+
+    def _read(self, size: int) -> bytes:
+        data = b''
+        while len(data) < size:
+            chunk = self._socket.recv(size - len(data))
+            if not chunk:
+                raise RconError("RCON connection closed")
+            data += chunk
+        return data
+
+    def __enter__(self):
+        self.connect()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,336 @@
+import os
+import json
+import mmap
+import time
+import shutil
+import struct
+import hashlib
+import logging
+import itertools
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SECTOR_SIZE = 4096
+HEADER_SIZE = 2 * SECTOR_SIZE
+CHUNKS_PER_REGION = 1024
+REGION_EXTENSION = '.mca'
+
+
+class RegionFile:
+    """Read-only view of an Anvil region file (.mca)
+
+    The first 4KB sector holds 1024 location entries (3 byte sector offset,
+    1 byte sector count) and the second holds 1024 big-endian modification
+    timestamps, one per chunk.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.locations: List[Tuple[int, int]] = [(0, 0)] * CHUNKS_PER_REGION
+        self.timestamps: List[int] = [0] * CHUNKS_PER_REGION
+        self._file = open(path, 'rb')
+        self._mmap = None
+
+        size = os.fstat(self._file.fileno()).st_size
+        if size >= HEADER_SIZE:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            entries = struct.unpack_from('>1024I', self._mmap, 0)
+            self.locations = [(entry >> 8, entry & 0xFF) for entry in entries]
+            self.timestamps = list(struct.unpack_from('>1024I', self._mmap, SECTOR_SIZE))
+
+    def chunk_indexes(self) -> List[int]:
+        """Indexes of chunks that are present in the region"""
+        return [i for i, (offset, count) in enumerate(self.locations) if offset and count]
+
+    def read_chunk(self, index: int) -> Optional[bytes]:
+        """Return the raw chunk record (length prefix, compression type and data)"""
+        offset, count = self.locations[index]
+        if not offset or not count or self._mmap is None:
+            return None
+
+        start = offset * SECTOR_SIZE
+        if start + 4 > len(self._mmap):
+            return None
+
+        length = struct.unpack_from('>I', self._mmap, start)[0]
+        end = start + 4 + length
+        if length == 0 or end > len(self._mmap) or length + 4 > count * SECTOR_SIZE:
+            return None
+        return self._mmap[start:end]
+
+    def close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def write_region_file(path: str, chunks: Dict[int, Tuple[int, bytes]]):
+    """Rebuild a full region file from {index: (timestamp, raw chunk record)}"""
+    locations = [0] * CHUNKS_PER_REGION
+    timestamps = [0] * CHUNKS_PER_REGION
+    sector = HEADER_SIZE // SECTOR_SIZE
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'wb') as f:
+        f.seek(HEADER_SIZE)
+        for index in sorted(chunks):
+            timestamp, record = chunks[index]
+            count = -(-len(record) // SECTOR_SIZE)
+            f.write(record)
+            f.write(b'\0' * (count * SECTOR_SIZE - len(record)))
+            locations[index] = (sector << 8) | count
+            timestamps[index] = timestamp
+            sector += count
+
+        f.seek(0)
+        f.write(struct.pack('>1024I', *locations))
+        f.write(struct.pack('>1024I', *timestamps))
+
+
+class ChunkDeltaStore:
+    """Snapshot store that only keeps chunks changed since the previous snapshot
+
+    Each snapshot directory holds a manifest.json and a chunks.pack file with
+    the chunk records that changed. Unchanged chunks and files point at the
+    snapshot that already holds their bytes, so a region file with a single
+    modified chunk costs a few KB instead of the whole file.
+    """
+
+    def __init__(self, store_path: str):
+        self.store_path = store_path
+        self.snapshots_path = os.path.join(store_path, 'snapshots')
+
+    def list_snapshots(self) -> List[str]:
+        """Snapshot IDs, oldest first"""
+        if not os.path.isdir(self.snapshots_path):
+            return []
+        return sorted(
+            name for name in os.listdir(self.snapshots_path)
+            if os.path.exists(os.path.join(self.snapshots_path, name, 'manifest.json'))
+        )
+
+    def snapshot_path(self, snapshot_id: str) -> str:
+        return os.path.join(self.snapshots_path, snapshot_id)
+
+    def _new_snapshot_dir(self) -> Tuple[str, str]:
+        """Create the directory of a new snapshot, IDs stay unique and in order within one second"""
+        base = datetime.now().strftime("%Y%m%d_%H%M%S")
+        os.makedirs(self.snapshots_path, exist_ok=True)
+        for attempt in itertools.count():
+            # "_001" sorts after the bare ID and before the next second's
+            snapshot_id = f"{base}_{attempt:03d}" if attempt else base
+            snapshot_dir = self.snapshot_path(snapshot_id)
+            try:
+                os.makedirs(snapshot_dir, exist_ok=False)
+            except FileExistsError:
+                continue
+            return snapshot_id, snapshot_dir
+
+    def load_manifest(self, snapshot_id: str) -> Dict:
+        with open(os.path.join(self.snapshot_path(snapshot_id), 'manifest.json'), 'r') as f:
+            return json.load(f)
+
+    def create_snapshot(self, source_dir: str, exclude_dirs: List[str] = None,
+                        progress_callback: Optional[Callable] = None, throttle=None) -> Dict:
+        """Snapshot source_dir, storing only chunks and files that changed"""
+        start = time.monotonic()
+        excluded = {os.path.abspath(path) for path in (exclude_dirs or [])}
+        excluded.add(os.path.abspath(self.store_path))
+
+        snapshots = self.list_snapshots()
+        previous = self.load_manifest(snapshots[-1]) if snapshots else {"regions": {}, "files": {}}
+
+        snapshot_id, snapshot_dir = self._new_snapshot_dir()
+
+        try:
+            manifest = {"id": snapshot_id, "parent": snapshots[-1] if snapshots else None,
+                        "regions": {}, "files": {}}
+            stats = {"changed_chunks": 0, "reused_chunks": 0, "changed_files": 0, "reused_files": 0}
+            contents = []
+
+            paths = []
+            for root, dirs, filenames in os.walk(source_dir):
+                dirs[:] = [d for d in dirs if os.path.abspath(os.path.join(root, d)) not in excluded]
+                paths.extend(os.path.join(root, filename) for filename in filenames)
+
+            with open(os.path.join(snapshot_dir, 'chunks.pack'), 'wb') as pack:
+                for done, path in enumerate(paths, 1):
+                    relpath = os.path.relpath(path, source_dir).replace(os.sep, '/')
+                    try:
+                        st = os.stat(path)
+                        if relpath.endswith(REGION_EXTENSION):
+                            manifest["regions"][relpath] = self._snapshot_region(
+                                path, previous["regions"].get(relpath, {}), snapshot_id, pack, stats, throttle)
+                        else:
+                            manifest["files"][relpath] = self._snapshot_file(
+                                path, relpath, previous["files"].get(relpath), snapshot_dir, snapshot_id, stats)
+                            if throttle and manifest["files"][relpath][0] == snapshot_id:
+                                throttle.account(st.st_size)
+                        contents.append((relpath, st.st_size, st.st_mtime))
+                    except OSError as e:
+                        logger.warning(f"Skipping {relpath} in snapshot: {e}")
+
+                    if progress_callback:
+                        progress_callback(done, len(paths))
+
+            with open(os.path.join(snapshot_dir, 'manifest.json'), 'w') as f:
+                json.dump(manifest, f)
+        except BaseException:
+            # A snapshot without a manifest is invisible to list_snapshots and would never be cleaned up
+            shutil.rmtree(snapshot_dir, ignore_errors=True)
+            raise
+
+        size = sum(
+            os.path.getsize(os.path.join(root, filename))
+            for root, _, filenames in os.walk(snapshot_dir)
+            for filename in filenames
+        )
+        stats.update({
+            "name": snapshot_id,
+            "path": snapshot_dir,
+            "compression": "chunk_delta",
+            "files": len(contents),
+            "source_bytes": sum(file_size for _, file_size, _ in contents),
+            "contents": contents,
+            "size": size,
+            "duration": time.monotonic() - start
+        })
+        return stats
+
+    def _snapshot_region(self, path: str, previous: Dict, snapshot_id: str, pack, stats: Dict,
+                         throttle=None) -> Dict:
+        """Append changed chunks of one region file to the pack"""
+        entries = {}
+        with RegionFile(path) as region:
+            for index in region.chunk_indexes():
+                timestamp = region.timestamps[index]
+                key = str(index)
+                old = previous.get(key)
+                if old and old[0] == timestamp:
+                    entries[key] = old
+                    stats["reused_chunks"] += 1
+                    continue
+
+                record = region.read_chunk(index)
+                if record is None:
+                    # Torn or corrupt, leaving it out would lose the chunk on restore
+                    if not old:
+                        raise RuntimeError(f"Chunk {index} of {path} can't be read and no earlier snapshot has it")
+                    logger.warning(f"Chunk {index} of {path} can't be read, keeping its copy from {old[1]}")
+                    entries[key] = old
+                    stats["reused_chunks"] += 1
+                    continue
+                if throttle:
+                    throttle.account(len(record))
+                entries[key] = [timestamp, snapshot_id, pack.tell(), len(record)]
+                pack.write(record)
+                stats["changed_chunks"] += 1
+        return entries
+
+    def _snapshot_file(self, path: str, relpath: str, previous: Optional[List], snapshot_dir: str,
+                       snapshot_id: str, stats: Dict) -> List:
+        """Copy a non-region file unless it is unchanged since the previous snapshot"""
+        st = os.stat(path)
+        if previous and previous[1] == st.st_size and previous[2] == st.st_mtime_ns:
+            stats["reused_files"] += 1
+            return previous
+
+        target = os.path.join(snapshot_dir, 'files', relpath)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.copy2(path, target)
+        stats["changed_files"] += 1
+        return [snapshot_id, st.st_size, st.st_mtime_ns]
+
+    def checksum(self, snapshot_id: str) -> str:
+        """SHA-256 over a snapshot's manifest and chunk pack"""
+        digest = hashlib.sha256()
+        for filename in ('manifest.json', 'chunks.pack'):
+            with open(os.path.join(self.snapshot_path(snapshot_id), filename), 'rb') as f:
+                for block in iter(lambda: f.read(1024 * 1024), b''):
+                    digest.update(block)
+        return digest.hexdigest()
+
+    def verify_references(self, snapshot_id: str) -> List[str]:
+        """Check that every chunk and file a snapshot points at is present, returns problems found"""
+        manifest = self.load_manifest(snapshot_id)
+        problems = []
+        pack_sizes = {}
+
+        for relpath, entries in manifest["regions"].items():
+            for key, (_, holder, offset, length) in entries.items():
+                if holder not in pack_sizes:
+                    pack = os.path.join(self.snapshot_path(holder), 'chunks.pack')
+                    pack_sizes[holder] = os.path.getsize(pack) if os.path.exists(pack) else -1
+                if offset + length > pack_sizes[holder]:
+                    problems.append(f"{relpath} chunk {key} missing from snapshot {holder}")
+
+        for relpath, (holder, size, _) in manifest["files"].items():
+            path = os.path.join(self.snapshot_path(holder), 'files', relpath)
+            if not os.path.exists(path) or os.path.getsize(path) != size:
+                problems.append(f"{relpath} missing or truncated in snapshot {holder}")
+
+        return problems
+
+    def delete_unreferenced(self, keep_ids: List[str]) -> List[str]:
+        """Delete snapshots that are not kept and hold no data used by kept snapshots"""
+        referenced = set(keep_ids)
+        for snapshot_id in keep_ids:
+            try:
+                manifest = self.load_manifest(snapshot_id)
+            except (OSError, ValueError):
+                continue
+            for entries in manifest["regions"].values():
+                referenced.update(entry[1] for entry in entries.values())
+            referenced.update(entry[0] for entry in manifest["files"].values())
+
+        deleted = []
+        for snapshot_id in self.list_snapshots():
+            if snapshot_id not in referenced:
+                shutil.rmtree(self.snapshot_path(snapshot_id), ignore_errors=True)
+                deleted.append(snapshot_id)
+        return deleted
+
+    def restore_snapshot(self, snapshot_id: str, target_dir: str,
+                         progress_callback: Optional[Callable] = None) -> Dict:
+        """Rebuild the full directory tree of a snapshot into target_dir"""
+        start = time.monotonic()
+        manifest = self.load_manifest(snapshot_id)
+        packs = {}
+        total = len(manifest["regions"]) + len(manifest["files"])
+        done = 0
+
+        try:
+            for relpath, entries in manifest["regions"].items():
+                chunks = {}
+                for key, (timestamp, holder, offset, length) in entries.items():
+                    if holder not in packs:
+                        packs[holder] = open(os.path.join(self.snapshot_path(holder), 'chunks.pack'), 'rb')
+                    pack = packs[holder]
+                    pack.seek(offset)
+                    chunks[int(key)] = (timestamp, pack.read(length))
+                write_region_file(os.path.join(target_dir, relpath), chunks)
+                done += 1
+                if progress_callback:
+                    progress_callback(done, total)
+        finally:
+            for pack in packs.values():
+                pack.close()
+
+        for relpath, (holder, _, mtime_ns) in manifest["files"].items():
+            target = os.path.join(target_dir, relpath)
+            os.makedirs(os.path.dirname(target) or '.', exist_ok=True)
+            shutil.copy2(os.path.join(self.snapshot_path(holder), 'files', relpath), target)
+            done += 1
+            if progress_callback:
+                progress_callback(done, total)
+
+        logger.info(f"Restored chunk snapshot {snapshot_id} to {target_dir}")
+        return {"name": snapshot_id, "files": total, "duration": time.monotonic() - start}
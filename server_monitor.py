@@ -11,6 +11,9 @@ import subprocess
 import psutil
 from datetime import datetime, timedelta
 from mcstatus import JavaServer
+from config_store import get_config_store
+from endpoints import ServerEndpoints
+from webhook_notifier import WebhookNotifier
 
 # Setup logging
 logging.basicConfig(
@@ -25,35 +28,46 @@ logger = logging.getLogger(__name__)
 
 class ServerMonitor:
     def __init__(self):
+        self.notifier = WebhookNotifier(username="Minecraft Server Monitor")
         self.config = self.load_config()
-        self.server_host = self.config['minecraft'].get('server_host', 'localhost')
-        self.server_port = self.config['minecraft'].get('server_port', 25565)
-        self.check_interval = 60  # ตรวจสอบทุก 60 วินาที
+        self.apply_config(self.config)
+        self.endpoints = ServerEndpoints.from_config(self.config)
         self.max_retries = 3
         self.retry_count = 0
         self.last_online = None
         self.offline_count = 0
         
     def load_config(self):
-        """Load configuration from config.json"""
-        try:
-            with open('config.json', 'r') as f:
-                return json.load(f)
-        except FileNotFoundError:
-            logger.error("config.json not found!")
-            return {}
+        """Get the live configuration shared through the config store"""
+        self.config_store = get_config_store()
+        self.config_store.subscribe(self.on_config_change)
+        return self.config_store.config
+    
+    def apply_config(self, config):
+        """Read the monitored address and check interval"""
+        self.server_host = config['minecraft'].get('server_host', 'localhost')
+        self.server_port = config['minecraft'].get('server_port', 25565)
+        self.check_interval = config.get('monitoring', {}).get('health_check_interval', 60)  # ตรวจสอบทุก 60 วินาที
+        self.notifier.url = config.get('monitoring', {}).get('webhook_url', '')
+        self.notifier.batch_seconds = config.get('monitoring', {}).get('webhook_batch_seconds', 2)
+    
+    def on_config_change(self, changes, config):
+        """ใช้ค่า config ใหม่ทันทีโดยไม่ต้อง restart"""
+        self.apply_config(config)
+        if 'minecraft.server_host' in changes or 'minecraft.server_port' in changes:
+            logger.info(f"🔁 Now monitoring {self.server_host}:{self.server_port}")
+            self.offline_count = 0
     
     def check_server_status(self):
         """ตรวจสอบสถานะ server"""
         try:
-            server = JavaServer.lookup(f"{self.server_host}:{self.server_port}")
-            status = server.status()
+            status, endpoint = self.endpoints.status()
             
             self.retry_count = 0
             self.offline_count = 0
             self.last_online = datetime.now()
             
-            logger.info(f"✅ Server Online - Players: {status.players.online}/{status.players.max} - Ping: {status.latency:.1f}ms")
+            logger.info(f"✅ Server Online via {endpoint[0]}:{endpoint[1]} - Players: {status.players.online}/{status.players.max} - Ping: {status.latency:.1f}ms")
             return True
             
         except Exception as e:
@@ -63,8 +77,9 @@ class ServerMonitor:
     
     def send_discord_notification(self, message):
         """ส่งการแจ้งเตือนไป Discord (ถ้ามี webhook)"""
-        # สามารถเพิ่ม Discord webhook ได้ที่นี่
         logger.info(f"📢 Notification: {message}")
+        # ส่งใน background thread ไม่ให้การตรวจสอบ server ต้องรอ
+        self.notifier.notify(message)
     
     def restart_server(self):
         """Restart server (สำหรับ local server)"""
@@ -111,13 +126,14 @@ class ServerMonitor:
             "port": self.server_port,
             "last_check": datetime.now().isoformat(),
             "offline_count": self.offline_count,
-            "last_online": self.last_online.isoformat() if self.last_online else None
+            "last_online": self.last_online.isoformat() if self.last_online else None,
+            "endpoints": self.endpoints.summary()
         }
         
         try:
-            server = JavaServer.lookup(f"{self.server_host}:{self.server_port}")
-            status = server.status()
+            status, endpoint = self.endpoints.status()
             stats.update({
+                "endpoint": f"{endpoint[0]}:{endpoint[1]}",
                 "online": True,
                 "version": status.version.name,
                 "players_online": status.players.online,
@@ -144,6 +160,8 @@ def main():
         print("\n👋 Monitor stopped. Goodbye!")
     except Exception as e:
         logger.error(f"Fatal error: {e}")
+    finally:
+        monitor.notifier.close()
 
 if __name__ == "__main__":
     main()
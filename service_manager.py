@@ -1,19 +1,198 @@
 import os
 import sys
+import atexit
 import time
+import queue
+import asyncio
 import logging
+import selectors
+import traceback
 import subprocess
+import multiprocessing
 import psutil
 import json
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional
 import threading
 import signal
 
+from config_store import get_config_store
+from metrics import REGISTRY, PROBE_LATENCY, SERVICE_READY, SERVICE_RESTARTS, SERVICE_UP
+
 logger = logging.getLogger(__name__)
 
+# Longest delay between restarts of a service that keeps crashing
+MAX_RESTART_BACKOFF = 30
+
+# Pipe to the ServiceManager when running inside a process-isolated service
+_service_conn = None
+_service_conn_lock = threading.Lock()
+
+
+def report_status(**fields):
+    """Send status fields to the ServiceManager from inside a process-isolated service"""
+    if _service_conn is None:
+        return
+    with _service_conn_lock:
+        _service_conn.send(('status', fields))
+
+
+def report_progress():
+    """Heartbeat for the watchdog from inside a process-isolated service"""
+    if _service_conn is None:
+        return
+    with _service_conn_lock:
+        _service_conn.send(('progress', time.time()))
+
+
+def format_thread_stack(thread_id: int) -> str:
+    """Current stack of a thread in this process, for diagnosing hangs"""
+    frame = sys._current_frames().get(thread_id)
+    if frame is None:
+        return "(thread not found)"
+    return ''.join(traceback.format_stack(frame))
+
+
+def format_all_stacks() -> str:
+    """Current stacks of every thread in this process"""
+    names = {thread.ident: thread.name for thread in threading.enumerate()}
+    return '\n'.join(
+        f"Thread {names.get(thread_id, thread_id)}:\n{''.join(traceback.format_stack(frame))}"
+        for thread_id, frame in sys._current_frames().items()
+    )
+
+
+def format_task_stack(task) -> str:
+    """Await chain of an asyncio task, innermost coroutine last"""
+    frames = []
+    coro = task.get_coro()
+    while coro is not None:
+        frame = getattr(coro, 'cr_frame', None) or getattr(coro, 'gi_frame', None)
+        if frame is None:
+            break
+        frames.append((frame, frame.f_lineno))
+        coro = getattr(coro, 'cr_await', None) or getattr(coro, 'gi_yieldfrom', None)
+    return ''.join(traceback.format_list(traceback.StackSummary.extract(frames)))
+
+
+def _service_process_main(name: str, service_class, args, kwargs, conn, heartbeat_interval: float):
+    """Entry point of a process-isolated service"""
+    global _service_conn
+    _service_conn = conn
+    # Ctrl+C goes to the whole process group, let the parent decide how to stop us
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+    instance = None
+
+    def listen():
+        while True:
+            try:
+                message = conn.recv()
+            except (EOFError, OSError):
+                # Parent is gone, don't linger as an orphan
+                os._exit(1)
+            if message == 'stop' and hasattr(instance, 'stop'):
+                instance.stop()
+            elif message == 'dump_stacks':
+                with _service_conn_lock:
+                    conn.send(('stacks', format_all_stacks()))
+
+    def heartbeat():
+        while True:
+            with _service_conn_lock:
+                conn.send(('heartbeat', time.time()))
+            time.sleep(heartbeat_interval)
+
+    threading.Thread(target=listen, daemon=True).start()
+    threading.Thread(target=heartbeat, daemon=True).start()
+
+    try:
+        instance = service_class(*args, **kwargs)
+        if hasattr(instance, 'run'):
+            instance.run()
+        elif hasattr(instance, 'start'):
+            instance.start()
+    except Exception as e:
+        logger.error(f"Service {name} crashed: {e}")
+        with _service_conn_lock:
+            conn.send(('error', str(e)))
+        sys.exit(1)
+
+
+def _process_alive(process) -> bool:
+    """Works for both subprocess.Popen and multiprocessing.Process"""
+    if hasattr(process, 'poll'):
+        return process.poll() is None
+    return process.is_alive()
+
+
+class ProcessWatcher:
+    """Deliver exit notifications for child processes without polling
+
+    On Linux every watched process gets a pidfd that a single thread waits
+    on with a selector. Elsewhere each process gets a thread blocked in
+    wait(), which still returns the moment the process exits.
+    """
+
+    def __init__(self):
+        self._use_pidfd = hasattr(os, 'pidfd_open')
+        self._selector = selectors.DefaultSelector() if self._use_pidfd else None
+        self._lock = threading.Lock()
+        self._thread = None
+        self._wake_r, self._wake_w = os.pipe() if self._use_pidfd else (None, None)
+
+    def watch(self, process, callback: Callable):
+        """Call callback(process) once process (Popen or multiprocessing.Process) exits"""
+        if self._use_pidfd:
+            try:
+                pidfd = os.pidfd_open(process.pid)
+            except OSError:
+                # Process already gone
+                callback(self._reap(process))
+                return
+            with self._lock:
+                self._selector.register(pidfd, selectors.EVENT_READ, (process, callback))
+                if self._thread is None:
+                    self._selector.register(self._wake_r, selectors.EVENT_READ, None)
+                    self._thread = threading.Thread(target=self._run, name="process-watcher", daemon=True)
+                    self._thread.start()
+            os.write(self._wake_w, b'\0')
+        else:
+            threading.Thread(
+                target=lambda: callback(self._reap(process)),
+                name=f"process-watcher-{process.pid}",
+                daemon=True
+            ).start()
+
+    @staticmethod
+    def _reap(process):
+        """Collect the exit status so the process doesn't linger as a zombie"""
+        if hasattr(process, 'poll'):
+            process.wait()
+        else:
+            process.join()
+        return process
+
+    def _run(self):
+        while True:
+            for key, _ in self._selector.select():
+                if key.data is None:
+                    os.read(self._wake_r, 1024)
+                    continue
+                process, callback = key.data
+                with self._lock:
+                    self._selector.unregister(key.fd)
+                os.close(key.fd)
+                try:
+                    callback(self._reap(process))
+                except Exception as e:
+                    logger.error(f"Process exit callback failed: {e}")
+
+
 class ServiceManager:
-    def __init__(self, config_path: str = "config.json"):
+    def __init__(self, config_path: str = "config.json", install_signal_handlers: bool = True):
         self.config_path = config_path
         self.config = self.load_config()
         self.services = {}
@@ -22,21 +201,42 @@ class ServiceManager:
         self.max_restarts = 5
         self.restart_window = 3600  # 1 hour
         
-        # Setup signal handlers for graceful shutdown
-        signal.signal(signal.SIGINT, self.signal_handler)
-        signal.signal(signal.SIGTERM, self.signal_handler)
+        # Service exits are pushed here by the service threads and process watcher
+        self._events = queue.Queue()
+        self._supervisor_thread = None
+        self.process_watcher = ProcessWatcher()
+        
+        services_config = self.config.get('services', {})
+        self.heartbeat_interval = services_config.get('heartbeat_interval', 5)
+        self.watchdog_interval = services_config.get('watchdog_interval', 5)
+        self.exit_on_hang = services_config.get('exit_on_hang', False)
+        self._watchdog_thread = None
+        self._watchdog_stop = threading.Event()
+        REGISTRY.add_collector(self._collect_metrics)
+        self.config_store.subscribe(self.on_config_change, prefix='services.')
+        # Always spawn: by now this process runs the config, process and watchdog threads, and a
+        # fork can copy their locks held. Process services must be picklable, a class and its arguments
+        self._mp_context = multiprocessing.get_context('spawn')
+        
+        # Process services aren't daemonic, make sure none outlives the manager
+        atexit.register(self._terminate_processes)
+        
+        # Setup signal handlers for graceful shutdown, the asyncio runtime installs its own on the loop
+        if install_signal_handlers:
+            signal.signal(signal.SIGINT, self.signal_handler)
+            signal.signal(signal.SIGTERM, self.signal_handler)
     
     def load_config(self) -> Dict:
-        """Load configuration from JSON file"""
-        try:
-            with open(self.config_path, 'r') as f:
-                return json.load(f)
-        except FileNotFoundError:
-            logger.error(f"Configuration file {self.config_path} not found!")
-            return {}
-        except json.JSONDecodeError:
-            logger.error(f"Invalid JSON in {self.config_path}!")
-            return {}
+        """Get the live configuration shared through the config store"""
+        self.config_store = get_config_store(self.config_path)
+        return self.config_store.config
+    
+    def on_config_change(self, changes: Dict, config: Dict):
+        """Pick up new heartbeat and watchdog settings, they are read on every cycle"""
+        services_config = config.get('services', {})
+        self.heartbeat_interval = services_config.get('heartbeat_interval', 5)
+        self.watchdog_interval = services_config.get('watchdog_interval', 5)
+        self.exit_on_hang = services_config.get('exit_on_hang', False)
     
     def signal_handler(self, signum, frame):
         """Handle shutdown signals gracefully"""
@@ -44,14 +244,54 @@ class ServiceManager:
         self.stop_all_services()
         sys.exit(0)
     
-    def register_service(self, name: str, service_class, *args, **kwargs):
-        """Register a service for management"""
+    def register_service(self, name: str, service_class, *args, execution_mode: str = 'thread',
+                         memory_limit_mb: Optional[int] = None, depends_on: Optional[List[str]] = None,
+                         readiness_probe: Optional[Callable[[], bool]] = None, ready_timeout: float = 60,
+                         heartbeat_timeout: Optional[float] = None, **kwargs):
+        """Register a service for management
+        
+        service_class is either a class whose instances have run() or start(),
+        or a plain callable that runs until the service exits. With
+        execution_mode='process' the service runs in its own child process
+        and is killed and restarted if its RSS exceeds memory_limit_mb, the
+        child is spawned so service_class and its arguments must pickle. With
+        execution_mode='task' service_class is a coroutine function that runs
+        as a task on the event loop and start_service must be called from it.
+        
+        A service is started once everything in depends_on is ready. It
+        counts as ready when readiness_probe() returns True, or as soon as it
+        is running if it has no probe.
+        
+        With heartbeat_timeout set the service must call heartbeat(name) at
+        least that often, otherwise the watchdog logs its stack and restarts
+        it. It gets ready_timeout on top of that to come up after a start.
+        """
         self.services[name] = {
             'class': service_class,
             'args': args,
             'kwargs': kwargs,
+            'mode': execution_mode,
+            'depends_on': list(depends_on or []),
+            'readiness_probe': readiness_probe,
+            'ready_timeout': ready_timeout,
+            'memory_limit_mb': memory_limit_mb,
+            'heartbeat_timeout': heartbeat_timeout,
+            'last_progress': None,
+            'hung': False,
+            'last_stack': None,
+            'stack_received': threading.Event(),
+            'loop': None,
+            'loop_thread': None,
+            'conn': None,
+            'last_heartbeat': None,
+            'status_report': {},
+            'last_error': None,
             'process': None,
             'thread': None,
+            'task': None,
+            'instance': None,
+            'stopping': False,
+            'generation': 0,
             'last_restart': None,
             'restart_count': 0
         }
@@ -67,17 +307,35 @@ class ServiceManager:
         
         try:
             # Check if service is already running
-            if service['process'] and service['process'].is_running():
+            if self._service_alive(service):
                 logger.info(f"Service {name} is already running")
                 return True
             
-            # Create and start service instance
-            service_instance = service['class'](*service['args'], **service['kwargs'])
+            service['stopping'] = False
+            service['generation'] += 1
+            service['hung'] = False
+            # Grace period to start up before the first heartbeat is due
+            service['last_progress'] = time.time() + service['ready_timeout']
+            
+            if service['mode'] == 'process':
+                self._start_process_service(name)
+                logger.info(f"Service {name} started in process {service['process'].pid}")
+                return True
+            
+            if service['mode'] == 'task':
+                service['loop'] = asyncio.get_running_loop()
+                service['loop_thread'] = threading.get_ident()
+                service['task'] = service['loop'].create_task(
+                    self._run_task_service(name, service['generation']), name=f"service-{name}"
+                )
+                logger.info(f"Service {name} started as a task")
+                return True
             
             # Start service in a separate thread
             service['thread'] = threading.Thread(
                 target=self._run_service,
-                args=(name, service_instance),
+                args=(name, service['generation']),
+                name=f"service-{name}",
                 daemon=True
             )
             service['thread'].start()
@@ -89,26 +347,142 @@ class ServiceManager:
             logger.error(f"Failed to start service {name}: {e}")
             return False
     
-    def _run_service(self, name: str, service_instance):
-        """Run a service instance"""
+    def _run_service(self, name: str, generation: int):
+        """Run a service and report its exit to the supervisor"""
+        service = self.services[name]
+        error = None
         try:
+            service_instance = service['class'](*service['args'], **service['kwargs'])
+            service['instance'] = service_instance
             if hasattr(service_instance, 'run'):
                 service_instance.run()
             elif hasattr(service_instance, 'start'):
                 service_instance.start()
-            else:
-                logger.error(f"Service {name} has no run() or start() method")
         except Exception as e:
             logger.error(f"Service {name} crashed: {e}")
-            self._handle_service_crash(name)
+            error = e
+        finally:
+            self._events.put((name, generation, error))
     
-    def stop_service(self, name: str) -> bool:
+    async def _run_task_service(self, name: str, generation: int):
+        """Run a task service, restarting it with backoff when it exits
+        
+        Task services supervise themselves on the loop, so the asyncio runtime
+        needs no supervisor thread.
+        """
+        service = self.services[name]
+        while True:
+            try:
+                await service['class'](*service['args'], **service['kwargs'])
+                error = None
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Service {name} crashed: {e}")
+                error = e
+            
+            if service['stopping'] or service['generation'] != generation:
+                return
+            logger.warning(f"Service {name} exited unexpectedly ({error or 'no error'}), attempting restart...")
+            if not self._can_restart(name):
+                logger.error(f"Service {name} exceeded restart limits, not restarting")
+                return
+            
+            delay = min(2 ** service['restart_count'] - 1, MAX_RESTART_BACKOFF)
+            self._record_restart(name)
+            await asyncio.sleep(delay)
+    
+    def _service_alive(self, service: Dict) -> bool:
+        if service['mode'] == 'task':
+            return bool(service['task'] and not service['task'].done())
+        if service['mode'] == 'process':
+            return bool(service['process'] and _process_alive(service['process']))
+        return bool(service['thread'] and service['thread'].is_alive())
+    
+    def _start_process_service(self, name: str):
+        """Start a service in its own child process with a status pipe"""
+        service = self.services[name]
+        generation = service['generation']
+        parent_conn, child_conn = self._mp_context.Pipe()
+        
+        process = self._mp_context.Process(
+            target=_service_process_main,
+            args=(name, service['class'], service['args'], service['kwargs'], child_conn, self.heartbeat_interval),
+            name=f"service-{name}",
+            # Daemonic processes can't have children, and the bot needs its backup and chart pools,
+            # so stop_service and _terminate_processes stop it explicitly instead
+            daemon=False
+        )
+        process.start()
+        child_conn.close()
+        
+        service['process'] = process
+        service['conn'] = parent_conn
+        service['last_heartbeat'] = time.time()
+        service['status_report'] = {}
+        service['last_error'] = None
+        
+        threading.Thread(
+            target=self._read_service_messages,
+            args=(name, parent_conn, process),
+            name=f"service-{name}-ipc",
+            daemon=True
+        ).start()
+        self.process_watcher.watch(
+            process,
+            lambda p: self._events.put((name, generation, service['last_error'] or f"process exited with code {p.exitcode}"))
+        )
+    
+    def _read_service_messages(self, name: str, conn, process):
+        """Receive heartbeats and status reports from a process-isolated service"""
+        service = self.services[name]
+        limit = service['memory_limit_mb']
+        
+        while True:
+            try:
+                kind, payload = conn.recv()
+            except (EOFError, OSError):
+                return
+            
+            if kind == 'heartbeat':
+                service['last_heartbeat'] = payload
+                if limit:
+                    try:
+                        rss_mb = psutil.Process(process.pid).memory_info().rss / 1024 / 1024
+                    except psutil.Error:
+                        continue
+                    if rss_mb > limit:
+                        logger.error(f"Service {name} uses {rss_mb:.0f} MB, over its {limit} MB limit, terminating")
+                        service['last_error'] = f"memory limit exceeded ({rss_mb:.0f} MB)"
+                        process.kill()
+            elif kind == 'progress':
+                service['last_progress'] = max(service['last_progress'] or 0, payload)
+            elif kind == 'stacks':
+                service['last_stack'] = payload
+                service['stack_received'].set()
+            elif kind == 'status':
+                service['status_report'].update(payload)
+            elif kind == 'error':
+                service['last_error'] = payload
+    
+    def stop_service(self, name: str, timeout: float = 10) -> bool:
         """Stop a specific service"""
         if name not in self.services:
             logger.error(f"Service {name} not registered")
             return False
         
         service = self.services[name]
+        service['stopping'] = True
+        
+        if service['mode'] == 'process':
+            return self._stop_process_service(name, timeout)
+        
+        if service['mode'] == 'task':
+            # Cancellation lands at the task's next await, stop_task_services waits for it
+            if service['task'] and not service['task'].done():
+                service['task'].cancel()
+            logger.info(f"Service {name} stopped")
+            return True
         
         try:
             # Stop the service thread
@@ -118,13 +492,51 @@ class ServiceManager:
                     service['instance'].stop()
                 
                 # Wait for thread to finish
-                service['thread'].join(timeout=10)
+                service['thread'].join(timeout=timeout)
                 
+                # Keep tracking a thread that won't stop so no second copy is started next to it
                 if service['thread'].is_alive():
                     logger.warning(f"Service {name} did not stop gracefully")
+                    return False
+            
+            if service['process'] and _process_alive(service['process']):
+                service['process'].terminate()
             
             service['process'] = None
             service['thread'] = None
+            service['instance'] = None
+            logger.info(f"Service {name} stopped")
+            return True
+            
+        except Exception as e:
+            logger.error(f"Failed to stop service {name}: {e}")
+            return False
+    
+    def _stop_process_service(self, name: str, timeout: float = 10) -> bool:
+        """Ask a process service to stop, then terminate and kill it if it doesn't"""
+        service = self.services[name]
+        process = service['process']
+        
+        try:
+            if process and process.is_alive():
+                try:
+                    service['conn'].send('stop')
+                except (OSError, ValueError):
+                    pass
+                process.join(timeout=timeout)
+                
+                if process.is_alive():
+                    logger.warning(f"Service {name} did not stop gracefully, terminating")
+                    process.terminate()
+                    process.join(timeout=5)
+                if process.is_alive():
+                    process.kill()
+                    process.join()
+            
+            if service['conn']:
+                service['conn'].close()
+            service['process'] = None
+            service['conn'] = None
             logger.info(f"Service {name} stopped")
             return True
             
@@ -132,6 +544,20 @@ class ServiceManager:
             logger.error(f"Failed to stop service {name}: {e}")
             return False
     
+    def _terminate_processes(self):
+        """Terminate and join process services that are still running at exit"""
+        for name, service in self.services.items():
+            process = service['process'] if service['mode'] == 'process' else None
+            if process is None or not process.is_alive():
+                continue
+            service['stopping'] = True
+            logger.warning(f"Service {name} still running at exit, terminating")
+            process.terminate()
+            process.join(timeout=5)
+            if process.is_alive():
+                process.kill()
+                process.join()
+    
     def restart_service(self, name: str) -> bool:
         """Restart a specific service"""
         logger.info(f"Restarting service: {name}")
@@ -141,10 +567,206 @@ class ServiceManager:
             logger.error(f"Service {name} has exceeded restart limits")
             return False
         
-        # Stop and start service
+        self._record_restart(name)
+        
+        # Stop and start service, done once it is ready again
         self.stop_service(name)
-        time.sleep(2)
-        return self.start_service(name)
+        if not self.start_service(name):
+            return False
+        return self.wait_until_ready(name)
+    
+    def heartbeat(self, name: str):
+        """Record that a service is making progress
+        
+        Call it from the service's own loop, not a helper thread, so a hang in
+        the service stops the heartbeats. Inside a process service the
+        heartbeat goes over the status pipe.
+        """
+        now = time.time()
+        if _service_conn is not None:
+            report_progress()
+            return
+        service = self.services.get(name)
+        if service:
+            service['last_progress'] = max(service['last_progress'] or 0, now)
+    
+    def _capture_stack(self, name: str) -> str:
+        """Stack of whatever a hung service is stuck on"""
+        service = self.services[name]
+        
+        if service['mode'] == 'process':
+            service['stack_received'].clear()
+            try:
+                service['conn'].send('dump_stacks')
+            except (OSError, ValueError, AttributeError):
+                return "(process not reachable)"
+            if not service['stack_received'].wait(timeout=2):
+                return "(process did not answer the stack dump request)"
+            return service['last_stack']
+        
+        if service['mode'] == 'task':
+            stack = format_task_stack(service['task']) if service['task'] else ""
+            # If the loop itself is blocked the task stack shows nothing useful
+            return f"{stack}\nEvent loop thread:\n{format_thread_stack(service['loop_thread'])}"
+        
+        thread = service['thread']
+        return format_thread_stack(thread.ident) if thread else "(no thread)"
+    
+    def _restart_hung_service(self, name: str):
+        """Log where a service is stuck and restart it where that can work"""
+        service = self.services[name]
+        stack = self._capture_stack(name)
+        service['last_stack'] = stack
+        logger.error(f"Service {name} missed its heartbeat deadline, stack:\n{stack}")
+        
+        if not self._can_restart(name):
+            logger.error(f"Service {name} exceeded restart limits, not restarting")
+            return
+        
+        if service['mode'] == 'task':
+            # The restart has to run on the service's loop, which may be the thing that is stuck
+            loop = service['loop']
+            responsive = threading.Event()
+            try:
+                loop.call_soon_threadsafe(responsive.set)
+            except RuntimeError:
+                pass
+            if not responsive.wait(2):
+                self._escalate_hang(name, "its event loop is blocked")
+                return
+            self._record_restart(name)
+            asyncio.run_coroutine_threadsafe(self._restart_task_service(name), loop)
+            return
+        
+        self._record_restart(name)
+        if service['mode'] == 'thread' and not self.stop_service(name, timeout=2):
+            # A thread stuck in a blocking call can't be killed. Once it returns
+            # its exit goes to the supervisor, which restarts the service then
+            service['stopping'] = False
+            self._escalate_hang(name, "its thread can't be stopped")
+            return
+        if service['mode'] == 'process':
+            self.stop_service(name, timeout=2)
+        self.start_service(name)
+    
+    def _escalate_hang(self, name: str, reason: str):
+        """Report a hang that can't be fixed in place, exit if services.exit_on_hang is set
+        
+        With exit_on_hang the whole bot exits so the OS service manager
+        (systemd Restart=always, NSSM) starts it again from scratch.
+        """
+        logger.critical(f"Service {name} is hung and can't be restarted in place: {reason}")
+        if not self.exit_on_hang:
+            return
+        logger.critical("Exiting so the bot is restarted by the system service manager (services.exit_on_hang)")
+        self._terminate_processes()
+        logging.shutdown()
+        os._exit(1)
+    
+    async def _restart_task_service(self, name: str):
+        task = self.services[name]['task']
+        self.stop_service(name)
+        if task:
+            await asyncio.gather(task, return_exceptions=True)
+        self.start_service(name)
+    
+    def start_watchdog(self):
+        """Start the thread that restarts services which stop sending heartbeats
+        
+        It is a thread even in the asyncio runtime so that it still runs
+        when something blocks the event loop.
+        """
+        if self._watchdog_thread and self._watchdog_thread.is_alive():
+            return
+        self._watchdog_stop.clear()
+        self._watchdog_thread = threading.Thread(target=self._watchdog, name="service-watchdog", daemon=True)
+        self._watchdog_thread.start()
+    
+    def stop_watchdog(self):
+        self._watchdog_stop.set()
+    
+    def _watchdog(self):
+        while not self._watchdog_stop.wait(self.watchdog_interval):
+            now = time.time()
+            for name, service in list(self.services.items()):
+                timeout = service['heartbeat_timeout']
+                if (not timeout or service['stopping'] or
+                        service['last_progress'] is None or not self._service_alive(service)):
+                    continue
+                if now - service['last_progress'] <= timeout:
+                    # A hang that couldn't be restarted in place may clear up by itself
+                    if service['hung']:
+                        logger.info(f"Service {name} is sending heartbeats again")
+                        service['hung'] = False
+                    continue
+                if service['hung']:
+                    continue
+                
+                service['hung'] = True
+                # Restart in its own thread so stopping this service never delays the others
+                threading.Thread(
+                    target=self._restart_hung_service, args=(name,), name=f"watchdog-{name}", daemon=True
+                ).start()
+    
+    def get_status_report(self, name: str) -> Dict:
+        """Latest fields a process service sent with report_status()"""
+        return self.services[name]['status_report']
+    
+    def is_ready(self, name: str) -> bool:
+        """Check whether a service is running and passes its readiness probe"""
+        service = self.services[name]
+        if not self._service_alive(service):
+            ready = False
+        elif service['readiness_probe'] is None:
+            ready = True
+        else:
+            try:
+                with PROBE_LATENCY.time(probe=name):
+                    ready = bool(service['readiness_probe']())
+            except Exception as e:
+                logger.debug(f"Readiness probe of {name} failed: {e}")
+                ready = False
+        SERVICE_READY.set(int(ready), service=name)
+        return ready
+    
+    def wait_until_ready(self, name: str, timeout: Optional[float] = None) -> bool:
+        """Block until a service is ready or the timeout (default: its ready_timeout) expires"""
+        timeout = self.services[name]['ready_timeout'] if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        delay = 0.05
+        
+        while not self.is_ready(name):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                logger.warning(f"Service {name} not ready after {timeout}s")
+                return False
+            time.sleep(min(delay, remaining))
+            delay = min(delay * 2, 0.25)
+        return True
+    
+    def _dependency_order(self) -> List[str]:
+        """Service names ordered so every service comes after its dependencies"""
+        pending = {}
+        for name, service in self.services.items():
+            deps = set()
+            for dep in service['depends_on']:
+                if dep in self.services:
+                    deps.add(dep)
+                else:
+                    logger.warning(f"Service {name} depends on unknown service {dep}, ignoring")
+            pending[name] = deps
+        
+        order = []
+        while pending:
+            ready = [name for name, deps in pending.items() if not deps]
+            if not ready:
+                raise ValueError(f"Circular service dependencies: {', '.join(sorted(pending))}")
+            for name in ready:
+                order.append(name)
+                del pending[name]
+            for deps in pending.values():
+                deps.difference_update(ready)
+        return order
     
     def _can_restart(self, name: str) -> bool:
         """Check if service can be restarted based on limits"""
@@ -157,38 +779,149 @@ class ServiceManager:
             service['restart_count'] = 0
         
         # Check if restart limit exceeded
-        if service['restart_count'] >= self.max_restarts:
-            return False
-        
-        # Update restart count and timestamp
+        return service['restart_count'] < self.max_restarts
+    
+    def _record_restart(self, name: str):
+        """Update restart count and timestamp"""
+        service = self.services[name]
         service['restart_count'] += 1
-        service['last_restart'] = now
-        
-        return True
+        service['last_restart'] = datetime.now()
+        SERVICE_RESTARTS.inc(service=name)
     
-    def _handle_service_crash(self, name: str):
+    def _handle_service_crash(self, name: str, error=None):
         """Handle service crash and restart if needed"""
-        logger.warning(f"Service {name} crashed, attempting restart...")
+        service = self.services[name]
+        logger.warning(f"Service {name} exited unexpectedly ({error or 'no error'}), attempting restart...")
         
-        if self._can_restart(name):
-            time.sleep(5)  # Wait before restart
-            self.start_service(name)
-        else:
+        if not self._can_restart(name):
             logger.error(f"Service {name} exceeded restart limits, not restarting")
+            return
+        
+        # First restart is immediate, repeated crashes back off exponentially
+        delay = min(2 ** service['restart_count'] - 1, MAX_RESTART_BACKOFF)
+        self._record_restart(name)
+        generation = service['generation']
+        
+        def restart():
+            # Skip if the service was stopped or restarted in the meantime
+            if not self.monitoring_active or service['stopping'] or service['generation'] != generation:
+                return
+            # A watched process can die while its service thread lives on, stop the thread first
+            if self._service_alive(service):
+                self.stop_service(name)
+            self.start_service(name)
+        
+        # Restart off the supervisor thread so stopping a service never delays other exits
+        timer = threading.Timer(delay, restart)
+        timer.daemon = True
+        timer.start()
     
     def start_all_services(self):
-        """Start all registered services"""
+        """Start all registered services, independent ones concurrently
+        
+        Each service waits only for its own dependencies, so startup takes
+        as long as the slowest dependency chain. A dependency that never
+        becomes ready delays its dependents by its ready_timeout and they
+        are then started anyway, supervision takes over from there.
+        """
         logger.info("Starting all services...")
+        start = time.monotonic()
         
-        for name in self.services:
-            if not self.start_service(name):
-                logger.error(f"Failed to start service: {name}")
+        order = self._dependency_order()
+        settled = {name: threading.Event() for name in order}
+        
+        def launch(name):
+            try:
+                for dep in self.services[name]['depends_on']:
+                    if dep in settled:
+                        settled[dep].wait()
+                        if not self.is_ready(dep):
+                            logger.warning(f"Dependency {dep} of {name} is not ready, starting {name} anyway")
+                
+                if not self.start_service(name):
+                    logger.error(f"Failed to start service: {name}")
+                else:
+                    self.wait_until_ready(name)
+            finally:
+                settled[name].set()
+        
+        if order:
+            with ThreadPoolExecutor(max_workers=len(order), thread_name_prefix="service-start") as pool:
+                list(pool.map(launch, order))
+        
+        logger.info(f"All services started in {time.monotonic() - start:.2f}s")
+    
+    async def wait_until_ready_async(self, name: str, timeout: Optional[float] = None) -> bool:
+        """wait_until_ready for the event loop, probes run in the default executor"""
+        timeout = self.services[name]['ready_timeout'] if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        delay = 0.05
+        
+        while not await asyncio.to_thread(self.is_ready, name):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                logger.warning(f"Service {name} not ready after {timeout}s")
+                return False
+            await asyncio.sleep(min(delay, remaining))
+            delay = min(delay * 2, 0.25)
+        return True
+    
+    async def start_task_services(self):
+        """Start all task services on the running loop, in dependency order"""
+        logger.info("Starting all services...")
+        start = time.monotonic()
+        
+        order = self._dependency_order()
+        settled = {name: asyncio.Event() for name in order}
+        
+        async def launch(name):
+            try:
+                for dep in self.services[name]['depends_on']:
+                    if dep in settled:
+                        await settled[dep].wait()
+                        if not await asyncio.to_thread(self.is_ready, dep):
+                            logger.warning(f"Dependency {dep} of {name} is not ready, starting {name} anyway")
+                
+                if not self.start_service(name):
+                    logger.error(f"Failed to start service: {name}")
+                else:
+                    await self.wait_until_ready_async(name)
+            finally:
+                settled[name].set()
+        
+        await asyncio.gather(*(launch(name) for name in order))
+        logger.info(f"All services started in {time.monotonic() - start:.2f}s")
+    
+    async def stop_task_services(self, timeout: float = 10):
+        """Cancel task services, dependents first, and wait for each to finish"""
+        logger.info("Stopping all services...")
+        
+        try:
+            order = self._dependency_order()
+        except ValueError:
+            order = list(self.services)
+        
+        for name in reversed(order):
+            task = self.services[name]['task']
+            self.stop_service(name)
+            if task is None:
+                continue
+            try:
+                await asyncio.wait_for(asyncio.gather(task, return_exceptions=True), timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"Service {name} did not stop gracefully")
+            self.services[name]['task'] = None
     
     def stop_all_services(self):
-        """Stop all registered services"""
+        """Stop all registered services, dependents before their dependencies"""
         logger.info("Stopping all services...")
         
-        for name in self.services:
+        try:
+            order = self._dependency_order()
+        except ValueError:
+            order = list(self.services)
+        
+        for name in reversed(order):
             self.stop_service(name)
     
     def restart_all_services(self):
@@ -196,7 +929,11 @@ class ServiceManager:
         logger.info("Restarting all services...")
         
         for name in self.services:
-            self.restart_service(name)
+            if self._can_restart(name):
+                self._record_restart(name)
+        
+        self.stop_all_services()
+        self.start_all_services()
     
     def get_service_status(self, name: str) -> Dict:
         """Get status of a specific service"""
@@ -207,18 +944,34 @@ class ServiceManager:
         
         status = {
             "name": name,
-            "running": False,
+            "mode": service['mode'],
+            "running": self._service_alive(service),
+            "ready": self.is_ready(name),
+            "hung": service['hung'],
             "restart_count": service['restart_count'],
             "last_restart": service['last_restart'].isoformat() if service['last_restart'] else None,
             "can_restart": self._can_restart(name)
         }
         
-        # Check if service is actually running
-        if service['thread'] and service['thread'].is_alive():
-            status["running"] = True
+        if service['heartbeat_timeout'] and service['last_progress']:
+            status["last_progress_age"] = max(time.time() - service['last_progress'], 0)
+        
+        if service['mode'] == 'process' and status["running"]:
+            status["pid"] = service['process'].pid
+            status["last_heartbeat"] = service['last_heartbeat']
+            status["report"] = dict(service['status_report'])
+            try:
+                status["rss_mb"] = psutil.Process(service['process'].pid).memory_info().rss / 1024 / 1024
+            except psutil.Error:
+                pass
         
         return status
     
+    def _collect_metrics(self):
+        """Refresh service up gauges before a metrics scrape"""
+        for name, service in list(self.services.items()):
+            SERVICE_UP.set(int(self._service_alive(service)), service=name)
+    
     def get_all_status(self) -> Dict:
         """Get status of all services"""
         status = {}
@@ -227,34 +980,40 @@ class ServiceManager:
         return status
     
     def start_monitoring(self):
-        """Start monitoring all services"""
+        """Start supervising services, restarting them as soon as they exit"""
+        if self._supervisor_thread and self._supervisor_thread.is_alive():
+            return
+        
         self.monitoring_active = True
-        monitor_thread = threading.Thread(target=self._monitor_services, daemon=True)
-        monitor_thread.start()
+        self._supervisor_thread = threading.Thread(target=self._supervise, name="service-supervisor", daemon=True)
+        self._supervisor_thread.start()
+        self.start_watchdog()
         logger.info("Service monitoring started")
     
     def stop_monitoring(self):
         """Stop monitoring services"""
         self.monitoring_active = False
+        self._events.put(None)
+        self.stop_watchdog()
         logger.info("Service monitoring stopped")
     
-    def _monitor_services(self):
-        """Monitor services and restart if needed"""
+    def _supervise(self):
+        """Block on service exit events and restart crashed services"""
         while self.monitoring_active:
+            event = self._events.get()
+            if event is None:
+                continue
+            
+            name, generation, error = event
+            service = self.services.get(name)
+            # Ignore exits of services that were stopped on purpose or already replaced
+            if not service or service['stopping'] or service['generation'] != generation:
+                continue
+            
             try:
-                for name, service in self.services.items():
-                    if not service['thread'] or not service['thread'].is_alive():
-                        logger.warning(f"Service {name} is not running, attempting restart...")
-                        if self._can_restart(name):
-                            self.start_service(name)
-                        else:
-                            logger.error(f"Service {name} exceeded restart limits")
-                
-                time.sleep(30)  # Check every 30 seconds
-                
+                self._handle_service_crash(name, error)
             except Exception as e:
                 logger.error(f"Error in service monitoring: {e}")
-                time.sleep(60)
     
     def create_systemd_service(self, service_name: str = "minecraft-bot") -> str:
         """Create systemd service file for Linux"""
@@ -357,7 +1116,7 @@ echo To remove: nssm remove {service_name} confirm
             service_health = self.get_service_status(name)
             health["services"][name] = service_health
             
-            if not service_health.get("running", False):
+            if not service_health.get("running", False) or service_health.get("hung"):
                 health["overall_status"] = "unhealthy"
         
         # Check system resources
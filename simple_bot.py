@@ -12,6 +12,9 @@ import logging
 import time
 from datetime import datetime
 from mcstatus import JavaServer
+from endpoints import ServerEndpoints
+from command_perf import CommandPerf, blocking
+from status_cache import PresenceUpdater, StatusCache
 
 # Setup logging
 logging.basicConfig(
@@ -27,6 +30,8 @@ logger = logging.getLogger(__name__)
 class SimpleMinecraftBot:
     def __init__(self):
         self.config = self.load_config()
+        self.endpoints = ServerEndpoints.from_config(self.config)
+        self.status_cache = StatusCache(lambda: blocking(self.endpoints.status), ttl=15)
         self.server_running = False
         self.startup_time = None
         
@@ -34,6 +39,12 @@ class SimpleMinecraftBot:
         intents = discord.Intents.default()
         intents.message_content = True
         self.bot = commands.Bot(command_prefix=self.config['discord']['prefix'], intents=intents)
+        self.perf = CommandPerf()
+        self.perf.install(self.bot)
+        self.presence = PresenceUpdater(
+            self.bot, self.status_cache,
+            lambda: self.config['minecraft'].get('server_name') or self.config['minecraft'].get('server_host', 'localhost')
+        )
         
         self.setup_events()
         self.setup_commands()
@@ -56,6 +67,7 @@ class SimpleMinecraftBot:
         async def on_ready():
             logger.info(f'{self.bot.user} has connected to Discord!')
             logger.info(f'Bot is ready to use!')
+            self.presence.start()
         
         @self.bot.event
         async def on_command_error(ctx, error):
@@ -74,24 +86,23 @@ class SimpleMinecraftBot:
         async def server_status(ctx):
             """Get server status"""
             try:
-                server_host = self.config['minecraft'].get('server_host', 'localhost')
-                server_port = self.config['minecraft'].get('server_port', 25565)
-                server_address = f"{server_host}:{server_port}"
-                
-                server = JavaServer.lookup(server_address)
-                status = server.status()
+                # Shared with the presence, probed over the best endpoint only when stale
+                snapshot = await self.status_cache.get()
+                if not snapshot['online']:
+                    raise ConnectionError(snapshot['error'])
+                server_address = snapshot['endpoint']
                 
                 embed = discord.Embed(
                     title="🟢 Minecraft Server Status", 
                     color=0x00ff00
                 )
                 embed.add_field(name="Server", value=server_address, inline=False)
-                embed.add_field(name="Players", value=f"{status.players.online}/{status.players.max}", inline=True)
-                embed.add_field(name="Version", value=status.version.name, inline=True)
-                embed.add_field(name="Ping", value=f"{status.latency:.1f}ms", inline=True)
+                embed.add_field(name="Players", value=f"{snapshot['players_online']}/{snapshot['players_max']}", inline=True)
+                embed.add_field(name="Version", value=snapshot['version'], inline=True)
+                embed.add_field(name="Ping", value=f"{snapshot['latency']:.1f}ms", inline=True)
                 
-                if status.players.sample:
-                    player_list = ", ".join([player.name for player in status.players.sample])
+                if snapshot['players']:
+                    player_list = ", ".join(snapshot['players'])
                     embed.add_field(name="Online Players", value=player_list, inline=False)
                 
                 await ctx.send(embed=embed)
@@ -108,15 +119,12 @@ class SimpleMinecraftBot:
         async def list_players(ctx):
             """List online players"""
             try:
-                server_host = self.config['minecraft'].get('server_host', 'localhost')
-                server_port = self.config['minecraft'].get('server_port', 25565)
-                server_address = f"{server_host}:{server_port}"
-                
-                server = JavaServer.lookup(server_address)
-                status = server.status()
+                snapshot = await self.status_cache.get()
+                if not snapshot['online']:
+                    raise ConnectionError(snapshot['error'])
                 
-                if status.players.sample:
-                    player_list = "\n".join([f"• {player.name}" for player in status.players.sample])
+                if snapshot['players']:
+                    player_list = "\n".join(f"• {name}" for name in snapshot['players'])
                     embed = discord.Embed(
                         title="👥 Online Players", 
                         description=player_list,
@@ -129,7 +137,7 @@ class SimpleMinecraftBot:
                         color=0xffaa00
                     )
                 
-                embed.add_field(name="Total", value=f"{status.players.online}/{status.players.max}", inline=True)
+                embed.add_field(name="Total", value=f"{snapshot['players_online']}/{snapshot['players_max']}", inline=True)
                 await ctx.send(embed=embed)
                 
             except Exception as e:
@@ -141,7 +149,7 @@ class SimpleMinecraftBot:
             if ip and port:
                 try:
                     server = JavaServer.lookup(f"{ip}:{port}")
-                    status = server.status()
+                    status = await blocking(server.status)
                     
                     # Update config
                     self.config['minecraft']['server_host'] = ip
@@ -149,6 +157,8 @@ class SimpleMinecraftBot:
                     
                     with open('config.json', 'w') as f:
                         json.dump(self.config, f, indent=2)
+                    # The cached snapshot was for the old server
+                    self.status_cache.record(status, (ip, port))
                     
                     embed = discord.Embed(
                         title="✅ Connected to Server",
@@ -0,0 +1,266 @@
+import json
+import asyncio
+import hashlib
+import logging
+import threading
+from typing import Dict, Optional, Set, Tuple
+
+import numpy as np
+from aiohttp import web
+
+from charts import WINDOWS, history_series
+from events import EVENT_TYPES, EventBus, Subscription
+from status_cache import StatusCache
+from status_history import StatusHistory
+
+logger = logging.getLogger(__name__)
+
+# SSE comment sent when a stream has been idle this long, keeps proxies from closing it
+KEEPALIVE = 15
+
+
+class CachedResponse:
+    """A JSON body with its ETag, built once and served until it is replaced"""
+
+    def __init__(self, payload: Dict, max_age: float):
+        self.body = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+        self.etag = f'"{hashlib.sha1(self.body).hexdigest()[:20]}"'
+        self.headers = {"ETag": self.etag, "Cache-Control": f"public, max-age={int(max_age)}"}
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header covers etag, weak tags compare equal to strong ones"""
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(',')]
+    return '*' in tags or etag in (tag[2:] if tag.startswith('W/') else tag for tag in tags)
+
+
+def public_status(snapshot: Dict) -> Dict:
+    # The endpoint and probe errors can carry the VPN address, they are left out
+    return {
+        "online": snapshot["online"],
+        "players_online": snapshot["players_online"],
+        "players_max": snapshot["players_max"],
+        "version": snapshot["version"],
+        "latency": snapshot["latency"],
+        "updated_at": snapshot["updated_at"]
+    }
+
+
+def public_players(snapshot: Dict) -> Dict:
+    return {
+        "online": snapshot["players_online"],
+        "max": snapshot["players_max"],
+        "players": snapshot["players"],
+        "updated_at": snapshot["updated_at"]
+    }
+
+
+def _values(array: np.ndarray, digits: int):
+    return [None if np.isnan(value) else round(float(value), digits) for value in array]
+
+
+class StatusAPI:
+    """Read-only JSON API over the status cache and the status history
+
+    /status and /players are served from the latest snapshot, nothing here
+    ever probes the server. Each snapshot's bodies and ETags are built once
+    when it arrives, so a request is a dictionary lookup, and a matching
+    If-None-Match gets an empty 304. /history is bucketed like !graph and
+    cached until a sample lands in a newer bucket. /events streams the event
+    bus over a WebSocket, or as server-sent events to plain HTTP clients,
+    each client reading from its own bounded queue. The server runs on its
+    own thread and event loop so API traffic can't delay the Discord bot.
+    """
+
+    def __init__(self, cache: StatusCache, history: StatusHistory, config: Dict,
+                 events: Optional[EventBus] = None):
+        self.history = history
+        self.events = events
+        self._streams: Set[Subscription] = set()
+        self._status: Optional[CachedResponse] = None
+        self._players: Optional[CachedResponse] = None
+        self._history: Dict[str, Tuple[Tuple, asyncio.Future]] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.apply_config(config)
+        cache.subscribe(self._on_snapshot)
+        if cache.snapshot:
+            self._on_snapshot(cache.snapshot)
+
+    def apply_config(self, config: Dict):
+        """Read API settings, restarting the server if its address or enabled flag changed"""
+        api_config = config.get('api', {})
+        previous = (getattr(self, 'enabled', None), getattr(self, 'host', None), getattr(self, 'port', None))
+        self.enabled = api_config.get('enabled', False)
+        self.host = api_config.get('host', '127.0.0.1')
+        self.port = api_config.get('port', 8765)
+        self.max_age = api_config.get('max_age', 10)
+        self.allow_origin = api_config.get('allow_origin', '*')
+        self.max_clients = api_config.get('max_clients', 100)
+        self.event_queue = api_config.get('event_queue', 100)
+
+        if previous[0] is not None and previous != (self.enabled, self.host, self.port):
+            self.stop()
+            self.start()
+
+    def _on_snapshot(self, snapshot: Dict):
+        self._status = CachedResponse(public_status(snapshot), self.max_age)
+        self._players = CachedResponse(public_players(snapshot), self.max_age)
+
+    def start(self):
+        """Serve from a daemon thread if the API is enabled"""
+        if not self.enabled or (self._thread and self._thread.is_alive()):
+            return
+        started = threading.Event()
+        self._thread = threading.Thread(target=self._serve, args=(started,), name="status-api", daemon=True)
+        self._thread.start()
+        started.wait(10)
+
+    def stop(self):
+        if self._loop and self._thread and self._thread.is_alive():
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(10)
+        self._thread = None
+
+    def _serve(self, started: threading.Event):
+        loop = self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        runner = web.AppRunner(self.make_app(), access_log=None)
+        try:
+            loop.run_until_complete(runner.setup())
+            loop.run_until_complete(web.TCPSite(runner, self.host, self.port).start())
+        except OSError as e:
+            logger.error(f"Could not start status API on {self.host}:{self.port}: {e}")
+            started.set()
+            loop.run_until_complete(runner.cleanup())
+            loop.close()
+            return
+        logger.info(f"Status API available at http://{self.host}:{self.port}/status")
+        started.set()
+        try:
+            loop.run_forever()
+        finally:
+            loop.run_until_complete(runner.cleanup())
+            loop.close()
+            self._history.clear()
+
+    def make_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get('/status', self.handle_status)
+        app.router.add_get('/players', self.handle_players)
+        app.router.add_get('/history', self.handle_history)
+        if self.events is not None:
+            app.router.add_get('/events', self.handle_events)
+            app.on_shutdown.append(self._close_streams)
+        return app
+
+    def _respond(self, request: web.Request, cached: Optional[CachedResponse]) -> web.Response:
+        if cached is None:
+            return web.json_response({"error": "No status yet"}, status=503, headers={"Retry-After": "5"})
+        headers = dict(cached.headers)
+        if self.allow_origin:
+            headers["Access-Control-Allow-Origin"] = self.allow_origin
+        if etag_matches(request.headers.get('If-None-Match'), cached.etag):
+            return web.Response(status=304, headers=headers)
+        return web.Response(body=cached.body, content_type='application/json', headers=headers)
+
+    async def handle_status(self, request: web.Request) -> web.Response:
+        return self._respond(request, self._status)
+
+    async def handle_players(self, request: web.Request) -> web.Response:
+        return self._respond(request, self._players)
+
+    async def handle_history(self, request: web.Request) -> web.Response:
+        window = request.query.get('window', '24h')
+        if window not in WINDOWS:
+            return web.json_response({"error": f"window must be one of {', '.join(WINDOWS)}"}, status=400)
+        last = self.history.last_sample_ts()
+        key = (window, int(last // WINDOWS[window][1])) if last else (window, None)
+
+        cached = self._history.get(window)
+        if cached is None or cached[0] != key or (cached[1].done() and cached[1].exception()):
+            cached = self._history[window] = (key, asyncio.ensure_future(asyncio.to_thread(self._build_history, window)))
+        return self._respond(request, await asyncio.shield(cached[1]))
+
+    def _build_history(self, window: str) -> CachedResponse:
+        series = history_series(self.history, window)
+        payload = {"window": window, "bucket": WINDOWS[window][1], "ts": [], "players": [], "latency": [], "ram": []}
+        if series is not None:
+            payload.update({
+                "ts": [int(t) for t in series["ts"]],
+                "players": _values(series["players"], 2),
+                "latency": _values(series["latency"], 1),
+                "ram": _values(series["ram"], 1)
+            })
+        return CachedResponse(payload, self.history.sample_interval)
+
+    async def handle_events(self, request: web.Request) -> web.StreamResponse:
+        if len(self._streams) >= self.max_clients:
+            return web.json_response({"error": "Too many event clients"}, status=503, headers={"Retry-After": "30"})
+        types = set(request.query['types'].split(',')) & set(EVENT_TYPES) if request.query.get('types') else None
+        last_event_id = request.headers.get('Last-Event-ID') or request.query.get('last_event_id')
+        subscription = self.events.subscribe(self.event_queue, types,
+                                             int(last_event_id) if str(last_event_id).isdigit() else None)
+        self._streams.add(subscription)
+        try:
+            websocket = web.WebSocketResponse(heartbeat=30)
+            if websocket.can_prepare(request).ok:
+                return await self._stream_websocket(request, websocket, subscription)
+            return await self._stream_sse(request, subscription)
+        finally:
+            self._streams.discard(subscription)
+            self.events.unsubscribe(subscription)
+
+    async def _stream_websocket(self, request: web.Request, websocket: web.WebSocketResponse,
+                                subscription: Subscription) -> web.WebSocketResponse:
+        await websocket.prepare(request)
+
+        async def drain_incoming():
+            # Clients don't send anything, reading is how a close from their side is noticed
+            async for _ in websocket:
+                pass
+            subscription.close()
+
+        reader = asyncio.ensure_future(drain_incoming())
+        try:
+            while True:
+                event = await subscription.get()
+                if event is None or websocket.closed:
+                    break
+                # Waits while the client's socket buffer is full, its queue fills and drops meanwhile
+                await websocket.send_str(event.json)
+        except (ConnectionResetError, asyncio.CancelledError):
+            pass
+        finally:
+            reader.cancel()
+            await websocket.close()
+        return websocket
+
+    async def _stream_sse(self, request: web.Request, subscription: Subscription) -> web.StreamResponse:
+        response = web.StreamResponse(headers={
+            "Content-Type": "text/event-stream",
+            "Cache-Control": "no-cache",
+            **({"Access-Control-Allow-Origin": self.allow_origin} if self.allow_origin else {})
+        })
+        await response.prepare(request)
+        try:
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscription.get(), timeout=KEEPALIVE)
+                except asyncio.TimeoutError:
+                    await response.write(b": keepalive\n\n")
+                    continue
+                if event is None:
+                    break
+                # Lagged notices aren't in the replay buffer, they carry no id to resume from
+                event_id = f"id: {event.id}\n" if event.id else ""
+                await response.write(f"{event_id}event: {event.type}\ndata: {event.json}\n\n".encode('utf-8'))
+        except ConnectionResetError:
+            pass
+        return response
+
+    async def _close_streams(self, app: web.Application):
+        for subscription in list(self._streams):
+            subscription.close()
@@ -0,0 +1,186 @@
+import time
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import discord
+
+logger = logging.getLogger(__name__)
+
+# Discord drops presence updates sent faster than this, and a count flapping
+# between two values shouldn't spam member lists either
+MIN_PRESENCE_INTERVAL = 20
+
+
+def snapshot_from_status(status, endpoint: Optional[Tuple[str, int]] = None) -> Dict:
+    """Plain dict of what the bots show from an mcstatus status response"""
+    sample = status.players.sample or []
+    return {
+        "online": True,
+        "players_online": status.players.online,
+        "players_max": status.players.max,
+        "players": [player.name for player in sample],
+        "version": status.version.name,
+        "latency": status.latency,
+        "endpoint": f"{endpoint[0]}:{endpoint[1]}" if endpoint else None,
+        "error": None,
+        "updated_at": time.time()
+    }
+
+
+def offline_snapshot(error) -> Dict:
+    return {
+        "online": False,
+        "players_online": 0,
+        "players_max": 0,
+        "players": [],
+        "version": None,
+        "latency": None,
+        "endpoint": None,
+        "error": str(error),
+        "updated_at": time.time()
+    }
+
+
+class StatusCache:
+    """Latest server status shared by commands, presence and monitoring
+
+    Loops that already probe the server hand their results to record() and
+    record_error(). get() only probes when the snapshot is older than
+    max_age, and concurrent callers share one probe. Subscribers are called
+    with every new snapshot.
+    """
+
+    def __init__(self, probe: Callable[[], Awaitable[Tuple[object, Optional[Tuple[str, int]]]]], ttl: float = 30):
+        self.probe = probe
+        self.ttl = ttl
+        self.snapshot: Optional[Dict] = None
+        self._subscribers: List[Callable[[Dict], None]] = []
+        self._refreshing: Optional[asyncio.Task] = None
+
+    def subscribe(self, callback: Callable[[Dict], None]):
+        self._subscribers.append(callback)
+
+    def _store(self, snapshot: Dict) -> Dict:
+        self.snapshot = snapshot
+        for callback in self._subscribers:
+            try:
+                callback(snapshot)
+            except Exception as e:
+                logger.error(f"Status subscriber failed: {e}")
+        return snapshot
+
+    def record(self, status, endpoint: Optional[Tuple[str, int]] = None) -> Dict:
+        return self._store(snapshot_from_status(status, endpoint))
+
+    def record_error(self, error) -> Dict:
+        return self._store(offline_snapshot(error))
+
+    def age(self) -> float:
+        return time.time() - self.snapshot["updated_at"] if self.snapshot else float('inf')
+
+    async def refresh(self) -> Dict:
+        """Probe now, or join a probe already in flight"""
+        if self._refreshing is None or self._refreshing.done():
+            self._refreshing = asyncio.ensure_future(self._probe())
+        return await asyncio.shield(self._refreshing)
+
+    async def _probe(self) -> Dict:
+        try:
+            status, endpoint = await self.probe()
+        except Exception as e:
+            return self.record_error(e)
+        return self.record(status, endpoint)
+
+    async def get(self, max_age: Optional[float] = None) -> Dict:
+        """The snapshot if it is at most max_age (default ttl) seconds old, otherwise a fresh one"""
+        if self.age() <= (self.ttl if max_age is None else max_age):
+            return self.snapshot
+        return await self.refresh()
+
+
+def presence_text(snapshot: Dict, server_name: str) -> str:
+    if not snapshot["online"]:
+        return f"{server_name} is offline"
+    return f"{snapshot['players_online']}/{snapshot['players_max']} on {server_name}"
+
+
+class PresenceUpdater:
+    """Keep the bot's "Playing 7/20 on ..." presence in sync with a StatusCache
+
+    The presence is sent only when its text changes and at most once every
+    MIN_PRESENCE_INTERVAL seconds, changes in between are coalesced into the
+    next update. If nothing else refreshes the cache, the snapshot is
+    refreshed every refresh_interval seconds.
+    """
+
+    def __init__(self, bot: discord.Client, cache: StatusCache, server_name: Callable[[], str],
+                 refresh_interval: Callable[[], float] = lambda: 60):
+        self.bot = bot
+        self.cache = cache
+        self.server_name = server_name
+        self.refresh_interval = refresh_interval
+        self._applied = None
+        self._last_sent = 0.0
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        cache.subscribe(self._on_snapshot)
+
+    def _on_snapshot(self, snapshot: Dict):
+        if self._wake:
+            self._wake.set()
+
+    def start(self):
+        """Start updating, call from the bot's event loop"""
+        if self._task and not self._task.done():
+            return
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+
+    def resend(self):
+        """Send the presence again, call on every on_ready
+
+        A new gateway session (after IDENTIFY rather than RESUME) starts
+        without a presence, change_presence doesn't carry it over.
+        """
+        self._applied = None
+        if self._wake:
+            self._wake.set()
+
+    async def _run(self):
+        await self.bot.wait_until_ready()
+        while not self.bot.is_closed():
+            self._wake.clear()
+            try:
+                await self.cache.get(max_age=self.refresh_interval())
+                await self._apply()
+            except Exception as e:
+                logger.error(f"Presence update failed: {e}")
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.refresh_interval())
+            except asyncio.TimeoutError:
+                pass
+
+    async def _apply(self):
+        if self.cache.snapshot is None or presence_text(self.cache.snapshot, self.server_name()) == self._applied:
+            return
+        delay = self._last_sent + MIN_PRESENCE_INTERVAL - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        # Take the latest snapshot after waiting, it may have changed back
+        snapshot = self.cache.snapshot
+        text = presence_text(snapshot, self.server_name())
+        if text == self._applied:
+            return
+        await self.bot.change_presence(
+            status=discord.Status.online if snapshot["online"] else discord.Status.idle,
+            activity=discord.Game(name=text)
+        )
+        self._applied = text
+        self._last_sent = time.monotonic()
+        logger.info(f"Presence set to \"{text}\"")
@@ -0,0 +1,112 @@
+import os
+import sqlite3
+import logging
+import threading
+from contextlib import closing
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS samples (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts REAL NOT NULL,
+    online INTEGER NOT NULL,
+    players INTEGER NOT NULL,
+    max_players INTEGER NOT NULL,
+    latency REAL,
+    ram REAL
+);
+CREATE TABLE IF NOT EXISTS player_samples (
+    sample_id INTEGER NOT NULL REFERENCES samples(id) ON DELETE CASCADE,
+    ts REAL NOT NULL,
+    name TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_samples_ts ON samples(ts);
+CREATE INDEX IF NOT EXISTS idx_player_samples_sample ON player_samples(sample_id);
+"""
+
+PRUNE_INTERVAL = 3600
+
+
+class StatusHistory:
+    """SQLite record of server status samples and who was online
+
+    Snapshots from the status cache are stored at most once every
+    sample_interval seconds. Samples older than retention_days are pruned
+    once an hour.
+    """
+
+    def __init__(self, db_path: str, sample_interval: float = 60, retention_days: float = 90):
+        self.db_path = db_path
+        self.sample_interval = sample_interval
+        self.retention_days = retention_days
+        self._lock = threading.Lock()
+        self._last_sample = 0.0
+        self._last_prune = 0.0
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.executescript(SCHEMA)
+            row = conn.execute("SELECT MAX(ts) FROM samples").fetchone()
+            self._last_sample = row[0] or 0.0
+
+    @classmethod
+    def from_config(cls, config: Dict) -> 'StatusHistory':
+        history_config = config.get('history', {})
+        return cls(history_config.get('path', 'history.db'),
+                   history_config.get('sample_interval', 60),
+                   history_config.get('retention_days', 90))
+
+    def apply_config(self, config: Dict):
+        history_config = config.get('history', {})
+        self.sample_interval = history_config.get('sample_interval', 60)
+        self.retention_days = history_config.get('retention_days', 90)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("PRAGMA foreign_keys = ON")
+        conn.execute("PRAGMA journal_mode = WAL")
+        return conn
+
+    def record(self, snapshot: Dict, ram: Optional[float] = None) -> Optional[int]:
+        """Store a status snapshot unless one was stored less than sample_interval ago"""
+        ts = snapshot['updated_at']
+        with self._lock:
+            if ts - self._last_sample < self.sample_interval:
+                return None
+            self._last_sample = ts
+            with closing(self._connect()) as conn, conn:
+                cursor = conn.execute(
+                    "INSERT INTO samples (ts, online, players, max_players, latency, ram) VALUES (?, ?, ?, ?, ?, ?)",
+                    (ts, int(snapshot['online']), snapshot['players_online'], snapshot['players_max'],
+                     snapshot['latency'], ram)
+                )
+                sample_id = cursor.lastrowid
+                conn.executemany(
+                    "INSERT INTO player_samples (sample_id, ts, name) VALUES (?, ?, ?)",
+                    ((sample_id, ts, name) for name in snapshot['players'])
+                )
+                if ts - self._last_prune > PRUNE_INTERVAL:
+                    self._last_prune = ts
+                    conn.execute("DELETE FROM samples WHERE ts < ?", (ts - self.retention_days * 86400,))
+        return sample_id
+
+    def samples_after(self, sample_id: int = 0, since: float = 0) -> List[Tuple]:
+        """(id, ts, online, players, max_players, latency, ram) rows in time order"""
+        with closing(self._connect()) as conn:
+            return conn.execute(
+                "SELECT id, ts, online, players, max_players, latency, ram FROM samples "
+                "WHERE id > ? AND ts >= ? ORDER BY id", (sample_id, since)
+            ).fetchall()
+
+    def players_after(self, sample_id: int, until_id: int, since: float = 0) -> List[Tuple]:
+        """(sample_id, ts, name) rows of samples after sample_id up to until_id, in time order"""
+        with closing(self._connect()) as conn:
+            return conn.execute(
+                "SELECT sample_id, ts, name FROM player_samples WHERE sample_id > ? AND sample_id <= ? AND ts >= ? "
+                "ORDER BY sample_id", (sample_id, until_id, since)
+            ).fetchall()
+
+    def last_sample_ts(self) -> Optional[float]:
+        """Time of the newest stored sample, None if there are none"""
+        return self._last_sample or None
@@ -0,0 +1,142 @@
+import os
+import sys
+import json
+import time
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from webhook_notifier import WebhookNotifier
+
+
+class StandIn:
+    """Local HTTP stand-in for a Discord webhook
+
+    Answers posts with the scripted (status, body) responses in order, then
+    with 204, and records when each post arrived and what it carried.
+    """
+
+    def __init__(self, responses=(), delay: float = 0):
+        self.responses = list(responses)
+        self.delay = delay
+        self.posts = []
+        self.received = threading.Condition()
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                with stand_in.received:
+                    stand_in.posts.append((time.monotonic(), json.loads(body)))
+                    status, reply = stand_in.responses.pop(0) if stand_in.responses else (204, None)
+                    stand_in.received.notify_all()
+                time.sleep(stand_in.delay)
+                data = json.dumps(reply).encode('utf-8') if reply is not None else b''
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/webhook"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def wait_for(self, count: int, timeout: float = 10) -> bool:
+        with self.received:
+            return self.received.wait_for(lambda: len(self.posts) >= count, timeout)
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class WebhookNotifierTest(unittest.TestCase):
+    def stand_in(self, *args, **kwargs) -> StandIn:
+        stand_in = StandIn(*args, **kwargs)
+        self.addCleanup(stand_in.close)
+        return stand_in
+
+    def notifier(self, url: str, **kwargs) -> WebhookNotifier:
+        notifier = WebhookNotifier(url, **kwargs)
+        self.addCleanup(notifier.close, 1)
+        return notifier
+
+    def test_messages_in_one_window_are_sent_as_one_post(self):
+        stand_in = self.stand_in()
+        notifier = self.notifier(stand_in.url, batch_seconds=0.3, username="bot")
+
+        for message in ("server stopped", "backup failed", "server started"):
+            notifier.notify(message)
+
+        self.assertTrue(stand_in.wait_for(1))
+        time.sleep(0.5)
+        self.assertEqual(len(stand_in.posts), 1)
+        self.assertEqual(stand_in.posts[0][1],
+                         {"content": "server stopped\nbackup failed\nserver started", "username": "bot"})
+        self.assertEqual(notifier.sent, 1)
+
+    def test_rate_limit_waits_retry_after(self):
+        stand_in = self.stand_in([(429, {"retry_after": 0.4, "global": False})])
+        notifier = self.notifier(stand_in.url, batch_seconds=0)
+
+        notifier.notify("server crashed")
+
+        self.assertTrue(stand_in.wait_for(2))
+        (first, payload), (second, retried) = stand_in.posts
+        self.assertGreaterEqual(second - first, 0.4)
+        self.assertEqual(payload, retried)
+
+    def test_server_errors_back_off_exponentially(self):
+        stand_in = self.stand_in([(503, None), (502, None)])
+        notifier = self.notifier(stand_in.url, batch_seconds=0)
+
+        # Jitter at its lowest: 0.5s after the first attempt, 1s after the second
+        with mock.patch('webhook_notifier.random.uniform', return_value=0.5):
+            notifier.notify("server crashed")
+            self.assertTrue(stand_in.wait_for(3))
+
+        times = [posted for posted, _ in stand_in.posts]
+        self.assertGreaterEqual(times[1] - times[0], 0.5)
+        self.assertGreaterEqual(times[2] - times[1], 1.0)
+        notifier.close(5)
+        self.assertEqual((notifier.sent, notifier.failed), (1, 0))
+
+    def test_client_errors_are_not_retried(self):
+        stand_in = self.stand_in([(400, {"message": "Cannot send an empty message"})])
+        notifier = self.notifier(stand_in.url, batch_seconds=0)
+
+        notifier.notify("server crashed")
+
+        self.assertTrue(stand_in.wait_for(1))
+        notifier.close(5)
+        self.assertEqual(len(stand_in.posts), 1)
+        self.assertEqual((notifier.sent, notifier.failed), (0, 1))
+
+    def test_notify_does_not_wait_for_the_network(self):
+        stand_in = self.stand_in(delay=1.0)
+        notifier = self.notifier(stand_in.url, batch_seconds=0)
+
+        start = time.monotonic()
+        notifier.notify("first")
+        self.assertTrue(stand_in.wait_for(1))
+        # The first post is still waiting on the stand-in
+        notifier.notify("second")
+        self.assertLess(time.monotonic() - start, 0.5)
+
+        notifier.close(5)
+        self.assertEqual([payload["content"] for _, payload in stand_in.posts], ["first", "second"])
+
+    def test_notify_without_url_is_a_no_op(self):
+        notifier = self.notifier('')
+        self.assertFalse(notifier.notify("server crashed"))
+
+
+if __name__ == '__main__':
+    unittest.main()
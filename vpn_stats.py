@@ -0,0 +1,201 @@
+import time
+import socket
+import logging
+import threading
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+import psutil
+
+from config_store import get_config_store
+
+logger = logging.getLogger(__name__)
+
+# Radmin VPN hands out addresses from 26.0.0.0/8
+RADMIN_PREFIX = '26.'
+
+
+def find_vpn_interface(preferred: Optional[str] = None) -> Tuple[Optional[str], Optional[str]]:
+    """(interface name, IPv4 address) of the VPN adapter, or (None, None)"""
+    addresses = psutil.net_if_addrs()
+    candidates = [preferred] if preferred else list(addresses)
+    for name in candidates:
+        ipv4 = [a.address for a in addresses.get(name, []) if a.family == socket.AF_INET]
+        if preferred and name == preferred:
+            return name, ipv4[0] if ipv4 else None
+        for address in ipv4:
+            if address.startswith(RADMIN_PREFIX) or 'radmin' in name.lower():
+                return name, address
+    return None, None
+
+
+def tcp_rtt(host: str, port: int, timeout: float = 2.0) -> Optional[float]:
+    """Milliseconds to complete a TCP handshake with host:port, None if it fails"""
+    start = time.perf_counter()
+    try:
+        with socket.create_connection((host, port), timeout=timeout):
+            return (time.perf_counter() - start) * 1000
+    except OSError:
+        return None
+
+
+class VPNStatsSampler:
+    """Background sampler for VPN interface traffic, latency and connections
+
+    Every interval it reads the VPN adapter's counters from
+    net_io_counters(pernic=True), times a TCP connect to the Minecraft
+    server's VPN address and counts TCP connections on the VPN address.
+    Settings are read from the live config on every sample.
+    """
+
+    def __init__(self, config: Dict, history: int = 30):
+        self.config = config
+        self.rtts = deque(maxlen=history)
+        self.latest: Dict = {}
+        self._previous = None
+        self._up_since = None
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+
+    @property
+    def interval(self) -> float:
+        return self.config.get('radmin_vpn', {}).get('stats_interval', 10)
+
+    def probe_target(self, vpn_address: Optional[str] = None) -> Optional[Tuple[str, int]]:
+        """The address to time, radmin_vpn.probe_host or the server address if it is on the VPN"""
+        radmin_config = self.config.get('radmin_vpn', {})
+        minecraft_config = self.config.get('minecraft', {})
+        host = radmin_config.get('probe_host') or minecraft_config.get('server_host')
+        port = radmin_config.get('probe_port') or minecraft_config.get('server_port', 25565)
+        if not host or (not radmin_config.get('probe_host') and not host.startswith(RADMIN_PREFIX)):
+            return None
+        if host == vpn_address:
+            # Our own VPN address, the handshake never leaves the machine
+            return None
+        return host, port
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="vpn-stats", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.sample()
+            except Exception as e:
+                logger.error(f"VPN stats sample failed: {e}")
+            self._stop.wait(self.interval)
+
+    def _connections(self, address: str) -> Tuple[int, Dict[str, int]]:
+        """Established TCP connections on the VPN address and their count per peer"""
+        peers = {}
+        established = 0
+        try:
+            connections = psutil.net_connections(kind='tcp')
+        except (psutil.AccessDenied, OSError):
+            return 0, peers
+        for conn in connections:
+            if not conn.laddr or conn.laddr.ip != address or not conn.raddr:
+                continue
+            if conn.status == psutil.CONN_ESTABLISHED:
+                established += 1
+                peers[conn.raddr.ip] = peers.get(conn.raddr.ip, 0) + 1
+        return established, peers
+
+    def sample(self) -> Dict:
+        """Take one sample and return the updated stats"""
+        now = time.time()
+        preferred = self.config.get('radmin_vpn', {}).get('interface') or None
+        interface, address = find_vpn_interface(preferred)
+
+        stats = {"sampled_at": now, "interface": interface, "ip_address": address, "up": False}
+        if interface:
+            if_stats = psutil.net_if_stats().get(interface)
+            stats["up"] = bool(if_stats and if_stats.isup and address)
+
+        if stats["up"]:
+            self._up_since = self._up_since or now
+            counters = psutil.net_io_counters(pernic=True).get(interface)
+            if counters:
+                previous = self._previous
+                self._previous = (now, interface, counters)
+                if previous and previous[1] == interface:
+                    elapsed = max(now - previous[0], 1e-6)
+                    old = previous[2]
+                    stats.update({
+                        "rx_rate": (counters.bytes_recv - old.bytes_recv) / elapsed,
+                        "tx_rate": (counters.bytes_sent - old.bytes_sent) / elapsed,
+                        "rx_packets_rate": (counters.packets_recv - old.packets_recv) / elapsed,
+                        "tx_packets_rate": (counters.packets_sent - old.packets_sent) / elapsed,
+                        "errors": (counters.errin - old.errin) + (counters.errout - old.errout),
+                        "drops": (counters.dropin - old.dropin) + (counters.dropout - old.dropout)
+                    })
+                stats["rx_total"] = counters.bytes_recv
+                stats["tx_total"] = counters.bytes_sent
+
+            stats["connections"], stats["peers"] = self._connections(address)
+        else:
+            self._up_since = None
+            self._previous = None
+
+        target = self.probe_target(address)
+        if target and stats["up"]:
+            rtt = tcp_rtt(*target)
+            with self._lock:
+                self.rtts.append(rtt)
+            stats["probe_target"] = f"{target[0]}:{target[1]}"
+            stats["rtt_ms"] = rtt
+        stats.update(self._rtt_summary())
+        stats["uptime"] = now - self._up_since if self._up_since else 0
+
+        with self._lock:
+            self.latest = stats
+        return stats
+
+    def _rtt_summary(self) -> Dict:
+        with self._lock:
+            samples = list(self.rtts)
+        if not samples:
+            return {}
+        ok = [rtt for rtt in samples if rtt is not None]
+        summary = {"probe_loss": (len(samples) - len(ok)) / len(samples) * 100, "probe_samples": len(samples)}
+        if ok:
+            summary.update({
+                "rtt_avg": sum(ok) / len(ok),
+                "rtt_min": min(ok),
+                "rtt_max": max(ok),
+                # Mean difference between consecutive successful probes
+                "jitter": (sum(abs(b - a) for a, b in zip(ok, ok[1:])) / (len(ok) - 1)) if len(ok) > 1 else 0.0
+            })
+        return summary
+
+    def snapshot(self) -> Dict:
+        """Latest stats, sampling once if the background thread hasn't yet"""
+        with self._lock:
+            latest = dict(self.latest)
+        return latest or self.sample()
+
+    def members(self) -> List[Dict]:
+        """VPN peers seen with established connections to this machine"""
+        peers = self.snapshot().get("peers", {})
+        return [{"ip": ip, "connections": count, "online": True} for ip, count in sorted(peers.items())]
+
+
+_sampler = None
+_sampler_lock = threading.Lock()
+
+
+def get_vpn_sampler(config: Optional[Dict] = None) -> VPNStatsSampler:
+    """The shared sampler, created from the live config on first use"""
+    global _sampler
+    with _sampler_lock:
+        if _sampler is None:
+            _sampler = VPNStatsSampler(config if config is not None else get_config_store().config)
+        return _sampler
@@ -0,0 +1,156 @@
+import time
+import queue
+import random
+import logging
+import threading
+from typing import Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# Discord rejects message content longer than this
+MAX_CONTENT = 2000
+MAX_BACKOFF = 60
+
+
+class WebhookNotifier:
+    """Deliver alerts to a Discord webhook from a background thread
+
+    notify() only puts the message on a queue, so callers never wait on the
+    network. The sender thread collects whatever arrives within
+    batch_seconds of the first message into one post, split at Discord's
+    content limit. Posts go through one keep-alive requests.Session. A 429
+    waits the retry_after Discord sends, server errors and connection
+    failures are retried with exponential backoff and jitter, other 4xx
+    responses are logged and dropped.
+    """
+
+    def __init__(self, url: str = '', batch_seconds: float = 2.0, max_retries: int = 5,
+                 timeout: float = 10, username: Optional[str] = None, max_queue: int = 500):
+        self.url = url
+        self.batch_seconds = batch_seconds
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.username = username
+        self.session = requests.Session()
+        self.session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=2))
+        self.session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=2))
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.sent = 0
+        self.failed = 0
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="webhook-notifier", daemon=True)
+        self._thread.start()
+
+    def notify(self, message: str) -> bool:
+        """Queue a message, returns False if there is no webhook or the queue is full"""
+        if not self.url:
+            return False
+        self.start()
+        try:
+            self._queue.put_nowait(message)
+            return True
+        except queue.Full:
+            logger.warning(f"Webhook queue full, dropping notification: {message}")
+            return False
+
+    def close(self, timeout: float = 10):
+        """Send what is queued, waiting up to timeout seconds, then stop the thread"""
+        if self._thread and self._thread.is_alive():
+            try:
+                self._queue.put(None, timeout=timeout)
+            except queue.Full:
+                pass
+            self._thread.join(timeout)
+        self._stop.set()
+        self.session.close()
+
+    def _run(self):
+        while not self._stop.is_set():
+            message = self._queue.get()
+            if message is None:
+                return
+            batch, closing = self._collect(message)
+            for content in self._chunks(batch):
+                self._post({"content": content, **({"username": self.username} if self.username else {})})
+            if closing:
+                return
+
+    def _collect(self, first: str):
+        """The first message plus everything queued within batch_seconds, and whether close() was called"""
+        batch = [first]
+        deadline = time.monotonic() + self.batch_seconds
+        while True:
+            remaining = deadline - time.monotonic()
+            try:
+                message = self._queue.get(timeout=max(remaining, 0)) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                return batch, False
+            if message is None:
+                return batch, True
+            batch.append(message)
+
+    @staticmethod
+    def _chunks(messages: List[str]) -> List[str]:
+        chunks = []
+        current = ''
+        for message in messages:
+            message = message[:MAX_CONTENT]
+            if current and len(current) + 1 + len(message) > MAX_CONTENT:
+                chunks.append(current)
+                current = ''
+            current = f"{current}\n{message}" if current else message
+        if current:
+            chunks.append(current)
+        return chunks
+
+    def _post(self, payload: Dict) -> bool:
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.session.post(self.url, json=payload, timeout=self.timeout)
+            except requests.RequestException as e:
+                delay = self._backoff(attempt)
+                logger.warning(f"Webhook post failed ({e}), retrying in {delay:.1f}s")
+            else:
+                if response.status_code < 300:
+                    self.sent += 1
+                    return True
+                if response.status_code == 429:
+                    delay = self._retry_after(response)
+                    logger.warning(f"Webhook rate limited, retrying in {delay:.1f}s")
+                elif response.status_code >= 500:
+                    delay = self._backoff(attempt)
+                    logger.warning(f"Webhook returned {response.status_code}, retrying in {delay:.1f}s")
+                else:
+                    logger.error(f"Webhook rejected notification: {response.status_code} {response.text[:200]}")
+                    break
+            if attempt < self.max_retries and self._stop.wait(delay):
+                break
+
+        self.failed += 1
+        logger.error(f"Dropping notification after {attempt + 1} attempts")
+        return False
+
+    @staticmethod
+    def _backoff(attempt: int) -> float:
+        return min(2 ** attempt, MAX_BACKOFF) * random.uniform(0.5, 1.0)
+
+    @staticmethod
+    def _retry_after(response) -> float:
+        """Seconds to wait from a 429, Discord sends retry_after in the JSON body"""
+        try:
+            return float(response.json()['retry_after'])
+        except (ValueError, KeyError, TypeError):
+            pass
+        try:
+            return float(response.headers.get('Retry-After', 1))
+        except ValueError:
+            return 1.0
@@ -0,0 +1,184 @@
+import os
+import time
+import shutil
+import asyncio
+import logging
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from rcon_client import RconClient
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# ioctl request for a copy-on-write clone on Linux (btrfs, XFS, bcachefs)
+FICLONE = 0x40049409
+
+# Held open and locked by the running server, and meaningless in a backup
+SKIP_FILES = {'session.lock'}
+
+
+def _reflink(source: str, target: str) -> bool:
+    """Try to clone a file with copy-on-write, returns False if unsupported"""
+    if fcntl is None:
+        return False
+    try:
+        with open(source, 'rb') as src, open(target, 'wb') as dst:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        shutil.copystat(source, target)
+        return True
+    except OSError:
+        if os.path.exists(target):
+            os.remove(target)
+        return False
+
+
+def stage_directory(source_dir: str, stage_dir: str, previous_stage: Optional[str] = None,
+                    exclude_dirs: List[str] = None) -> Dict:
+    """Make a point-in-time copy of source_dir as cheaply as possible
+
+    Files unchanged since previous_stage are hardlinked to it, changed files
+    are reflinked where the filesystem supports it and copied otherwise.
+    Staged files are never modified in place, so sharing inodes between
+    stages is safe. A file that can't be staged raises OSError, a stage
+    missing files would not be the consistent copy it claims to be.
+    """
+    start = time.monotonic()
+    excluded = {os.path.abspath(path) for path in (exclude_dirs or [])}
+    stats = {"linked": 0, "reflinked": 0, "copied": 0}
+    use_reflink = True
+
+    for root, dirs, filenames in os.walk(source_dir):
+        dirs[:] = [d for d in dirs if os.path.abspath(os.path.join(root, d)) not in excluded]
+        relroot = os.path.relpath(root, source_dir)
+        os.makedirs(os.path.join(stage_dir, relroot), exist_ok=True)
+
+        for filename in filenames:
+            if filename in SKIP_FILES:
+                continue
+            source = os.path.join(root, filename)
+            target = os.path.join(stage_dir, relroot, filename)
+            try:
+                st = os.stat(source)
+            except FileNotFoundError:
+                # Deleted since the directory was listed, it isn't part of the world any more
+                continue
+            try:
+                if previous_stage:
+                    previous = os.path.join(previous_stage, relroot, filename)
+                    try:
+                        prev_st = os.stat(previous)
+                        if prev_st.st_size == st.st_size and prev_st.st_mtime_ns == st.st_mtime_ns:
+                            os.link(previous, target)
+                            stats["linked"] += 1
+                            continue
+                    except OSError:
+                        pass
+
+                if use_reflink and _reflink(source, target):
+                    stats["reflinked"] += 1
+                    continue
+                # Don't retry clones on a filesystem that rejected the first one
+                use_reflink = False
+                shutil.copy2(source, target)
+                stats["copied"] += 1
+            except OSError as e:
+                raise OSError(f"Could not stage {source}: {e}") from e
+
+    stats["duration"] = time.monotonic() - start
+    return stats
+
+
+class HotSnapshot:
+    """Capture a consistent copy of a running server's directory
+
+    Autosaving is paused with save-off, pending chunks are flushed with
+    save-all flush, the directory is staged and saving is turned back on.
+    Commands go over RCON when it is configured, otherwise through the
+    console_command callable (e.g. the server process stdin).
+    """
+
+    def __init__(self, config: Dict, console_command: Optional[Callable[[str], bool]] = None):
+        minecraft_config = config.get('minecraft', {})
+        backup_config = config.get('backup', {})
+
+        self.rcon_host = minecraft_config.get('rcon_host', 'localhost')
+        self.rcon_port = minecraft_config.get('rcon_port', 25575)
+        self.rcon_password = minecraft_config.get('rcon_password')
+        self.console_command = console_command
+        # Without RCON there is no reply to wait for, so give save-all time to finish
+        self.flush_wait = backup_config.get('save_flush_wait', 5)
+
+    def _send_commands(self, commands: List[str]) -> bool:
+        """Send console commands, returns False if there is no way to reach the server"""
+        if self.rcon_password:
+            with RconClient(self.rcon_host, self.rcon_port, self.rcon_password) as rcon:
+                for command in commands:
+                    logger.info(f"RCON {command}: {rcon.command(command).strip()}")
+            return True
+
+        if self.console_command:
+            for command in commands:
+                if not self.console_command(command):
+                    return False
+            return True
+
+        return False
+
+    async def _resume_saving(self, attempts: int = 3):
+        """Send save-on, retrying, a failure leaves the live server without autosave"""
+        for attempt in range(1, attempts + 1):
+            try:
+                if await asyncio.to_thread(self._send_commands, ['save-on']):
+                    return
+            except Exception as e:
+                logger.warning(f"save-on attempt {attempt} failed: {e}")
+            if attempt < attempts:
+                await asyncio.sleep(2)
+        logger.error("Could not send save-on, autosave stays disabled until it is run on the server")
+
+    async def capture(self, source_dir: str, staging_root: str, exclude_dirs: List[str] = None) -> Dict:
+        """Stage source_dir under staging_root and return the staging stats"""
+        os.makedirs(staging_root, exist_ok=True)
+        current = os.path.join(staging_root, 'current')
+        stage_dir = os.path.join(staging_root, datetime.now().strftime("%Y%m%d_%H%M%S"))
+        previous = current if os.path.isdir(current) else None
+
+        try:
+            saving_paused = await asyncio.to_thread(self._send_commands, ['save-off'])
+        except Exception:
+            # The server may have run save-off before the connection failed
+            await self._resume_saving()
+            raise
+        if not saving_paused:
+            logger.warning("No RCON or console available, staging without pausing saves")
+
+        save_off_start = time.monotonic()
+        try:
+            if saving_paused:
+                if not await asyncio.to_thread(self._send_commands, ['save-all flush']):
+                    raise RuntimeError("save-all flush failed, not staging a world that may be mid-save")
+                if not self.rcon_password:
+                    await asyncio.sleep(self.flush_wait)
+            try:
+                stats = await asyncio.to_thread(stage_directory, source_dir, stage_dir, previous, exclude_dirs)
+            except BaseException:
+                await asyncio.to_thread(shutil.rmtree, stage_dir, True)
+                raise
+        finally:
+            if saving_paused:
+                await self._resume_saving()
+
+        stats["save_off_seconds"] = time.monotonic() - save_off_start
+        logger.info(f"Staged {source_dir} in {stats['duration']:.2f}s "
+                    f"({stats['linked']} linked, {stats['reflinked']} reflinked, {stats['copied']} copied)")
+
+        if previous:
+            await asyncio.to_thread(shutil.rmtree, previous, True)
+        os.replace(stage_dir, current)
+        stats["path"] = current
+        return stats